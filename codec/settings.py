@@ -53,6 +53,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Near the top so it compresses the final response body
+    "django.middleware.gzip.GZipMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -154,6 +156,10 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # REST Framework
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "web.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 25,
     "DEFAULT_AUTHENTICATION_CLASSES": [
@@ -166,8 +172,11 @@ REST_FRAMEWORK = {
     "DEFAULT_THROTTLE_RATES": {"anon": "2000/day", "user": "10000000/day"},
 }
 
+# Redis, shared by celery and app level locks, counters and caches
+REDIS_URL = env.str("REDIS_URL", "redis://localhost:6379/")
+
 # Celery
-CELERY_BROKER_URL = env.str("REDIS_URL", "redis://localhost:6379/")
+CELERY_BROKER_URL = REDIS_URL
 CELERY_BEAT_SCHEDULE = {
     "crawl-feeds-every-3-hours": {
         "task": "web.tasks.crawler_tasks.crawl_top_feeds",
@@ -181,13 +190,63 @@ CELERY_BEAT_SCHEDULE = {
         "task": "web.tasks.ranker_tasks.rank_all_feeds_popularity",
         "schedule": crontab(minute=0, hour="*/1"),
     },
+    "rebuild-profile-vectors-daily": {
+        "task": "web.tasks.ranker_tasks.rebuild_all_profile_vectors",
+        "schedule": crontab(hour=9, minute=0),
+    },
+    "refresh-exploration-pool-every-15-minutes": {
+        "task": "web.tasks.ranker_tasks.refresh_exploration_pool",
+        "schedule": crontab(minute="*/15"),
+    },
+    "refresh-category-catalog-daily": {
+        "task": "web.tasks.clipper_tasks.refresh_category_catalog",
+        "schedule": crontab(hour=8, minute=0),
+    },
+    "update-feed-search-vectors-daily": {
+        "task": "web.tasks.crawler_tasks.update_all_feed_search_vectors",
+        "schedule": crontab(hour=7, minute=0),
+    },
+    "flush-buffered-views-every-10-seconds": {
+        "task": "web.tasks.view_tasks.flush_buffered_views",
+        "schedule": 10.0,
+    },
+    "update-activity-rollups-hourly": {
+        "task": "web.tasks.view_tasks.update_all_activity_rollups",
+        "schedule": crontab(minute=15),
+    },
+    "sync-shaped-items-hourly": {
+        "task": "web.tasks.export_tasks.sync_all_shaped_items",
+        # After the rollups, so new view counts are picked up
+        "schedule": crontab(minute=20),
+    },
+    "sync-all-shaped-items-daily": {
+        "task": "web.tasks.export_tasks.sync_all_shaped_items",
+        "schedule": crontab(hour=11, minute=0),
+        "kwargs": {"full": True},
+    },
     "update-active-users-daily": {
         "task": "web.tasks.update_active_users",
-        "schedule": crontab(hour=0, minute=0),
+        # After the rollup lag, so the last views of yesterday are counted
+        "schedule": crontab(hour=0, minute=10),
+    },
+    "poll-pending-transcriptions-every-2-minutes": {
+        "task": "web.tasks.crawler_tasks.poll_pending_transcriptions",
+        "schedule": crontab(minute="*/2"),
+    },
+    "flush-logsnag-events-every-minute": {
+        "task": "web.tasks.logsnag_tasks.flush_logsnag_events",
+        "schedule": 60.0,
+    },
+    "update-metric-insights-hourly": {
+        "task": "web.tasks.logsnag_tasks.update_metric_insights",
+        "schedule": crontab(minute=30),
     },
 }
 CELERY_RESULT_EXTENDED = True
 
+# Max number of scraping proxy calls the weekly iTunes crawl can make
+ITUNES_RATINGS_WEEKLY_BUDGET = env.int("ITUNES_RATINGS_WEEKLY_BUDGET", 5000)
+
 # Cloudflare R2 Storage Bucket
 R2_URL = env("R2_URL")
 R2_ACCESS_KEY = env("R2_ACCESS_KEY")
@@ -195,6 +254,9 @@ R2_SECRET_KEY = env("R2_SECRET_KEY")
 R2_BUCKET_NAME = "codec-bucket"  # env("R2_BUCKET_NAME")
 R2_BUCKET_URL = env("R2_BUCKET_URL")
 
+# Largest episode audio file we will download, defaults to 500MB
+AUDIO_MAX_BYTES = env.int("AUDIO_MAX_BYTES", 500 * 1024 * 1024)
+
 # Service API Keys
 ASSEMBLYAI_API_KEY = env("ASSEMBLYAI_API_KEY")
 RESEND_API_KEY = env("RESEND_API_KEY")
@@ -210,6 +272,21 @@ LOGSNAG_API_KEY = env("LOGSNAG_API_KEY")
 GCLOUD_API_KEY = env("GCLOUD_API_KEY")
 ANTHROPIC_API_KEY = env("ANTHROPIC_API_KEY")
 
+# Queue ranking, set RANKING_BACKEND to "numpy" to score the recent clips in
+# process memory instead of querying the ANN indexes, see web/lib/ranking_engine.py
+RANKING_BACKEND = env.str("RANKING_BACKEND", "postgres")
+RANKING_ENGINE_WINDOW_DAYS = env.int("RANKING_ENGINE_WINDOW_DAYS", 30)
+# 100k clips take about 300MB per process as float32. float16 halves that, but
+# scoring converts it back to float32 and takes about 5x longer
+RANKING_ENGINE_MAX_CLIPS = env.int("RANKING_ENGINE_MAX_CLIPS", 100000)
+RANKING_ENGINE_DTYPE = env.str("RANKING_ENGINE_DTYPE", "float32")
+
+# Transcription, set TRANSCRIBER_BACKEND to "local" to skip AssemblyAI
+TRANSCRIBER_BACKEND = env.str("TRANSCRIBER_BACKEND", "assemblyai")
+ASSEMBLYAI_WEBHOOK_URL = env.str("ASSEMBLYAI_WEBHOOK_URL", None)
+ASSEMBLYAI_WEBHOOK_AUTH_HEADER = "X-Codec-Webhook-Secret"
+ASSEMBLYAI_WEBHOOK_SECRET = env.str("ASSEMBLYAI_WEBHOOK_SECRET", "")
+
 if not DEBUG:
     # Sentry
     sentry_sdk.init(
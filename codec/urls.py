@@ -39,6 +39,12 @@ urlpatterns = [
         views.PasswordResetFormView.as_view(),
         name="password_reset_confirm",
     ),
+    # transcription completed callback from AssemblyAI
+    path(
+        "transcripts/webhook/",
+        views.TranscriptWebhookView.as_view(),
+        name="transcript_webhook",
+    ),
     # topic manager app
     path("topic-manager/", include("topic_manager.urls")),
 ]
@@ -5,9 +5,14 @@ from django.contrib.admin import SimpleListFilter
 from django.contrib.auth import get_user_model
 from django.utils.html import format_html
 from django.urls import reverse
-from django.db.models import Count, BooleanField, Exists, OuterRef, Q
-from django.db.models.functions import Cast
-from pgvector.django import L2Distance
+from django.db.models import (
+    Count,
+    BooleanField,
+    Exists,
+    ExpressionWrapper,
+    OuterRef,
+    Q,
+)
 from web.tasks.crawler_tasks import recalculate_feed_embedding_and_topics
 
 
@@ -15,6 +20,7 @@ from django.db import transaction
 
 from web.tasks import crawl_feed, generate_clips_from_feed_item
 from .models import (
+    EpisodeIngest,
     Feed,
     FeedItem,
     Clip,
@@ -81,9 +87,9 @@ class IsEnglishFilter(SimpleListFilter):
             return queryset.filter(is_english=False)
 
 
-class HasZeroEmbeddingFilter(admin.SimpleListFilter):
-    title = "Has Zero Embedding"
-    parameter_name = "has_zero_embedding"
+class MissingEmbeddingFilter(admin.SimpleListFilter):
+    title = "Missing Embedding"
+    parameter_name = "missing_embedding"
 
     def lookups(self, request, model_admin):
         return (
@@ -92,11 +98,10 @@ class HasZeroEmbeddingFilter(admin.SimpleListFilter):
         )
 
     def queryset(self, request, queryset):
-        zero_vector = [0.0] * 768  # Assuming 768-dimensional embeddings
         if self.value() == "yes":
-            return queryset.filter(topic_embedding=zero_vector)
+            return queryset.filter(topic_embedding__isnull=True)
         if self.value() == "no":
-            return queryset.exclude(topic_embedding=zero_vector)
+            return queryset.filter(topic_embedding__isnull=False)
 
 
 @admin.register(Feed)
@@ -108,14 +113,14 @@ class FeedAdmin(admin.ModelAdmin):
         "get_feed_items_count",
         "created_at",
         "updated_at",
-        "has_zero_embedding",
+        "missing_embedding",
     )
     list_filter = (
         "created_at",
         HasItemsFilter,
         FeedHasClipsFilter,
         IsEnglishFilter,
-        HasZeroEmbeddingFilter,
+        MissingEmbeddingFilter,
     )
     search_fields = ("name", "url")
     actions = [
@@ -127,21 +132,20 @@ class FeedAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
-        zero_vector = [0.0] * 768  # Assuming 768-dimensional embeddings
         queryset = queryset.annotate(
             _feed_items_count=Count("items", distinct=True),
-            _is_zero_embedding=Cast(
-                L2Distance("topic_embedding", zero_vector) == 0, BooleanField()
+            _is_missing_embedding=ExpressionWrapper(
+                Q(topic_embedding__isnull=True), output_field=BooleanField()
             ),
         )
         return queryset
 
-    def has_zero_embedding(self, obj):
-        return obj._is_zero_embedding
+    def missing_embedding(self, obj):
+        return obj._is_missing_embedding
 
-    has_zero_embedding.boolean = True
-    has_zero_embedding.short_description = "Zero Embedding"
-    has_zero_embedding.admin_order_field = "_is_zero_embedding"
+    missing_embedding.boolean = True
+    missing_embedding.short_description = "Missing Embedding"
+    missing_embedding.admin_order_field = "_is_missing_embedding"
 
     def get_url(self, obj):
         truncated_url = obj.url[:50] + "..." if len(obj.url) > 50 else obj.url
@@ -299,6 +303,13 @@ class FeedItemAdmin(admin.ModelAdmin):
     get_clips_count.short_description = "Clips"
 
 
+@admin.register(EpisodeIngest)
+class EpisodeIngestAdmin(admin.ModelAdmin):
+    list_display = ("audio_url", "feed", "status", "transcript_id", "created_at")
+    list_filter = ("status", "created_at")
+    search_fields = ("audio_url", "transcript_id", "feed__name")
+
+
 @admin.register(Clip)
 class ClipAdmin(admin.ModelAdmin):
     list_display = (
@@ -0,0 +1,169 @@
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from web.lib.lease import claim_lease, release_lease, renew_lease
+from web.lib.redis_client import redis_client
+from web.lib.seen_set import INCOMPLETE_VIEW_DURATION
+from web.models import (
+    ClipDailyActivity,
+    ClipUserView,
+    SyncWatermark,
+    UserDailyActivity,
+)
+
+ROLLUP_WATERMARK = "activity-rollups"
+# Views are read up to this long ago, so rows committed a little after
+# their updated_at aren't skipped by the watermark
+ROLLUP_LAG = timedelta(minutes=5)
+COMPLETED_VIEW_DURATION = INCOMPLETE_VIEW_DURATION
+ROLLUP_BATCH_SIZE = 1000
+ROLLUP_LEASE_KEY = "activity-rollups:lease"
+# Renewed after every day rolled up, so only a single day has to fit in it
+ROLLUP_LEASE_TTL = 60 * 10
+# Days of deleted views, a deleted row leaves no updated_at for the watermark
+DELETED_VIEW_DAYS_KEY = "activity-rollups:deleted-view-days"
+
+
+class RollupsNotBackfilledError(Exception):
+    pass
+
+
+def get_changed_days(since, until) -> list:
+    """Days with views created or extended between the watermarks."""
+    views = ClipUserView.objects.filter(updated_at__gt=since, updated_at__lte=until)
+    days = (
+        views.annotate(day=TruncDate("created_at", tzinfo=dt_timezone.utc))
+        .values_list("day", flat=True)
+        .distinct()
+    )
+    return sorted(days)
+
+
+def record_deleted_view(view: ClipUserView) -> None:
+    """Have the next run recompute the day of a view once its delete commits."""
+    day = view.created_at.astimezone(dt_timezone.utc).date().isoformat()
+    transaction.on_commit(lambda: redis_client.sadd(DELETED_VIEW_DAYS_KEY, day))
+
+
+def get_all_days(until) -> list:
+    """Every day from the first view up to the watermark."""
+    first_view_at = ClipUserView.objects.aggregate(first=Min("created_at"))["first"]
+    if first_view_at is None:
+        return []
+    day = first_view_at.astimezone(dt_timezone.utc).date()
+    last_day = until.astimezone(dt_timezone.utc).date()
+    days = []
+    while day <= last_day:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def rollup_day(day) -> None:
+    """Recompute the user and clip rollups of one day from its views."""
+    start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+    views = ClipUserView.objects.filter(
+        created_at__gte=start, created_at__lt=start + timedelta(days=1)
+    )
+    stats = {
+        "view_count": Count("id"),
+        "completed_count": Count(
+            "id", filter=Q(duration__gte=COMPLETED_VIEW_DURATION)
+        ),
+        "total_duration": Sum("duration"),
+    }
+    now = timezone.now()
+
+    with transaction.atomic():
+        for model, key in [
+            (UserDailyActivity, "user_id"),
+            (ClipDailyActivity, "clip_id"),
+        ]:
+            rows = [
+                model(**row, day=day, updated_at=now)
+                for row in views.values(key).annotate(**stats).order_by()
+            ]
+            model.objects.bulk_create(
+                rows,
+                batch_size=ROLLUP_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=[key.removesuffix("_id"), "day"],
+                update_fields=[
+                    "view_count",
+                    "completed_count",
+                    "total_duration",
+                    "updated_at",
+                ],
+            )
+            # Users or clips whose views of the day were all deleted
+            model.objects.filter(day=day, updated_at__lt=now).delete()
+
+
+def update_activity_rollups(backfill: bool = False) -> int | None:
+    """
+    Roll up the days that have views changed since the last run.
+
+    Scheduled runs never scan every view, the history is backfilled once
+    with the backfill_activity_rollups command.
+
+    Args:
+        backfill (bool): Roll up every day since the first view instead.
+
+    Returns:
+        int | None: The number of days rolled up, or None if another run
+            holds the lease.
+
+    Raises:
+        RollupsNotBackfilledError: If the history hasn't been backfilled yet.
+    """
+    token = claim_lease(ROLLUP_LEASE_KEY, ROLLUP_LEASE_TTL)
+    if token is None:
+        return None
+
+    try:
+        until = timezone.now() - ROLLUP_LAG
+        # Only the days read here are cleared, deletes from now on are kept
+        deleted_view_days = redis_client.smembers(DELETED_VIEW_DAYS_KEY)
+        if backfill:
+            days = get_all_days(until)
+        else:
+            watermark = SyncWatermark.objects.filter(name=ROLLUP_WATERMARK).first()
+            if watermark is None:
+                raise RollupsNotBackfilledError(
+                    "Activity rollups need a backfill_activity_rollups run first"
+                )
+            days = get_changed_days(watermark.synced_until, until)
+            days = sorted(
+                set(days)
+                | {date.fromisoformat(day.decode()) for day in deleted_view_days}
+            )
+
+        for day in days:
+            rollup_day(day)
+            if not renew_lease(ROLLUP_LEASE_KEY, token, ROLLUP_LEASE_TTL):
+                # Another run took over, it starts from the same watermark
+                print(f"Lost the activity rollups lease after rolling up {day}")
+                return None
+
+        SyncWatermark.objects.update_or_create(
+            name=ROLLUP_WATERMARK, defaults={"synced_until": until}
+        )
+        if deleted_view_days:
+            redis_client.srem(DELETED_VIEW_DAYS_KEY, *deleted_view_days)
+        return len(days)
+    finally:
+        release_lease(ROLLUP_LEASE_KEY, token)
+
+
+def count_active_users(end_day, days: int) -> int:
+    """Number of users with views in the days before end_day."""
+    return (
+        UserDailyActivity.objects.filter(
+            day__gte=end_day - timedelta(days=days), day__lt=end_day
+        )
+        .values("user_id")
+        .distinct()
+        .count()
+    )
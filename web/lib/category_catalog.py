@@ -0,0 +1,143 @@
+import hashlib
+import uuid
+import orjson
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from web.lib.redis_client import redis_client
+from web.models import Category, CategoryClipCount, ClipCategoryScore
+
+CATALOG_VERSION_KEY = "categories:catalog-version"
+# Bounds staleness from category edits that don't invalidate the catalog
+CATALOG_CACHE_TTL = 60 * 60
+# Tagging invalidates the catalog at most this often
+CATALOG_INVALIDATION_DEBOUNCE = 60
+CATALOG_INVALIDATION_SCHEDULED_KEY = "categories:catalog-invalidation-scheduled"
+
+
+def get_catalog_version() -> str:
+    # A random token rather than a counter, so a Redis flush can't hand out
+    # a version (and ETag) that clients already cached for different data
+    version = redis_client.get(CATALOG_VERSION_KEY)
+    if version is None:
+        redis_client.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, nx=True)
+        version = redis_client.get(CATALOG_VERSION_KEY)
+    return version.decode()
+
+
+def invalidate_category_catalog() -> None:
+    redis_client.set(CATALOG_VERSION_KEY, uuid.uuid4().hex)
+
+
+def get_catalog_etag(full_path: str) -> str:
+    """The catalog is the same for every user, so only the query string varies."""
+    digest = hashlib.md5(f"{get_catalog_version()}:{full_path}".encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    if not if_none_match:
+        return False
+    # GZipMiddleware weakens the ETags it sends, so clients echo W/"..."
+    etags = [tag.removeprefix("W/") for tag in parse_etags(if_none_match)]
+    return etag in etags or "*" in etags
+
+
+def get_cached_catalog(etag: str):
+    data = redis_client.get(f"categories:catalog-page:{etag}")
+    if data is None:
+        return None
+    return orjson.loads(data)
+
+
+def store_cached_catalog(etag: str, data) -> None:
+    redis_client.set(
+        f"categories:catalog-page:{etag}", orjson.dumps(data), ex=CATALOG_CACHE_TTL
+    )
+
+
+def get_catalog_page(response_data: dict, page) -> dict:
+    """
+    The cacheable part of a catalog page, with page numbers in place of the
+    next and previous links, which are absolute and depend on the request's host.
+    """
+    return {
+        "count": response_data["count"],
+        "next_page": page.next_page_number() if page.has_next() else None,
+        "previous_page": (
+            page.previous_page_number() if page.has_previous() else None
+        ),
+        "results": response_data["results"],
+    }
+
+
+def get_catalog_response_data(
+    catalog_page: dict, url: str, page_query_param: str
+) -> dict:
+    """Rebuild the paginated response for the request's absolute URL."""
+    next_link = None
+    if catalog_page["next_page"] is not None:
+        next_link = replace_query_param(
+            url, page_query_param, catalog_page["next_page"]
+        )
+    previous_link = None
+    if catalog_page["previous_page"] == 1:
+        # Same as PageNumberPagination, the first page has no page parameter
+        previous_link = remove_query_param(url, page_query_param)
+    elif catalog_page["previous_page"] is not None:
+        previous_link = replace_query_param(
+            url, page_query_param, catalog_page["previous_page"]
+        )
+    return {
+        "count": catalog_page["count"],
+        "next": next_link,
+        "previous": previous_link,
+        "results": catalog_page["results"],
+    }
+
+
+def apply_clip_category_change(old_category_ids: set, new_category_ids: set) -> None:
+    """Update clip counts when a clip's categories are replaced."""
+    deltas = {category_id: -1 for category_id in old_category_ids - new_category_ids}
+    deltas.update(
+        {category_id: 1 for category_id in new_category_ids - old_category_ids}
+    )
+
+    for category_id, delta in deltas.items():
+        _, created = CategoryClipCount.objects.get_or_create(
+            category_id=category_id, defaults={"clip_count": max(delta, 0)}
+        )
+        if not created:
+            CategoryClipCount.objects.filter(category_id=category_id).update(
+                clip_count=F("clip_count") + delta, updated_at=timezone.now()
+            )
+
+
+def refresh_category_clip_counts() -> int:
+    """
+    Recount clips for every category from ClipCategoryScore.
+
+    Returns:
+        int: The number of categories counted.
+    """
+    counts = dict(
+        ClipCategoryScore.objects.values("category_id")
+        .annotate(clip_count=Count("clip_id"))
+        .values_list("category_id", "clip_count")
+    )
+    rows = [
+        CategoryClipCount(
+            category_id=category_id,
+            clip_count=counts.get(category_id, 0),
+            updated_at=timezone.now(),
+        )
+        for category_id in Category.objects.values_list("id", flat=True)
+    ]
+    CategoryClipCount.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["category"],
+        update_fields=["clip_count", "updated_at"],
+    )
+    return len(rows)
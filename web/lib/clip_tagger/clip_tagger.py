@@ -2,6 +2,7 @@ from langsmith import traceable
 from pgvector.django import CosineDistance
 
 from web.lib.embed import get_embedding
+from web.lib.vector_search import half_cosine_distance
 from web.models import Category, Clip, Topic
 from .generate_topics import TopicContent, generate_topics
 from .assign_topics import assign_topics
@@ -21,10 +22,13 @@ def clip_tagger(clip: Clip, nearest_neighbors: int = 40):
     topic_embeddings = [generate_topic_embedding(topic) for topic in generated_topics]
     avg_embedding = [sum(e) / len(e) for e in zip(*topic_embeddings)]
 
-    # Find the nearest topics using cosine similarity
-    nearest_topics = Topic.objects.annotate(
-        similarity=CosineDistance("embedding", avg_embedding)
-    ).order_by("similarity")[:nearest_neighbors]
+    # Find the nearest topics using cosine similarity, the order comes from
+    # the half precision index and the scores from the float32 embeddings
+    nearest_topics = (
+        Topic.objects.filter(embedding__isnull=False)
+        .annotate(similarity=CosineDistance("embedding", avg_embedding))
+        .order_by(half_cosine_distance("embedding", avg_embedding))[:nearest_neighbors]
+    )
 
     # Evaluate topics
     evaluations = assign_topics(clip, nearest_topics)
@@ -1,18 +1,129 @@
+import re
+import time
 import feedparser
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 from django.conf import settings
+from web.lib.redis_client import redis_client
+
+# The lookup endpoint accepts a comma separated list of up to ~200 ids
+ITUNES_LOOKUP_BATCH_SIZE = 100
+
+# Podcasts without a feed URL or ratings never get a Feed row, so they're
+# remembered here (scored by rejection time) to keep them from being looked
+# up again every week
+ITUNES_REJECTED_KEY = "itunes:rejected"
+ITUNES_REJECTED_RETRY_AFTER = 60 * 60 * 24 * 90
+
+
+def mark_itunes_podcasts_rejected(podcast_ids: list) -> None:
+    if not podcast_ids:
+        return
+    now = time.time()
+    with redis_client.pipeline() as pipe:
+        pipe.zadd(
+            ITUNES_REJECTED_KEY, {podcast_id: now for podcast_id in podcast_ids}
+        )
+        pipe.zremrangebyscore(
+            ITUNES_REJECTED_KEY, "-inf", now - ITUNES_REJECTED_RETRY_AFTER
+        )
+        pipe.execute()
+
+
+def get_recently_rejected_itunes_ids(podcast_ids: list) -> set:
+    """
+    Filter podcast ids down to the ones rejected within the retry window.
+
+    Args:
+        podcast_ids (list): iTunes podcast ids.
+
+    Returns:
+        set: The ids that shouldn't be looked up again yet.
+    """
+    if not podcast_ids:
+        return set()
+    cutoff = time.time() - ITUNES_REJECTED_RETRY_AFTER
+    scores = redis_client.zmscore(ITUNES_REJECTED_KEY, podcast_ids)
+    return {
+        podcast_id
+        for podcast_id, score in zip(podcast_ids, scores)
+        if score is not None and score >= cutoff
+    }
+
+
+def crawl_itunes_genre_page(itunes_genre_url: str) -> tuple:
+    """
+    Crawl a single iTunes genre page.
 
+    Args:
+        itunes_genre_url (str): A genre page, or one of its letter/page sub-pages.
 
-def crawl_itunes_podcast_links(itunes_genre_url: str) -> list:
+    Returns:
+        tuple: The podcast links on the page and the letter/page sub-page links.
+    """
     response = requests.get(itunes_genre_url, timeout=5)
     response.raise_for_status()
     content = BeautifulSoup(response.content, "html.parser")
-    podcast_links = content.find("div", class_="grid3-column")
-    if podcast_links:
-        return [link.get("href") for link in podcast_links.findAll("a")]
-    else:
-        return []
+
+    podcast_links = []
+    podcast_grid = content.find("div", class_="grid3-column")
+    if podcast_grid:
+        podcast_links = [link.get("href") for link in podcast_grid.findAll("a")]
+
+    # Genre pages are split up by letter, and each letter is split up by page
+    sub_page_links = []
+    for sub_page_list in content.select("ul.list.alpha, ul.list.paginate"):
+        for link in sub_page_list.findAll("a"):
+            href = link.get("href")
+            if href:
+                sub_page_links.append(href.split("#")[0])
+
+    return podcast_links, sub_page_links
+
+
+def crawl_itunes_genres(itunes_genre_urls: list, max_workers: int = 8) -> list:
+    """
+    Crawl iTunes genre pages and all of their letter/page sub-pages concurrently.
+
+    Args:
+        itunes_genre_urls (list): The top level genre pages to start from.
+        max_workers (int): The number of pages to fetch at the same time.
+
+    Returns:
+        list: The unique podcast links found across all pages.
+    """
+    podcast_links = set()
+    visited = set(itunes_genre_urls)
+    pending = list(itunes_genre_urls)
+
+    def crawl_page(url):
+        try:
+            return crawl_itunes_genre_page(url)
+        except requests.RequestException as e:
+            print(f"Error crawling iTunes genre page {url}: {e}")
+            return [], []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Crawl one level at a time: genres, then letters, then pages
+        while pending:
+            next_pending = []
+            for links, sub_page_links in executor.map(crawl_page, pending):
+                podcast_links.update(links)
+                for sub_page_link in sub_page_links:
+                    if sub_page_link not in visited:
+                        visited.add(sub_page_link)
+                        next_pending.append(sub_page_link)
+            pending = next_pending
+
+    return list(podcast_links)
+
+
+def get_itunes_podcast_id(itunes_podcast_link: str) -> int | None:
+    match = re.search(r"/id(\d+)", itunes_podcast_link)
+    if not match:
+        return None
+    return int(match.group(1))
 
 
 def crawl_itunes_ratings(itunes_podcast_link: str) -> None:
@@ -61,6 +172,34 @@ def itunes_podcast_lookup(podcast_id: str) -> tuple:
     return feed_url, podcast["trackName"]
 
 
+def itunes_podcast_lookup_batch(podcast_ids: list) -> dict:
+    """
+    Look up many podcasts with a single request to the iTunes lookup endpoint.
+
+    Args:
+        podcast_ids (list): Up to ITUNES_LOOKUP_BATCH_SIZE iTunes podcast ids.
+
+    Returns:
+        dict: Maps podcast id to a (feed_url, name) tuple. Podcasts without a
+            feed URL are left out.
+    """
+    ids = ",".join(str(podcast_id) for podcast_id in podcast_ids)
+    lookup_url = f"https://itunes.apple.com/lookup?id={ids}&entity=podcast"
+    lookup_response = requests.get(lookup_url, timeout=10)
+    lookup_response.raise_for_status()
+    podcast_data = lookup_response.json()
+
+    podcasts = {}
+    for podcast in podcast_data["results"]:
+        if podcast.get("feedUrl") and podcast.get("collectionId"):
+            podcasts[podcast["collectionId"]] = (
+                podcast["feedUrl"],
+                podcast["trackName"],
+            )
+
+    return podcasts
+
+
 def crawl_rss_feed(rss_feed_url: str) -> list:
     # Crawl the RSS feed
     rss_feed = feedparser.parse(rss_feed_url)
@@ -0,0 +1,117 @@
+import heapq
+import json
+import random
+from datetime import timedelta
+from django.utils import timezone
+from web.lib.ranking_features import rankable_clips
+from web.lib.redis_client import redis_client
+from web.lib.seen_set import get_seen_exclusions
+
+# Number of recent clips kept in the exploration pool
+EXPLORATION_POOL_SIZE = 500
+# Clips older than this aren't explored
+EXPLORATION_MAX_AGE = timedelta(days=7)
+# Unpopular feeds still get explored, just less often
+EXPLORATION_MIN_WEIGHT = 0.1
+# Candidates drawn per request, the first one the user hasn't seen is served
+EXPLORATION_DRAWS = 20
+# Entries are [clip_id, feed_id], the weighted pools used [clip_id, feed_id, weight]
+EXPLORATION_POOL_KEY = "exploration:pool:v2"
+# Outlives the refresh interval so a late refresh doesn't empty the pool
+EXPLORATION_POOL_TTL = 60 * 60 * 2
+
+
+def get_exploration_weight(popularity_percentile: float | None) -> float:
+    return max(popularity_percentile or 0, EXPLORATION_MIN_WEIGHT)
+
+
+def weighted_sample(weighted_items, k: int) -> list:
+    """
+    Weighted sample without replacement in a single pass (Efraimidis-Spirakis).
+
+    Every item gets the key random() ** (1 / weight) and the k largest keys are
+    kept, so items can be streamed and memory stays at k.
+
+    Args:
+        weighted_items: Iterable of (item, weight) pairs, weights must be > 0.
+        k (int): The sample size.
+
+    Returns:
+        list: Up to k items, highest key first.
+    """
+    reservoir = []
+    # The index breaks key ties so items themselves are never compared
+    for index, (item, weight) in enumerate(weighted_items):
+        key = random.random() ** (1 / weight)
+        if len(reservoir) < k:
+            heapq.heappush(reservoir, (key, index, item))
+        elif key > reservoir[0][0]:
+            heapq.heapreplace(reservoir, (key, index, item))
+    return [item for _, _, item in sorted(reservoir, reverse=True)]
+
+
+def build_exploration_pool() -> list:
+    """
+    Sample the exploration pool from last week's clips, weighted by feed popularity.
+
+    Returns:
+        list: [clip_id, feed_id] entries.
+    """
+    recent_clips = (
+        rankable_clips()
+        .filter(created_at__gte=timezone.now() - EXPLORATION_MAX_AGE)
+        .values_list("clip_id", "feed_id", "popularity_percentile")
+        .iterator(chunk_size=2000)
+    )
+
+    def weighted_entries():
+        for clip_id, feed_id, popularity in recent_clips:
+            yield [clip_id, feed_id], get_exploration_weight(popularity)
+
+    return weighted_sample(weighted_entries(), EXPLORATION_POOL_SIZE)
+
+
+def store_exploration_pool(pool: list) -> None:
+    redis_client.set(EXPLORATION_POOL_KEY, json.dumps(pool), ex=EXPLORATION_POOL_TTL)
+
+
+def get_exploration_pool() -> list | None:
+    pool = redis_client.get(EXPLORATION_POOL_KEY)
+    if pool is None:
+        return None
+    return json.loads(pool)
+
+
+def sample_exploration_clip_id(
+    user, exclude_clip_ids: list, exclude_feed_ids: list
+) -> int | None:
+    """
+    Draw an exploration clip the user hasn't seen from the precomputed pool.
+
+    The pool is already weighted by feed popularity, so candidates are drawn
+    uniformly from it. The cost depends on the pool size, not on how many
+    recent clips exist.
+
+    Returns:
+        int | None: The clip id, or None if the pool is missing or exhausted.
+    """
+    pool = get_exploration_pool()
+    if not pool:
+        return None
+
+    excluded_clip_ids = set(exclude_clip_ids)
+    excluded_feed_ids = set(exclude_feed_ids)
+    candidates = [
+        clip_id
+        for clip_id, feed_id in pool
+        if clip_id not in excluded_clip_ids and feed_id not in excluded_feed_ids
+    ]
+    draws = random.sample(candidates, min(EXPLORATION_DRAWS, len(candidates)))
+    if not draws:
+        return None
+
+    viewed_clip_ids, _, _ = get_seen_exclusions(user.id, draws)
+    for clip_id in draws:
+        if clip_id not in viewed_clip_ids:
+            return clip_id
+    return None
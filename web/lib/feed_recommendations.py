@@ -0,0 +1,80 @@
+import json
+from django.db import transaction
+from pgvector.django import CosineDistance
+from web.lib.profile_vectors import get_profile_vector
+from web.lib.ranking import set_hnsw_ef_search
+from web.lib.redis_client import redis_client
+from web.lib.vector_search import half_cosine_distance
+from web.models import Feed, FeedUserInterest
+
+# Nearest feeds pulled from feed_topic_half_idx before the rerank
+RECOMMENDED_FEED_CANDIDATES = 500
+POPULARITY_WEIGHT = 0.2
+# Follows invalidate the list, the TTL picks up new feeds and popularity changes
+RECOMMENDED_FEEDS_TTL = 60 * 60 * 24
+
+
+def get_recommended_feeds_key(user_id: int) -> str:
+    return f"recommended-feeds:{user_id}"
+
+
+def invalidate_recommended_feeds(user_id: int) -> None:
+    redis_client.delete(get_recommended_feeds_key(user_id))
+
+
+def rank_recommended_feed_ids(user_id: int) -> list:
+    """
+    Rank feeds for the user from the ANN top K instead of scoring every feed.
+
+    Feeds the user follows or blocked are skipped. Users without follows get
+    the most popular feeds.
+    """
+    feed_centroid = get_profile_vector(user_id).feed_centroid
+    followed_feed_ids = set(
+        FeedUserInterest.objects.filter(user_id=user_id).values_list(
+            "feed_id", flat=True
+        )
+    )
+    feeds = Feed.objects.filter(is_english=True, topic_embedding__isnull=False)
+
+    if feed_centroid is None:
+        popular_feed_ids = feeds.order_by("-popularity_percentile").values_list(
+            "id", flat=True
+        )[: RECOMMENDED_FEED_CANDIDATES + len(followed_feed_ids)]
+        return [
+            feed_id for feed_id in popular_feed_ids if feed_id not in followed_feed_ids
+        ]
+
+    with transaction.atomic():
+        set_hnsw_ef_search(RECOMMENDED_FEED_CANDIDATES)
+        # Half precision only picks the candidates, they are scored on the
+        # float32 embeddings
+        candidates = list(
+            feeds.annotate(
+                distance=CosineDistance("topic_embedding", feed_centroid)
+            )
+            .order_by(half_cosine_distance("topic_embedding", feed_centroid))
+            .values_list("id", "distance", "popularity_percentile")[
+                :RECOMMENDED_FEED_CANDIDATES
+            ]
+        )
+
+    scored_feeds = [
+        ((1 - distance) + popularity * POPULARITY_WEIGHT, feed_id)
+        for feed_id, distance, popularity in candidates
+        if feed_id not in followed_feed_ids
+    ]
+    scored_feeds.sort(key=lambda scored_feed: scored_feed[0], reverse=True)
+    return [feed_id for _, feed_id in scored_feeds]
+
+
+def get_recommended_feed_ids(user_id: int) -> list:
+    """The user's ranked feed ids, from the cache when their follows haven't changed."""
+    key = get_recommended_feeds_key(user_id)
+    cached = redis_client.get(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    feed_ids = rank_recommended_feed_ids(user_id)
+    redis_client.set(key, json.dumps(feed_ids), ex=RECOMMENDED_FEEDS_TTL)
+    return feed_ids
@@ -0,0 +1,101 @@
+import re
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import Lower
+from web.models import Feed, FeedTopic
+
+SEARCH_CONFIG = "english"
+# How much each signal counts towards a search result's score
+TEXT_RANK_WEIGHT = 1.0
+NAME_SIMILARITY_WEIGHT = 0.5
+POPULARITY_WEIGHT = 0.25
+AUTOCOMPLETE_LIMIT = 10
+
+
+def get_feed_search_vector():
+    """Name matches rank above topic matches, which rank above description matches."""
+    topics = Subquery(
+        FeedTopic.objects.filter(feed=OuterRef("pk"))
+        .values("feed")
+        .annotate(text=StringAgg("text", " "))
+        .values("text")
+    )
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(topics, weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def update_feed_search_vectors(feed_ids: list | None = None) -> int:
+    """
+    Recompute the search vector of the given feeds, or of every feed.
+
+    Call this after saving the feed, a later save() of an instance loaded
+    before the update would write the old vector back.
+
+    Returns:
+        int: The number of feeds updated.
+    """
+    feeds = Feed.objects.all()
+    if feed_ids is not None:
+        feeds = feeds.filter(id__in=feed_ids)
+    return feeds.update(search_vector=get_feed_search_vector())
+
+
+def search_feeds(queryset, query: str):
+    """
+    Full text search over name, topics and description plus typo tolerant
+    name matching, blended with popularity.
+    """
+    search_query = SearchQuery(query, search_type="websearch", config=SEARCH_CONFIG)
+    return (
+        queryset.filter(
+            Q(search_vector=search_query) | Q(name__trigram_similar=query)
+        )
+        .annotate(
+            text_rank=SearchRank(F("search_vector"), search_query),
+            similarity=TrigramSimilarity("name", query),
+        )
+        .annotate(
+            search_score=F("text_rank") * TEXT_RANK_WEIGHT
+            + F("similarity") * NAME_SIMILARITY_WEIGHT
+            + F("popularity_percentile") * POPULARITY_WEIGHT
+        )
+        .order_by("-search_score", "id")
+    )
+
+
+def get_prefix_query(query: str) -> SearchQuery | None:
+    """Turn "joe rog" into the tsquery joe & rog:* so the last word can be partial."""
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    terms = words[:-1] + [f"{words[-1]}:*"]
+    return SearchQuery(" & ".join(terms), search_type="raw", config=SEARCH_CONFIG)
+
+
+def autocomplete_feeds(queryset, query: str, limit: int = AUTOCOMPLETE_LIMIT):
+    """
+    Feeds whose name starts with the query, or that have words starting with
+    it, most popular first. Both branches are index scans so this stays fast
+    on every keystroke.
+    """
+    prefix_query = get_prefix_query(query)
+    if prefix_query is None:
+        return queryset.none()
+
+    return (
+        queryset.annotate(name_lower=Lower("name"))
+        .filter(
+            Q(name_lower__startswith=query.strip().lower())
+            | Q(search_vector=prefix_query)
+        )
+        .order_by("-popularity_percentile", "id")[:limit]
+    )
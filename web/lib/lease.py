@@ -0,0 +1,47 @@
+import uuid
+from web.lib.redis_client import redis_client
+
+# Only touch the lease if it is still held by the same token
+RELEASE_SCRIPT = redis_client.register_script(
+    """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("del", KEYS[1])
+    end
+    return 0
+    """
+)
+RENEW_SCRIPT = redis_client.register_script(
+    """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("expire", KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+)
+
+
+def claim_lease(key: str, ttl: int) -> str | None:
+    """
+    Claim an exclusive lease that expires on its own if the holder dies.
+
+    Args:
+        key (str): The key of the lease.
+        ttl (int): Seconds until the lease expires.
+
+    Returns:
+        str: A token proving ownership of the lease, or None if it is held.
+    """
+    token = uuid.uuid4().hex
+    if redis_client.set(key, token, nx=True, ex=ttl):
+        return token
+    return None
+
+
+def renew_lease(key: str, token: str, ttl: int) -> bool:
+    """Extend a lease, returns False if the lease was lost."""
+    return bool(RENEW_SCRIPT(keys=[key], args=[token, ttl]))
+
+
+def release_lease(key: str, token: str) -> bool:
+    """Release a lease, returns False if the lease was already lost."""
+    return bool(RELEASE_SCRIPT(keys=[key], args=[token]))
@@ -4,7 +4,9 @@ import requests
 from django.conf import settings
 
 
-def logsnag_log(event, description, icon, channel, user_id=None, notify=False):
+def logsnag_log(
+    event, description, icon, channel, user_id=None, notify=False, session=None
+):
     if settings.DEBUG:
         return
 
@@ -27,13 +29,15 @@ def logsnag_log(event, description, icon, channel, user_id=None, notify=False):
     }
 
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
+        response = (session or requests).post(
+            url, headers=headers, data=json.dumps(payload)
+        )
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(f"Error sending event to LogSnag: {e}")
 
 
-def logsnag_insight(title, value, icon):
+def logsnag_insight(title, value, icon, session=None):
     if settings.DEBUG:
         return
 
@@ -51,7 +55,9 @@ def logsnag_insight(title, value, icon):
     }
 
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
+        response = (session or requests).post(
+            url, headers=headers, data=json.dumps(payload)
+        )
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(f"Error sending insight to LogSnag: {e}")
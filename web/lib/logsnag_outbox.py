@@ -0,0 +1,113 @@
+import json
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from web.lib.logsnag import logsnag_insight, logsnag_log
+from web.lib.redis_client import redis_client
+from web.models import Clip, Feed, FeedItem
+
+LOGS_KEY = "logsnag:outbox:logs"
+STALE_INSIGHTS_KEY = "logsnag:outbox:stale-insights"
+# Oldest events are dropped past this so a LogSnag outage can't fill Redis
+MAX_QUEUED_LOGS = 10000
+# Events sent per flush, the rest wait for the next one
+FLUSH_BATCH_SIZE = 500
+
+# Insights kept up to date with table sizes
+TABLE_INSIGHTS = {
+    "Total Users": (User, "👥"),
+    "Total Podcasts": (Feed, "🎙️"),
+    "Total Episodes": (FeedItem, "🎧"),
+    "Total Clips": (Clip, "✂️"),
+}
+
+
+def queue_logsnag_log(event, description, icon, channel, user_id=None, notify=False):
+    """Queue an event for the next flush instead of calling LogSnag inline."""
+    if settings.DEBUG:
+        return
+
+    payload = {
+        "event": event,
+        "description": description,
+        "icon": icon,
+        "channel": channel,
+        "user_id": user_id,
+        "notify": notify,
+    }
+    try:
+        pipeline = redis_client.pipeline()
+        pipeline.rpush(LOGS_KEY, json.dumps(payload))
+        pipeline.ltrim(LOGS_KEY, -MAX_QUEUED_LOGS, -1)
+        pipeline.execute()
+    except Exception as e:
+        print(f"Error queueing LogSnag event: {e}")
+
+
+def mark_insight_stale(title: str) -> None:
+    """Have the next flush resend a table insight, however many rows changed."""
+    if settings.DEBUG:
+        return
+
+    try:
+        redis_client.sadd(STALE_INSIGHTS_KEY, title)
+    except Exception as e:
+        print(f"Error queueing LogSnag insight: {e}")
+
+
+def approximate_count(model) -> int:
+    """
+    The planner's row estimate for the model's table, kept fresh by autovacuum.
+
+    Falls back to an exact count for tables that were never analyzed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return model.objects.count()
+    return row[0]
+
+
+def pop_queued_logs(limit: int = FLUSH_BATCH_SIZE) -> list:
+    pipeline = redis_client.pipeline()
+    pipeline.lrange(LOGS_KEY, 0, limit - 1)
+    pipeline.ltrim(LOGS_KEY, limit, -1)
+    payloads, _ = pipeline.execute()
+    return [json.loads(payload) for payload in payloads]
+
+
+def pop_stale_insights() -> list:
+    pipeline = redis_client.pipeline()
+    pipeline.smembers(STALE_INSIGHTS_KEY)
+    pipeline.delete(STALE_INSIGHTS_KEY)
+    titles, _ = pipeline.execute()
+    return [title.decode() for title in titles]
+
+
+def flush_logsnag_outbox() -> dict:
+    """
+    Send queued events and one value per stale insight over a shared connection.
+
+    Returns:
+        dict: The number of events and insights sent.
+    """
+    logs = pop_queued_logs()
+    titles = [title for title in pop_stale_insights() if title in TABLE_INSIGHTS]
+
+    with requests.Session() as session:
+        for payload in logs:
+            logsnag_log(**payload, session=session)
+
+        for title in titles:
+            model, icon = TABLE_INSIGHTS[title]
+            try:
+                logsnag_insight(title, approximate_count(model), icon, session=session)
+            except Exception as e:
+                print(f"Error sending insight to LogSnag: {e}")
+
+    return {"logs": len(logs), "insights": len(titles)}
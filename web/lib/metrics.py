@@ -0,0 +1,17 @@
+from web.lib.redis_client import redis_client
+
+METRICS_KEY = "metrics:counters"
+
+
+def increment_metric(name: str, amount: int = 1) -> None:
+    """Increment a named counter, metrics should never break the caller."""
+    try:
+        redis_client.hincrby(METRICS_KEY, name, amount)
+    except Exception as e:
+        print(f"Error incrementing metric {name}: {e}")
+
+
+def get_metrics() -> dict:
+    """Get the current value of every counter."""
+    counters = redis_client.hgetall(METRICS_KEY)
+    return {name.decode(): int(value) for name, value in counters.items()}
@@ -0,0 +1,202 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Sum
+from web.models import (
+    Clip,
+    ClipUserView,
+    Feed,
+    FeedUserInterest,
+    UserProfileVector,
+    default_vector,
+)
+
+# A view longer than this is a positive signal, shorter than NEGATIVE a negative one
+POSITIVE_VIEW_DURATION = 90
+NEGATIVE_VIEW_DURATION = 30
+
+
+def get_view_kind(duration: int | None) -> str | None:
+    if duration is None:
+        return None
+    if duration > POSITIVE_VIEW_DURATION:
+        return "positive_clip"
+    if duration < NEGATIVE_VIEW_DURATION:
+        return "negative_clip"
+    return None
+
+
+def get_profile_vector(user_id: int) -> UserProfileVector:
+    """Get the user's profile vector, building it from their history if missing."""
+    profile = UserProfileVector.objects.filter(user_id=user_id).first()
+    if profile is None:
+        profile = rebuild_profile_vector(user_id)
+    return profile
+
+
+def rebuild_profile_vector(user_id: int) -> UserProfileVector:
+    """
+    Recompute a user's profile vector from scratch.
+
+    Incremental updates drift when feed or clip embeddings are recalculated,
+    so this also runs on a schedule to resync every profile.
+    """
+    feed_stats = FeedUserInterest.objects.filter(
+        user_id=user_id, is_interested=True
+    ).aggregate(
+        embedding_sum=Sum("feed__topic_embedding"),
+        count=Count("feed__topic_embedding"),
+    )
+    positive_stats = Clip.objects.filter(
+        user_views__user_id=user_id,
+        user_views__duration__gt=POSITIVE_VIEW_DURATION,
+    ).aggregate(
+        embedding_sum=Sum("transcript_embedding"), count=Count("transcript_embedding")
+    )
+    negative_stats = Clip.objects.filter(
+        user_views__user_id=user_id,
+        user_views__duration__lt=NEGATIVE_VIEW_DURATION,
+    ).aggregate(
+        embedding_sum=Sum("transcript_embedding"), count=Count("transcript_embedding")
+    )
+
+    def embedding_sum(stats):
+        if stats["embedding_sum"] is None:
+            return default_vector()
+        return stats["embedding_sum"]
+
+    profile, _ = UserProfileVector.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            "feed_embedding_sum": embedding_sum(feed_stats),
+            "feed_count": feed_stats["count"],
+            "positive_clip_embedding_sum": embedding_sum(positive_stats),
+            "positive_clip_count": positive_stats["count"],
+            "negative_clip_embedding_sum": embedding_sum(negative_stats),
+            "negative_clip_count": negative_stats["count"],
+            "interest_count": FeedUserInterest.objects.filter(user_id=user_id).count(),
+            "view_count": ClipUserView.objects.filter(user_id=user_id).count(),
+        },
+    )
+    return profile
+
+
+def update_profile_vector(
+    user_id: int,
+    embedding_deltas: dict,
+    count_deltas: dict,
+    rebuild_if_missing: bool = True,
+) -> None:
+    """
+    Apply running sum changes to a user's profile vector.
+
+    Args:
+        user_id (int): The user whose profile changed.
+        embedding_deltas (dict): Maps a centroid name (feed, positive_clip,
+            negative_clip) to a list of (embedding, sign) pairs.
+        count_deltas (dict): Maps a count field (interest_count, view_count)
+            to how much it changed.
+        rebuild_if_missing (bool): Build the profile if the user has none yet.
+            Deletes pass False so a user being deleted isn't given a new profile.
+    """
+    with transaction.atomic():
+        profile = (
+            UserProfileVector.objects.select_for_update()
+            .filter(user_id=user_id)
+            .first()
+        )
+        if profile is None:
+            # Building from the history already includes this change
+            if rebuild_if_missing:
+                rebuild_profile_vector(user_id)
+            return
+
+        for name, changes in embedding_deltas.items():
+            embedding_sum = np.asarray(
+                getattr(profile, f"{name}_embedding_sum"), dtype=np.float32
+            )
+            count = getattr(profile, f"{name}_count")
+            for embedding, sign in changes:
+                embedding_sum = embedding_sum + sign * np.asarray(
+                    embedding, dtype=np.float32
+                )
+                count += sign
+            setattr(profile, f"{name}_embedding_sum", embedding_sum)
+            setattr(profile, f"{name}_count", count)
+
+        for name, delta in count_deltas.items():
+            setattr(profile, name, getattr(profile, name) + delta)
+
+        profile.save()
+
+
+def apply_view_change(
+    view: ClipUserView, old_duration: int | None, new_duration: int | None
+) -> None:
+    """Update the profile when a view is created, extended or deleted."""
+    old_kind = get_view_kind(old_duration)
+    new_kind = get_view_kind(new_duration)
+    count_deltas = {}
+    if old_duration is None and new_duration is not None:
+        count_deltas["view_count"] = 1
+    elif old_duration is not None and new_duration is None:
+        count_deltas["view_count"] = -1
+
+    if old_kind == new_kind and not count_deltas:
+        return
+
+    embedding_deltas = {}
+    embedding = None
+    if old_kind != new_kind:
+        embedding = (
+            Clip.objects.filter(id=view.clip_id)
+            .values_list("transcript_embedding", flat=True)
+            .first()
+        )
+    if embedding is not None:
+        if old_kind:
+            embedding_deltas.setdefault(old_kind, []).append((embedding, -1))
+        if new_kind:
+            embedding_deltas.setdefault(new_kind, []).append((embedding, 1))
+
+    update_profile_vector(
+        view.user_id,
+        embedding_deltas,
+        count_deltas,
+        rebuild_if_missing=new_duration is not None,
+    )
+
+
+def apply_interest_change(
+    interest: FeedUserInterest,
+    old_is_interested: bool | None,
+    new_is_interested: bool | None,
+) -> None:
+    """Update the profile when a follow/block is created, changed or deleted."""
+    count_deltas = {}
+    if old_is_interested is None and new_is_interested is not None:
+        count_deltas["interest_count"] = 1
+    elif old_is_interested is not None and new_is_interested is None:
+        count_deltas["interest_count"] = -1
+
+    was_following = old_is_interested is True
+    is_following = new_is_interested is True
+    if was_following == is_following and not count_deltas:
+        return
+
+    embedding_deltas = {}
+    embedding = None
+    if was_following != is_following:
+        embedding = (
+            Feed.objects.filter(id=interest.feed_id)
+            .values_list("topic_embedding", flat=True)
+            .first()
+        )
+    if embedding is not None:
+        embedding_deltas["feed"] = [(embedding, 1 if is_following else -1)]
+
+    update_profile_vector(
+        interest.user_id,
+        embedding_deltas,
+        count_deltas,
+        rebuild_if_missing=new_is_interested is not None,
+    )
@@ -0,0 +1,146 @@
+import time
+from web.lib.metrics import increment_metric
+from web.lib.ranking import get_excluded_ids
+from web.lib.redis_client import redis_client
+
+# How many ranked clips to keep per user, enough for several app opens
+QUEUE_SIZE = 60
+# Queues older than this are refreshed synchronously instead of served
+QUEUE_MAX_STALENESS = 60 * 60
+# Queues of users that haven't opened the app in a week are dropped
+QUEUE_TTL = 60 * 60 * 24 * 7
+# Users that opened the app this recently get their queue refreshed for new clips
+ACTIVE_USER_WINDOW = 60 * 60 * 24
+ACTIVE_USERS_KEY = "queue:active-users"
+
+# Remove the served clips (ARGV[2] to ARGV[ARGV[1] + 1]) along with the stale
+# ones, but only if none of the served clips were popped by another request
+POP_SCRIPT = redis_client.register_script(
+    """
+    local served_count = tonumber(ARGV[1])
+    for i = 2, served_count + 1 do
+        if not redis.call("zscore", KEYS[1], ARGV[i]) then
+            return 0
+        end
+    end
+    if #ARGV > 1 then
+        redis.call("zrem", KEYS[1], unpack(ARGV, 2))
+    end
+    return 1
+    """
+)
+
+
+def get_queue_key(user_id: int) -> str:
+    return f"queue:{user_id}"
+
+
+def get_queue_refreshed_at_key(user_id: int) -> str:
+    return f"queue:{user_id}:refreshed-at"
+
+
+def store_queue(user_id: int, ranked_clips: list) -> None:
+    """
+    Replace the user's queue with freshly ranked clips.
+
+    Args:
+        user_id (int): The user the queue belongs to.
+        ranked_clips (list): (clip_id, feed_id, score) tuples, best first.
+    """
+    queue_key = get_queue_key(user_id)
+    pipeline = redis_client.pipeline()
+    pipeline.delete(queue_key)
+    if ranked_clips:
+        # Members carry the feed id so pops can keep one clip per feed
+        pipeline.zadd(
+            queue_key,
+            {f"{clip_id}:{feed_id}": score for clip_id, feed_id, score in ranked_clips},
+        )
+        pipeline.expire(queue_key, QUEUE_TTL)
+    pipeline.set(get_queue_refreshed_at_key(user_id), time.time(), ex=QUEUE_TTL)
+    pipeline.execute()
+
+
+def mark_user_active(user_id: int) -> None:
+    redis_client.zadd(ACTIVE_USERS_KEY, {user_id: time.time()})
+
+
+def get_active_user_ids() -> list:
+    now = time.time()
+    redis_client.zremrangebyscore(ACTIVE_USERS_KEY, 0, now - QUEUE_TTL)
+    user_ids = redis_client.zrangebyscore(
+        ACTIVE_USERS_KEY, now - ACTIVE_USER_WINDOW, now
+    )
+    return [int(user_id) for user_id in user_ids]
+
+
+def pop_queue_clip_ids(user, exclude_clip_ids: list, limit: int = 9) -> list | None:
+    """
+    Serve the next clips from the user's precomputed queue.
+
+    Clips the user has seen since the queue was ranked are filtered out and the
+    served clips are removed from the queue atomically, so concurrent requests
+    never serve the same clips.
+
+    Returns:
+        list: The clip ids to serve, or None if the queue is missing, stale or
+            too short and the caller should rank synchronously.
+    """
+    mark_user_active(user.id)
+
+    queue_key = get_queue_key(user.id)
+    pipeline = redis_client.pipeline()
+    pipeline.get(get_queue_refreshed_at_key(user.id))
+    pipeline.zrevrange(queue_key, 0, -1)
+    refreshed_at, members = pipeline.execute()
+
+    if refreshed_at is None:
+        increment_metric("queue_cache_miss")
+        return None
+
+    staleness = time.time() - float(refreshed_at)
+    if staleness > QUEUE_MAX_STALENESS:
+        increment_metric("queue_cache_stale")
+        return None
+
+    queue = []
+    for member in members:
+        clip_id, feed_id = member.decode().split(":")
+        queue.append((member, int(clip_id), int(feed_id)))
+
+    # Filter out anything viewed, skipped or blocked since the queue was ranked,
+    # and the feeds of clips the client is still playing
+    excluded_clip_ids, _, excluded_feed_ids = get_excluded_ids(
+        user, [clip_id for _, clip_id, _ in queue], [], exclude_clip_ids
+    )
+
+    served = []
+    stale_members = []
+    for member, clip_id, feed_id in queue:
+        if clip_id in excluded_clip_ids:
+            stale_members.append(member)
+            continue
+        if feed_id in excluded_feed_ids:
+            continue
+        excluded_feed_ids.add(feed_id)
+        served.append((member, clip_id))
+        if len(served) == limit:
+            break
+
+    if len(served) < limit:
+        increment_metric("queue_cache_miss")
+        return None
+
+    # Another request popped some of the same clips, rank this one live
+    # rather than serve them twice
+    served_members = [member for member, _ in served]
+    if not POP_SCRIPT(
+        keys=[queue_key],
+        args=[len(served_members), *served_members, *stale_members],
+    ):
+        increment_metric("queue_cache_conflict")
+        return None
+
+    increment_metric("queue_cache_hit")
+    increment_metric("queue_cache_staleness_seconds", int(staleness))
+    return [clip_id for _, clip_id in served]
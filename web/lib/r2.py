@@ -1,4 +1,6 @@
 import os
+import time
+import uuid
 import hashlib
 import json
 import boto3
@@ -17,10 +19,24 @@ r2 = boto3.client(
 )
 bucket_name = settings.R2_BUCKET_NAME
 
+# R2 requires every part except the last to be at least 5MB
+AUDIO_PART_SIZE = 8 * 1024 * 1024
+AUDIO_READ_SIZE = 64 * 1024
+AUDIO_REQUEST_TIMEOUT = (10, 60)  # Connect and per-read timeouts in seconds
+AUDIO_DOWNLOAD_TIMEOUT = 15 * 60  # Total time allowed for a single download
+
+
+class AudioTooLargeError(Exception):
+    pass
+
 
 def handle_r2_audio_upload(audio_url: str) -> str:
     """
-    Check if the audio file exists in the R2 bucket and upload if it doesn't.
+    Stream the audio file into the R2 bucket, keyed by a hash of its content.
+
+    The file is downloaded once, hashed and uploaded in parts as it streams in,
+    so identical audio behind different (e.g. tracking redirect) URLs ends up
+    under the same key and is only transcribed once.
 
     Args:
         audio_url (str): The URL of the audio file to upload.
@@ -29,28 +45,92 @@ def handle_r2_audio_upload(audio_url: str) -> str:
         str: The key of the file in the R2 bucket.
 
     Raises:
-        Exception: If there's an error checking the bucket or uploading the file.
+        AudioTooLargeError: If the file is larger than AUDIO_MAX_BYTES.
+        requests.Timeout: If the download takes longer than AUDIO_DOWNLOAD_TIMEOUT.
+        Exception: If there's an error downloading or uploading the file.
     """
-    url_hash = hashlib.md5(audio_url.encode()).hexdigest()
-    audio_bucket_key = f"audio-{url_hash}"
+    upload_key = f"upload-{uuid.uuid4().hex}"
+    content_hash = hashlib.sha256()
+    started_at = time.monotonic()
+
+    with requests.get(audio_url, stream=True, timeout=AUDIO_REQUEST_TIMEOUT) as r:
+        r.raise_for_status()
+
+        # Bail out before downloading anything if the server tells us the size
+        content_length = int(r.headers.get("Content-Length") or 0)
+        if content_length > settings.AUDIO_MAX_BYTES:
+            raise AudioTooLargeError(
+                f"Audio file is {content_length} bytes: {audio_url}"
+            )
+
+        upload = r2.create_multipart_upload(Bucket=bucket_name, Key=upload_key)
+        try:
+            parts = []
+            size = 0
+            buffer = bytearray()
+
+            def upload_part(body):
+                part_number = len(parts) + 1
+                response = r2.upload_part(
+                    Body=bytes(body),
+                    Bucket=bucket_name,
+                    Key=upload_key,
+                    PartNumber=part_number,
+                    UploadId=upload["UploadId"],
+                )
+                parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+            for chunk in r.iter_content(chunk_size=AUDIO_READ_SIZE):
+                size += len(chunk)
+                if size > settings.AUDIO_MAX_BYTES:
+                    raise AudioTooLargeError(
+                        f"Audio file is over {settings.AUDIO_MAX_BYTES} bytes: {audio_url}"
+                    )
+                if time.monotonic() - started_at > AUDIO_DOWNLOAD_TIMEOUT:
+                    raise requests.Timeout(f"Audio download timed out: {audio_url}")
+
+                content_hash.update(chunk)
+                buffer.extend(chunk)
+                if len(buffer) >= AUDIO_PART_SIZE:
+                    upload_part(buffer)
+                    buffer.clear()
+
+            if size == 0:
+                raise ValueError(f"Audio file is empty: {audio_url}")
+            if buffer:
+                upload_part(buffer)
+
+            r2.complete_multipart_upload(
+                Bucket=bucket_name,
+                Key=upload_key,
+                UploadId=upload["UploadId"],
+                MultipartUpload={"Parts": parts},
+            )
+        except Exception:
+            r2.abort_multipart_upload(
+                Bucket=bucket_name, Key=upload_key, UploadId=upload["UploadId"]
+            )
+            raise
+
+    audio_bucket_key = f"audio-{content_hash.hexdigest()}"
 
     try:
-        # Check if the file already exists in the R2 bucket
+        # Check if the same audio was already uploaded from another URL
         r2.head_object(Bucket=bucket_name, Key=audio_bucket_key)
         print(f"Audio file already exists in R2: {audio_bucket_key}")
     except ClientError as e:
         if e.response["Error"]["Code"] == "404":
-            # File doesn't exist, so we upload it
-            with requests.get(audio_url, stream=True) as r:
-                r.raise_for_status()
-                r2.upload_fileobj(
-                    Fileobj=r.raw,
-                    Bucket=bucket_name,
-                    Key=audio_bucket_key,
-                )
-            print(f"Uploaded audio file to R2: {audio_bucket_key}")
+            # Move the upload to its content addressed key, this is server side
+            r2.copy_object(
+                Bucket=bucket_name,
+                Key=audio_bucket_key,
+                CopySource={"Bucket": bucket_name, "Key": upload_key},
+            )
+            print(f"Uploaded audio file to R2: {audio_bucket_key} ({size} bytes)")
         else:
             raise
+    finally:
+        r2.delete_object(Bucket=bucket_name, Key=upload_key)
 
     return audio_bucket_key
 
@@ -0,0 +1,332 @@
+import time
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from pgvector.django import CosineDistance
+from web.lib.ranking_engine import (
+    get_clip_similarities,
+    get_feed_similarities,
+    ranking_engine,
+)
+from web.lib.ranking_features import rankable_clips
+from web.lib.seen_set import get_seen_exclusions
+from web.lib.vector_search import half_cosine_distance
+from web.models import ClipCategoryScore, ClipRankingFeatures, Feed
+
+# Candidate generation, every source is a cheap index scan
+CLIP_CANDIDATES = 300  # Nearest clips to the user's positive clip centroid
+FEED_CANDIDATES = 50  # Nearest feeds to the user's feed centroid
+FEED_CLIP_CANDIDATES = 300  # Newest clips from the nearest feeds
+RECENT_CLIP_CANDIDATES = 300  # Newest clips overall, keeps fresh clips in the running
+TOPIC_CLIP_CANDIDATES = 300  # Newest clips in the requested topics
+
+# HNSW only returns up to ef_search rows, so it has to cover the largest limit
+HNSW_EF_SEARCH = 300
+
+# Users with fewer views than this are ranked on their followed feeds only
+WARM_START_VIEWS = 10
+
+# Best scored clips checked against the user's history at a time by the
+# in-memory backend
+IN_MEMORY_EXCLUSION_BATCH_SIZE = 500
+
+
+def set_hnsw_ef_search(ef_search: int = HNSW_EF_SEARCH) -> None:
+    """Set ef_search for the current transaction."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"SET LOCAL hnsw.ef_search = {int(ef_search)}")
+
+
+def get_candidate_clip_ids(profile, topic_ids: list) -> set:
+    """
+    Stage one: gather a few hundred plausible clips from the HNSW indexes and
+    the created_at index instead of scoring every clip.
+
+    Clip sources read the partial indexes on the ranking features table, so
+    only English clips with embeddings are ever candidates.
+    """
+    candidate_ids = set()
+    feed_ids = []
+
+    with transaction.atomic():
+        set_hnsw_ef_search()
+
+        positive_centroid = profile.positive_clip_centroid
+        if profile.view_count >= WARM_START_VIEWS and positive_centroid is not None:
+            candidate_ids.update(
+                rankable_clips()
+                .order_by(CosineDistance("transcript_embedding", positive_centroid))
+                .values_list("clip_id", flat=True)[:CLIP_CANDIDATES]
+            )
+
+        feed_centroid = profile.feed_centroid
+        if feed_centroid is not None:
+            feed_ids = list(
+                Feed.objects.filter(is_english=True, topic_embedding__isnull=False)
+                .order_by(half_cosine_distance("topic_embedding", feed_centroid))
+                .values_list("id", flat=True)[:FEED_CANDIDATES]
+            )
+
+    if feed_ids:
+        candidate_ids.update(
+            rankable_clips()
+            .filter(feed_id__in=feed_ids)
+            .order_by("-created_at")
+            .values_list("clip_id", flat=True)[:FEED_CLIP_CANDIDATES]
+        )
+
+    if topic_ids:
+        candidate_ids.update(
+            ClipCategoryScore.objects.filter(
+                category_id__in=topic_ids, score__gt=0
+            )
+            .order_by("-created_at")
+            .values_list("clip_id", flat=True)[:TOPIC_CLIP_CANDIDATES]
+        )
+    else:
+        candidate_ids.update(
+            rankable_clips()
+            .order_by("-created_at")
+            .values_list("clip_id", flat=True)[:RECENT_CLIP_CANDIDATES]
+        )
+
+    return candidate_ids
+
+
+def get_excluded_ids(
+    user, clip_ids: list, feed_item_ids: list, exclude_clip_ids: list
+) -> tuple:
+    """
+    Get the clips, feed items and feeds the user shouldn't be shown.
+
+    History lookups go through the user's seen set, so the cost depends on the
+    number of candidates rather than how many clips the user has viewed.
+    """
+    exclude_clip_ids = {int(id) for id in exclude_clip_ids if str(id).isdigit()}
+    viewed_clip_ids, excluded_feed_item_ids, excluded_feed_ids = get_seen_exclusions(
+        user.id, set(clip_ids) | exclude_clip_ids, feed_item_ids
+    )
+
+    # Exclude feeds that have clips in exclude_clip_ids but not viewed because
+    # they were likely viewed and not completed
+    unviewed_clip_ids = exclude_clip_ids - viewed_clip_ids
+    if unviewed_clip_ids:
+        excluded_feed_ids.update(
+            ClipRankingFeatures.objects.filter(
+                clip_id__in=unviewed_clip_ids
+            ).values_list("feed_id", flat=True)
+        )
+
+    viewed_clip_ids.update(exclude_clip_ids)
+    return viewed_clip_ids, excluded_feed_item_ids, excluded_feed_ids
+
+
+def rank_queue_clip_ids(
+    user, profile, exclude_clip_ids: list, topic_ids: list, limit: int = 9
+) -> list:
+    """Rank the user's queue and return the ids of the top clip from each feed."""
+    ranked_clips = rank_queue_clips(user, profile, exclude_clip_ids, topic_ids, limit)
+    return [clip_id for clip_id, _, _ in ranked_clips]
+
+
+def rank_queue_clips(
+    user, profile, exclude_clip_ids: list, topic_ids: list, limit: int = 9
+) -> list:
+    """
+    Rank the user's queue and return (clip_id, feed_id, score) for the top
+    clip from each feed.
+
+    Stage one pulls candidates from the ANN indexes, stage two scores only
+    those candidates and applies exclusions and one clip per feed in Python.
+    With RANKING_BACKEND set to "numpy" every recent clip is scored in memory
+    instead.
+    """
+    if settings.RANKING_BACKEND == "numpy":
+        return rank_queue_clips_in_memory(
+            user, profile, exclude_clip_ids, topic_ids, limit
+        )
+
+    candidate_ids = get_candidate_clip_ids(profile, topic_ids)
+    if not candidate_ids:
+        return []
+
+    if topic_ids:
+        candidate_ids &= set(
+            ClipCategoryScore.objects.filter(
+                clip_id__in=candidate_ids, category_id__in=topic_ids, score__gt=0
+            ).values_list("clip_id", flat=True)
+        )
+
+    is_warm = profile.view_count >= WARM_START_VIEWS
+    # Everything is read from the denormalized features, no joins
+    candidates = (
+        rankable_clips()
+        .filter(clip_id__in=candidate_ids)
+        .annotate(
+            feed_score=CosineDistance("feed_topic_embedding", profile.feed_centroid),
+        )
+    )
+    fields = [
+        "clip_id",
+        "feed_id",
+        "feed_item_id",
+        "created_at",
+        "popularity_percentile",
+        "feed_score",
+    ]
+    if is_warm:
+        candidates = candidates.annotate(
+            positive_clip_score=CosineDistance(
+                "transcript_embedding", profile.positive_clip_centroid
+            ),
+            negative_clip_score=CosineDistance(
+                "transcript_embedding", profile.negative_clip_centroid
+            ),
+        )
+        fields += ["positive_clip_score", "negative_clip_score"]
+
+    rows = list(candidates.values_list(*fields))
+
+    # Apply the user's exclusions in memory
+    viewed_clip_ids, excluded_feed_item_ids, excluded_feed_ids = get_excluded_ids(
+        user, [row[0] for row in rows], [row[2] for row in rows], exclude_clip_ids
+    )
+    rows = [
+        row
+        for row in rows
+        if row[0] not in viewed_clip_ids
+        and row[1] not in excluded_feed_ids
+        and row[2] not in excluded_feed_item_ids
+    ]
+    if not rows:
+        return []
+
+    # Score every candidate at once
+    now = timezone.now()
+    clip_ids = np.array([row[0] for row in rows])
+    feed_ids = np.array([row[1] for row in rows])
+    days_old = np.array([(now - row[3]).days for row in rows], dtype=np.float32)
+    popularity = np.array([row[4] for row in rows], dtype=np.float32)
+    distances = np.array(
+        [[np.nan if value is None else value for value in row[5:]] for row in rows],
+        dtype=np.float32,
+    )
+    scores = combine_scores(
+        distances[:, 0],
+        popularity,
+        days_old,
+        distances[:, 1] if is_warm else None,
+        distances[:, 2] if is_warm else None,
+    )
+
+    return top_clip_per_feed(
+        np.argsort(-scores, kind="stable"), clip_ids, feed_ids, scores, limit
+    )
+
+
+def rank_queue_clips_in_memory(
+    user, profile, exclude_clip_ids: list, topic_ids: list, limit: int = 9
+) -> list:
+    """
+    Score every clip held by the ranking engine with one matrix-vector product
+    per centroid, then check the best ones against the user's history.
+    """
+    state = ranking_engine.get_state()
+    if not len(state.clip_ids) or profile.feed_centroid is None:
+        return []
+
+    is_warm = profile.view_count >= WARM_START_VIEWS
+    days_old = np.floor((time.time() - state.created_at) / (60 * 60 * 24))
+    scores = combine_scores(
+        1 - get_feed_similarities(state, profile.feed_centroid),
+        state.popularity,
+        days_old,
+        1 - get_clip_similarities(state, profile.positive_clip_centroid)
+        if is_warm
+        else None,
+        1 - get_clip_similarities(state, profile.negative_clip_centroid)
+        if is_warm
+        else None,
+    )
+    order = np.argsort(-scores, kind="stable")
+
+    if topic_ids:
+        # Same topic candidates as the ANN path, the newest clips in the topics
+        topic_clip_ids = list(
+            ClipCategoryScore.objects.filter(category_id__in=topic_ids, score__gt=0)
+            .order_by("-created_at")
+            .values_list("clip_id", flat=True)[:TOPIC_CLIP_CANDIDATES]
+        )
+        order = order[np.isin(state.clip_ids[order], topic_clip_ids)]
+
+    # Walk down the ranking until enough feeds survive the exclusions
+    ranked_clips = []
+    seen_feed_ids = set()
+    for start in range(0, len(order), IN_MEMORY_EXCLUSION_BATCH_SIZE):
+        batch = order[start : start + IN_MEMORY_EXCLUSION_BATCH_SIZE]
+        viewed_clip_ids, excluded_feed_item_ids, excluded_feed_ids = get_excluded_ids(
+            user,
+            state.clip_ids[batch].tolist(),
+            state.feed_item_ids[batch].tolist(),
+            exclude_clip_ids,
+        )
+        batch = [
+            index
+            for index in batch
+            if state.clip_ids[index] not in viewed_clip_ids
+            and state.feed_ids[index] not in excluded_feed_ids
+            and state.feed_item_ids[index] not in excluded_feed_item_ids
+        ]
+        ranked_clips += top_clip_per_feed(
+            batch,
+            state.clip_ids,
+            state.feed_ids,
+            scores,
+            limit - len(ranked_clips),
+            seen_feed_ids,
+        )
+        if len(ranked_clips) == limit:
+            break
+
+    return ranked_clips
+
+
+def combine_scores(
+    feed_distance, popularity, days_old, positive_distance=None, negative_distance=None
+):
+    """
+    Blend the cosine distances, popularity and age of candidate clips.
+
+    NULL distances score 0 like the SQL CASE did. Warm users pass the
+    distances to their positive and negative clip centroids.
+    """
+    recency_score = 1 / (1 + days_old / 7)
+    scores = (1 - feed_distance) + popularity * 0.25 + recency_score * 0.5
+    if positive_distance is not None:
+        scores += (1 - positive_distance) + negative_distance
+    return np.where(np.isnan(scores), 0, scores)
+
+
+def top_clip_per_feed(
+    order, clip_ids, feed_ids, scores, limit: int, seen_feed_ids: set | None = None
+) -> list:
+    """
+    Walk the candidates in order and keep the first clip of each feed.
+
+    Returns:
+        list: (clip_id, feed_id, score) tuples, at most limit of them.
+    """
+    ranked_clips = []
+    seen_feed_ids = set() if seen_feed_ids is None else seen_feed_ids
+    for index in order:
+        if len(ranked_clips) == limit:
+            break
+        if feed_ids[index] in seen_feed_ids:
+            continue
+        seen_feed_ids.add(feed_ids[index])
+        ranked_clips.append(
+            (int(clip_ids[index]), int(feed_ids[index]), float(scores[index]))
+        )
+
+    return ranked_clips
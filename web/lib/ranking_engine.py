@@ -0,0 +1,258 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from web.lib.ranking_features import rankable_clips
+from web.models import Feed
+
+EMBEDDING_DIMENSIONS = 768
+# Changed clips are loaded this often, a full reload also picks up feed
+# embedding changes and drops clips that are no longer rankable
+REFRESH_INTERVAL = 60
+RELOAD_INTERVAL = 60 * 60
+# Rows are read from this long before the last load, so rows committed a
+# little after their updated_at aren't skipped by the watermark
+REFRESH_OVERLAP = timedelta(minutes=5)
+# Rows converted to float32 at once when the matrix is stored as float16
+SCORING_CHUNK_SIZE = 16384
+
+# Parallel arrays, one row per clip, with unit length embeddings so cosine
+# similarity is a dot product. Replaced whole on refresh, so a request
+# always scores one consistent snapshot without locking.
+EngineState = namedtuple(
+    "EngineState",
+    [
+        "clip_ids",
+        "feed_ids",
+        "feed_item_ids",
+        "created_at",  # Epoch seconds
+        "popularity",
+        "embeddings",
+        "feed_rows",  # Row of each clip's feed in feed_embeddings
+        "feed_embeddings",
+        "feed_row_by_id",
+        "loaded_at",  # Watermark on updated_at, None before the first load
+    ],
+)
+# The EngineState fields with one entry per clip
+CLIP_FIELDS = [
+    "clip_ids",
+    "feed_ids",
+    "feed_item_ids",
+    "created_at",
+    "popularity",
+    "embeddings",
+    "feed_rows",
+]
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1)
+
+
+def empty_state() -> EngineState:
+    dtype = settings.RANKING_ENGINE_DTYPE
+    return EngineState(
+        clip_ids=np.empty(0, dtype=np.int64),
+        feed_ids=np.empty(0, dtype=np.int64),
+        feed_item_ids=np.empty(0, dtype=np.int64),
+        created_at=np.empty(0, dtype=np.float64),
+        popularity=np.empty(0, dtype=np.float32),
+        embeddings=np.empty((0, EMBEDDING_DIMENSIONS), dtype=dtype),
+        feed_rows=np.empty(0, dtype=np.int64),
+        feed_embeddings=np.empty((0, EMBEDDING_DIMENSIONS), dtype=np.float32),
+        feed_row_by_id={},
+        loaded_at=None,
+    )
+
+
+def select_clips(state: EngineState, keep) -> EngineState:
+    """Keep the clips where the boolean mask is set."""
+    if keep.all():
+        return state
+    return state._replace(
+        **{field: getattr(state, field)[keep] for field in CLIP_FIELDS}
+    )
+
+
+class RankingEngine:
+    """
+    The rankable clips of the last RANKING_ENGINE_WINDOW_DAYS held in process
+    memory, so scoring every one of them is a matrix-vector product instead
+    of an ANN query per request.
+    """
+
+    def __init__(self):
+        self.state = empty_state()
+        self.refresh_lock = threading.Lock()
+        self.refreshed_at = 0
+        self.reloaded_at = 0
+
+    def get_state(self) -> EngineState:
+        """The current snapshot, refreshed in the background when it's stale."""
+        if not self.refreshed_at:
+            # Cold start, the first request waits for the initial load
+            with self.refresh_lock:
+                if not self.refreshed_at:
+                    self.refresh()
+        elif time.time() - self.refreshed_at > REFRESH_INTERVAL:
+            if self.refresh_lock.acquire(blocking=False):
+                threading.Thread(
+                    target=self.refresh_in_background, daemon=True
+                ).start()
+        return self.state
+
+    def refresh(self) -> None:
+        now = time.time()
+        if now - self.reloaded_at > RELOAD_INTERVAL:
+            self.state = self.load(empty_state())
+            self.reloaded_at = now
+        else:
+            self.state = self.load(self.state)
+        self.refreshed_at = now
+
+    def refresh_in_background(self) -> None:
+        # Requests keep scoring the previous snapshot meanwhile
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Error refreshing the ranking engine: {e}")
+        finally:
+            self.refresh_lock.release()
+            # The thread has its own connection, don't leave it open
+            connection.close()
+
+    def load(self, state: EngineState) -> EngineState:
+        """
+        Load the clips whose features changed since the state was loaded.
+
+        New clips are appended and clips already in the state are replaced,
+        so popularity changes and clips that became rankable are picked up
+        without waiting for the full reload.
+        """
+        loaded_at = timezone.now()
+        window_start = loaded_at - timedelta(days=settings.RANKING_ENGINE_WINDOW_DAYS)
+        clips = rankable_clips().filter(created_at__gte=window_start)
+        if state.loaded_at is not None:
+            clips = clips.filter(updated_at__gt=state.loaded_at - REFRESH_OVERLAP)
+        rows = list(
+            clips.order_by("-created_at").values_list(
+                "clip_id",
+                "feed_id",
+                "feed_item_id",
+                "created_at",
+                "popularity_percentile",
+                "transcript_embedding",
+            )[: settings.RANKING_ENGINE_MAX_CLIPS]
+        )
+        if not rows:
+            return state._replace(loaded_at=loaded_at)
+
+        clip_ids, feed_ids, feed_item_ids, created_ats, popularity, embeddings = zip(
+            *rows
+        )
+        feed_row_by_id = dict(state.feed_row_by_id)
+        feed_embeddings = state.feed_embeddings
+        new_feed_ids = [
+            feed_id for feed_id in set(feed_ids) if feed_id not in feed_row_by_id
+        ]
+        if new_feed_ids:
+            new_feeds = list(
+                Feed.objects.filter(id__in=new_feed_ids).values_list(
+                    "id", "topic_embedding"
+                )
+            )
+            for feed_id, _ in new_feeds:
+                feed_row_by_id[feed_id] = len(feed_row_by_id)
+            new_feed_embeddings = np.array(
+                [embedding for _, embedding in new_feeds], dtype=np.float32
+            ).reshape(-1, EMBEDDING_DIMENSIONS)
+            feed_embeddings = np.concatenate(
+                [feed_embeddings, normalize_rows(new_feed_embeddings)]
+            )
+
+        # Features hold half precision embeddings, scoring is done in float32
+        new_embeddings = normalize_rows(
+            np.array(
+                [embedding.to_numpy() for embedding in embeddings], dtype=np.float32
+            )
+        )
+        new_created_at = np.array([value.timestamp() for value in created_ats])
+        state = select_clips(state, ~np.isin(state.clip_ids, clip_ids))
+        state = EngineState(
+            clip_ids=np.concatenate([state.clip_ids, np.array(clip_ids)]),
+            feed_ids=np.concatenate([state.feed_ids, np.array(feed_ids)]),
+            feed_item_ids=np.concatenate(
+                [state.feed_item_ids, np.array(feed_item_ids)]
+            ),
+            created_at=np.concatenate([state.created_at, new_created_at]),
+            popularity=np.concatenate(
+                [state.popularity, np.array(popularity, dtype=np.float32)]
+            ),
+            embeddings=np.concatenate(
+                [
+                    state.embeddings,
+                    new_embeddings.astype(settings.RANKING_ENGINE_DTYPE),
+                ]
+            ),
+            feed_rows=np.concatenate(
+                [
+                    state.feed_rows,
+                    np.array([feed_row_by_id[feed_id] for feed_id in feed_ids]),
+                ]
+            ),
+            feed_embeddings=feed_embeddings,
+            feed_row_by_id=feed_row_by_id,
+            loaded_at=loaded_at,
+        )
+
+        # Drop clips that aged out of the window or past the size limit
+        keep = state.created_at >= window_start.timestamp()
+        if keep.sum() > settings.RANKING_ENGINE_MAX_CLIPS:
+            newest = np.argsort(-state.created_at, kind="stable")
+            keep[newest[settings.RANKING_ENGINE_MAX_CLIPS :]] = False
+        return select_clips(state, keep)
+
+
+def get_unit_vector(vector):
+    if vector is None:
+        return None
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        return None
+    return vector / norm
+
+
+def get_clip_similarities(state: EngineState, vector):
+    """Cosine similarity of every clip to the vector, NaN when it has no direction."""
+    unit_vector = get_unit_vector(vector)
+    if unit_vector is None:
+        return np.full(len(state.clip_ids), np.nan, dtype=np.float32)
+    if state.embeddings.dtype == np.float32:
+        return state.embeddings @ unit_vector
+    # NumPy has no BLAS path for float16, convert a slice at a time instead
+    return np.concatenate(
+        [
+            state.embeddings[start : start + SCORING_CHUNK_SIZE].astype(np.float32)
+            @ unit_vector
+            for start in range(0, len(state.embeddings), SCORING_CHUNK_SIZE)
+        ]
+        or [np.empty(0, dtype=np.float32)]
+    )
+
+
+def get_feed_similarities(state: EngineState, vector):
+    """Cosine similarity of every clip's feed to the vector."""
+    unit_vector = get_unit_vector(vector)
+    if unit_vector is None:
+        return np.full(len(state.clip_ids), np.nan, dtype=np.float32)
+    return (state.feed_embeddings @ unit_vector)[state.feed_rows]
+
+
+ranking_engine = RankingEngine()
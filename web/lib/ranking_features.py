@@ -0,0 +1,98 @@
+from django.db import connection
+from web.models import ClipRankingFeatures
+
+# Copies the ranking columns of the selected clips into web_cliprankingfeatures.
+# Rows that haven't changed are skipped so a full sync only writes what moved.
+# Embeddings are copied at half precision, the sources keep float32.
+SYNC_RANKING_FEATURES_SQL = """
+INSERT INTO web_cliprankingfeatures (
+    clip_id,
+    feed_item_id,
+    feed_id,
+    is_english,
+    popularity_percentile,
+    has_embeddings,
+    transcript_embedding,
+    feed_topic_embedding,
+    created_at,
+    updated_at
+)
+SELECT
+    clip.id,
+    clip.feed_item_id,
+    feed.id,
+    feed.is_english,
+    feed.popularity_percentile,
+    clip.transcript_embedding IS NOT NULL
+        AND feed.topic_embedding IS NOT NULL,
+    clip.transcript_embedding::halfvec(768),
+    feed.topic_embedding::halfvec(768),
+    clip.created_at,
+    NOW()
+FROM web_clip clip
+JOIN web_feeditem feed_item ON feed_item.id = clip.feed_item_id
+JOIN web_feed feed ON feed.id = feed_item.feed_id
+{where}
+ON CONFLICT (clip_id) DO UPDATE SET
+    feed_item_id = EXCLUDED.feed_item_id,
+    feed_id = EXCLUDED.feed_id,
+    is_english = EXCLUDED.is_english,
+    popularity_percentile = EXCLUDED.popularity_percentile,
+    has_embeddings = EXCLUDED.has_embeddings,
+    transcript_embedding = EXCLUDED.transcript_embedding,
+    feed_topic_embedding = EXCLUDED.feed_topic_embedding,
+    created_at = EXCLUDED.created_at,
+    updated_at = EXCLUDED.updated_at
+WHERE (
+    web_cliprankingfeatures.feed_item_id,
+    web_cliprankingfeatures.feed_id,
+    web_cliprankingfeatures.is_english,
+    web_cliprankingfeatures.popularity_percentile,
+    web_cliprankingfeatures.has_embeddings,
+    web_cliprankingfeatures.transcript_embedding,
+    web_cliprankingfeatures.feed_topic_embedding,
+    web_cliprankingfeatures.created_at
+) IS DISTINCT FROM (
+    EXCLUDED.feed_item_id,
+    EXCLUDED.feed_id,
+    EXCLUDED.is_english,
+    EXCLUDED.popularity_percentile,
+    EXCLUDED.has_embeddings,
+    EXCLUDED.transcript_embedding,
+    EXCLUDED.feed_topic_embedding,
+    EXCLUDED.created_at
+)
+"""
+
+
+def rankable_clips():
+    """Ranking features of the clips the queue may serve, matches the partial indexes."""
+    return ClipRankingFeatures.objects.filter(is_english=True, has_embeddings=True)
+
+
+def sync_clip_ranking_features(
+    clip_ids: list | None = None, feed_ids: list | None = None
+) -> int:
+    """
+    Upsert the ranking features of the given clips, or of every clip.
+
+    Args:
+        clip_ids (list, optional): Only sync these clips.
+        feed_ids (list, optional): Only sync the clips of these feeds.
+
+    Returns:
+        int: The number of rows inserted or changed.
+    """
+    conditions = []
+    params = []
+    if clip_ids is not None:
+        conditions.append("clip.id = ANY(%s)")
+        params.append(list(clip_ids))
+    if feed_ids is not None:
+        conditions.append("feed.id = ANY(%s)")
+        params.append(list(feed_ids))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    with connection.cursor() as cursor:
+        cursor.execute(SYNC_RANKING_FEATURES_SQL.format(where=where), params)
+        return cursor.rowcount
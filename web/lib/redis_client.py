@@ -0,0 +1,5 @@
+import redis
+from django.conf import settings
+
+
+redis_client = redis.from_url(settings.REDIS_URL)
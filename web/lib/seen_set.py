@@ -0,0 +1,264 @@
+import time
+from datetime import timedelta
+from django.db.models import Count
+from django.utils import timezone
+from web.lib.redis_client import redis_client
+from web.models import Clip, ClipUserView, FeedUserInterest
+
+# Feed items with a view shorter than this were skipped part way through
+INCOMPLETE_VIEW_DURATION = 90
+# How many of the most recently viewed feeds are held back from the queue
+RECENT_FEEDS_SIZE = 10
+# Seen sets of users that haven't been ranked in a month are dropped
+SEEN_SET_TTL = 60 * 60 * 24 * 30
+# Views written during a build are re-read with this much margin, so clock
+# drift between app servers can't hide one
+BUILD_CATCH_UP_MARGIN = timedelta(minutes=1)
+
+
+def get_seen_set_keys(user_id: int) -> dict:
+    return {
+        "built": f"seen:{user_id}:built",
+        # Set of viewed clip ids
+        "clips": f"seen:{user_id}:clips",
+        # Hash of feed item id -> number of incomplete views
+        "incomplete_feed_items": f"seen:{user_id}:incomplete-feed-items",
+        # Sorted set of feed id -> last viewed timestamp
+        "recent_feeds": f"seen:{user_id}:recent-feeds",
+        # Set of blocked feed ids
+        "blocked_feeds": f"seen:{user_id}:blocked-feeds",
+    }
+
+
+def build_seen_set(user_id: int) -> None:
+    """
+    Load the user's seen set from their history.
+
+    This is the only step that scales with history length, it runs once and
+    view and interest writes keep the set up to date afterwards.
+    """
+    keys = get_seen_set_keys(user_id)
+    build_started_at = timezone.now()
+    clip_ids = []
+    incomplete_feed_items = {}
+    recent_feeds = {}
+
+    views = (
+        ClipUserView.objects.filter(user_id=user_id)
+        .order_by("-created_at")
+        .values_list(
+            "clip_id",
+            "clip__feed_item_id",
+            "clip__feed_item__feed_id",
+            "duration",
+            "created_at",
+        )
+        .iterator(chunk_size=2000)
+    )
+    for clip_id, feed_item_id, feed_id, duration, created_at in views:
+        clip_ids.append(clip_id)
+        if duration < INCOMPLETE_VIEW_DURATION:
+            incomplete_feed_items[feed_item_id] = (
+                incomplete_feed_items.get(feed_item_id, 0) + 1
+            )
+        if len(recent_feeds) < RECENT_FEEDS_SIZE and feed_id not in recent_feeds:
+            recent_feeds[feed_id] = created_at.timestamp()
+
+    blocked_feed_ids = list(
+        FeedUserInterest.objects.filter(
+            user_id=user_id, is_interested=False
+        ).values_list("feed_id", flat=True)
+    )
+
+    pipeline = redis_client.pipeline()
+    pipeline.delete(*keys.values())
+    if clip_ids:
+        pipeline.sadd(keys["clips"], *clip_ids)
+    if incomplete_feed_items:
+        pipeline.hset(keys["incomplete_feed_items"], mapping=incomplete_feed_items)
+    if recent_feeds:
+        pipeline.zadd(keys["recent_feeds"], recent_feeds)
+    if blocked_feed_ids:
+        pipeline.sadd(keys["blocked_feeds"], *blocked_feed_ids)
+    pipeline.set(keys["built"], 1)
+    for key in keys.values():
+        pipeline.expire(key, SEEN_SET_TTL)
+    pipeline.execute()
+
+    # Views written after the history was read but before built was set were
+    # skipped by apply_view_to_seen_set, and reads keep the set alive, so
+    # they'd never be added
+    catch_up_seen_set(user_id, build_started_at - BUILD_CATCH_UP_MARGIN)
+
+
+def catch_up_seen_set(user_id: int, since) -> None:
+    """Apply the user's views written since a time to their seen set."""
+    keys = get_seen_set_keys(user_id)
+    views = list(
+        ClipUserView.objects.filter(user_id=user_id, updated_at__gte=since)
+        .values_list("clip_id", "clip__feed_item_id", "clip__feed_item__feed_id")
+        .order_by()
+    )
+    if not views:
+        return
+
+    # Incomplete counts are read whole rather than incremented, a view can
+    # already be in the snapshot
+    feed_item_ids = {feed_item_id for _, feed_item_id, _ in views}
+    incomplete_counts = dict(
+        ClipUserView.objects.filter(
+            user_id=user_id,
+            clip__feed_item_id__in=feed_item_ids,
+            duration__lt=INCOMPLETE_VIEW_DURATION,
+        )
+        .values("clip__feed_item_id")
+        .annotate(count=Count("id"))
+        .values_list("clip__feed_item_id", "count")
+        .order_by()
+    )
+
+    now = time.time()
+    pipeline = redis_client.pipeline()
+    pipeline.sadd(keys["clips"], *[clip_id for clip_id, _, _ in views])
+    pipeline.zadd(keys["recent_feeds"], {feed_id: now for _, _, feed_id in views})
+    pipeline.zremrangebyrank(keys["recent_feeds"], 0, -RECENT_FEEDS_SIZE - 1)
+    for feed_item_id in feed_item_ids:
+        if incomplete_counts.get(feed_item_id):
+            pipeline.hset(
+                keys["incomplete_feed_items"],
+                feed_item_id,
+                incomplete_counts[feed_item_id],
+            )
+        else:
+            pipeline.hdel(keys["incomplete_feed_items"], feed_item_id)
+    for key in ["clips", "recent_feeds", "incomplete_feed_items"]:
+        pipeline.expire(keys[key], SEEN_SET_TTL)
+    pipeline.execute()
+
+
+def invalidate_seen_set(user_id: int) -> None:
+    redis_client.delete(get_seen_set_keys(user_id)["built"])
+
+
+def get_seen_exclusions(
+    user_id: int, clip_ids: list, feed_item_ids: list | None = None
+) -> tuple:
+    """
+    Check candidates against the user's seen set.
+
+    Args:
+        user_id (int): The user being ranked for.
+        clip_ids (list): Candidate clip ids.
+        feed_item_ids (list, optional): Candidate feed item ids.
+
+    Returns:
+        tuple: (seen_clip_ids, incomplete_feed_item_ids, excluded_feed_ids)
+            where excluded_feed_ids are the recently viewed and blocked feeds.
+    """
+    keys = get_seen_set_keys(user_id)
+    if not redis_client.exists(keys["built"]):
+        build_seen_set(user_id)
+
+    clip_ids = list(clip_ids)
+    feed_item_ids = list(feed_item_ids or [])
+
+    pipeline = redis_client.pipeline()
+    if clip_ids:
+        pipeline.smismember(keys["clips"], clip_ids)
+    if feed_item_ids:
+        pipeline.hmget(keys["incomplete_feed_items"], feed_item_ids)
+    pipeline.zrange(keys["recent_feeds"], 0, -1)
+    pipeline.smembers(keys["blocked_feeds"])
+    # Reading the set keeps it alive
+    for key in keys.values():
+        pipeline.expire(key, SEEN_SET_TTL)
+    results = pipeline.execute()
+
+    seen_clip_ids = set()
+    if clip_ids:
+        is_seen = results.pop(0)
+        seen_clip_ids = {
+            clip_id for clip_id, seen in zip(clip_ids, is_seen) if seen
+        }
+
+    incomplete_feed_item_ids = set()
+    if feed_item_ids:
+        counts = results.pop(0)
+        incomplete_feed_item_ids = {
+            feed_item_id
+            for feed_item_id, count in zip(feed_item_ids, counts)
+            if count is not None and int(count) > 0
+        }
+
+    recent_feed_ids, blocked_feed_ids = results[0], results[1]
+    excluded_feed_ids = {int(feed_id) for feed_id in recent_feed_ids}
+    excluded_feed_ids.update(int(feed_id) for feed_id in blocked_feed_ids)
+
+    return seen_clip_ids, incomplete_feed_item_ids, excluded_feed_ids
+
+
+def apply_view_to_seen_set(
+    view: ClipUserView, old_duration: int | None, new_duration: int | None
+) -> None:
+    """Update the seen set when a view is created, extended or deleted."""
+    keys = get_seen_set_keys(view.user_id)
+    if not redis_client.exists(keys["built"]):
+        # It will be built from the history when it's next needed
+        return
+
+    clip = (
+        Clip.objects.filter(id=view.clip_id)
+        .values_list("feed_item_id", "feed_item__feed_id")
+        .first()
+    )
+    if clip is None:
+        return
+    feed_item_id, feed_id = clip
+
+    was_incomplete = (
+        old_duration is not None and old_duration < INCOMPLETE_VIEW_DURATION
+    )
+    is_incomplete = (
+        new_duration is not None and new_duration < INCOMPLETE_VIEW_DURATION
+    )
+
+    # Every write sets the TTL too, a write can recreate a key that emptied
+    # or expired since the set was built and it must not outlive the set
+    pipeline = redis_client.pipeline()
+    if old_duration is None and new_duration is not None:
+        pipeline.sadd(keys["clips"], view.clip_id)
+        pipeline.expire(keys["clips"], SEEN_SET_TTL)
+        pipeline.zadd(keys["recent_feeds"], {feed_id: time.time()})
+        pipeline.zremrangebyrank(keys["recent_feeds"], 0, -RECENT_FEEDS_SIZE - 1)
+        pipeline.expire(keys["recent_feeds"], SEEN_SET_TTL)
+    elif old_duration is not None and new_duration is None:
+        pipeline.srem(keys["clips"], view.clip_id)
+    if was_incomplete != is_incomplete:
+        pipeline.hincrby(
+            keys["incomplete_feed_items"], feed_item_id, 1 if is_incomplete else -1
+        )
+        pipeline.expire(keys["incomplete_feed_items"], SEEN_SET_TTL)
+    pipeline.execute()
+
+    if was_incomplete and not is_incomplete:
+        # Drop feed items whose last incomplete view went away
+        count = redis_client.hget(keys["incomplete_feed_items"], feed_item_id)
+        if int(count or 0) <= 0:
+            redis_client.hdel(keys["incomplete_feed_items"], feed_item_id)
+
+
+def apply_interest_to_seen_set(
+    interest: FeedUserInterest, is_interested: bool | None
+) -> None:
+    """Update the blocked feeds when a follow/block is saved or deleted."""
+    keys = get_seen_set_keys(interest.user_id)
+    if not redis_client.exists(keys["built"]):
+        return
+
+    if is_interested is False:
+        pipeline = redis_client.pipeline()
+        pipeline.sadd(keys["blocked_feeds"], interest.feed_id)
+        pipeline.expire(keys["blocked_feeds"], SEEN_SET_TTL)
+        pipeline.execute()
+    else:
+        redis_client.srem(keys["blocked_feeds"], interest.feed_id)
@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+from web.lib.logsnag_outbox import queue_logsnag_log
+from web.lib.redis_client import redis_client
+
+# A view this long after the previous one starts a new session
+SESSION_IDLE_SECONDS = 1800
+# Longer than the idle gap, a user back after this starts a session anyway
+LAST_ACTIVE_TTL = SESSION_IDLE_SECONDS * 2
+
+# Keep the latest activity time and return the one it replaced
+RECORD_ACTIVITY_SCRIPT = redis_client.register_script(
+    """
+    local previous = redis.call("get", KEYS[1])
+    if previous == false or tonumber(ARGV[1]) > tonumber(previous) then
+        redis.call("set", KEYS[1], ARGV[1], "EX", ARGV[2])
+    end
+    return previous
+    """
+)
+
+
+def get_last_active_key(user_id: int) -> str:
+    return f"sessions:{user_id}:last-active"
+
+
+def is_new_session(started_at, last_viewed_at) -> bool:
+    return (
+        last_viewed_at is None
+        or (started_at - last_viewed_at).total_seconds() > SESSION_IDLE_SECONDS
+    )
+
+
+def log_session_start(user) -> None:
+    print(f"New session started for user: {user.username}")
+
+    if "test" in user.username or user.is_superuser:
+        return
+
+    queue_logsnag_log(
+        event="New Session Started",
+        description=f"{user.username} started a new session",
+        icon="🎧",
+        channel="users",
+        notify=True,
+        user_id=user.username,
+    )
+
+
+def record_activity(user, started_at, last_active_at=None) -> bool:
+    """
+    Record views by the user and log a session start if they were idle.
+
+    Args:
+        user (User): The user that viewed clips.
+        started_at (datetime): When the first of the views was created.
+        last_active_at (datetime): When the last of the views was created,
+            defaults to started_at.
+
+    Returns:
+        bool: Whether the views started a new session.
+    """
+    last_active_at = last_active_at or started_at
+    previous = RECORD_ACTIVITY_SCRIPT(
+        keys=[get_last_active_key(user.id)],
+        args=[last_active_at.timestamp(), LAST_ACTIVE_TTL],
+    )
+
+    previous_active_at = None
+    if previous is not None:
+        previous_active_at = datetime.fromtimestamp(float(previous), tz=timezone.utc)
+    new_session = is_new_session(started_at, previous_active_at)
+    if new_session:
+        log_session_start(user)
+    return new_session
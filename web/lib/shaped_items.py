@@ -0,0 +1,223 @@
+from datetime import timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+from web.models import SyncWatermark
+
+SHAPED_ITEMS_WATERMARK = "shaped-items"
+# Sources are read up to this long ago, so rows committed a little after
+# their updated_at aren't skipped by the watermark
+SHAPED_ITEMS_LAG = timedelta(minutes=5)
+SHAPED_ITEMS_BATCH_SIZE = 1000
+
+SHAPED_ITEM_COLUMNS = [
+    "item_id",
+    "item_name",
+    "item_body",
+    "item_summary",
+    "item_start_time",
+    "item_end_time",
+    "item_audio_bucket_key",
+    "item_transcript_embedding",
+    "item_created_at",
+    "item_updated_at",
+    "item_view_count_30d",
+    "item_completed_count_30d",
+    "item_categories",
+    "item_user_friendly_categories",
+    "item_category_scores",
+    "feed_item_id",
+    "feed_item_name",
+    "feed_item_body",
+    "feed_item_audio_url",
+    "feed_item_audio_bucket_key",
+    "feed_item_transcript_bucket_key",
+    "feed_item_duration",
+    "feed_item_posted_at",
+    "feed_id",
+    "feed_url",
+    "feed_name",
+    "feed_description",
+    "feed_total_itunes_ratings",
+    "feed_popularity_percentile",
+    "feed_topic_embedding",
+    "feed_artwork_bucket_key",
+    "feed_language",
+    "feed_is_english",
+]
+
+# The join shaped/item_view.sql used to run on every sync. Categories shown
+# in the app stand in for the user friendly names the view referenced.
+SELECT_SHAPED_ITEMS_SQL = """
+SELECT
+    c.id,
+    c.name,
+    c.body,
+    c.summary,
+    c.start_time,
+    c.end_time,
+    c.audio_bucket_key,
+    c.transcript_embedding,
+    c.created_at,
+    c.updated_at,
+    COALESCE(activity.view_count, 0),
+    COALESCE(activity.completed_count, 0),
+    categories.names,
+    categories.display_names,
+    categories.scores,
+    fi.id,
+    fi.name,
+    fi.body,
+    fi.audio_url,
+    fi.audio_bucket_key,
+    fi.transcript_bucket_key,
+    fi.duration,
+    fi.posted_at,
+    f.id,
+    f.url,
+    f.name,
+    f.description,
+    f.total_itunes_ratings,
+    f.popularity_percentile,
+    f.topic_embedding,
+    f.artwork_bucket_key,
+    f.language,
+    f.is_english
+FROM web_clip c
+JOIN web_feeditem fi ON c.feed_item_id = fi.id
+JOIN web_feed f ON fi.feed_id = f.id
+LEFT JOIN LATERAL (
+    SELECT
+        string_agg(cat.name, ',' ORDER BY cat.name) AS names,
+        string_agg(cat.name, ',' ORDER BY cat.name)
+            FILTER (WHERE cat.should_display) AS display_names,
+        jsonb_object_agg(cat.name, ccs.score) AS scores
+    FROM web_clipcategoryscore ccs
+    JOIN web_category cat ON ccs.category_id = cat.id
+    WHERE ccs.clip_id = c.id
+) categories ON true
+LEFT JOIN LATERAL (
+    SELECT
+        sum(view_count) AS view_count,
+        sum(completed_count) AS completed_count
+    FROM web_clipdailyactivity
+    WHERE clip_id = c.id AND day >= current_date - 30
+) activity ON true
+WHERE c.id = ANY(%s)
+"""
+
+# Rows that haven't changed are skipped, so updated_at only moves for rows
+# Shaped needs to sync again
+UPSERT_SHAPED_ITEMS_SQL = """
+INSERT INTO web_shapeditem ({columns}, updated_at)
+SELECT items.*, NOW() FROM ({select}) items
+ON CONFLICT (item_id) DO UPDATE SET
+    {updates},
+    updated_at = EXCLUDED.updated_at
+WHERE ({current}) IS DISTINCT FROM ({excluded})
+""".format(
+    columns=", ".join(SHAPED_ITEM_COLUMNS),
+    select=SELECT_SHAPED_ITEMS_SQL,
+    updates=",\n    ".join(
+        f"{column} = EXCLUDED.{column}" for column in SHAPED_ITEM_COLUMNS[1:]
+    ),
+    current=", ".join(f"web_shapeditem.{column}" for column in SHAPED_ITEM_COLUMNS),
+    excluded=", ".join(f"EXCLUDED.{column}" for column in SHAPED_ITEM_COLUMNS),
+)
+
+# Clips whose item row may have changed between the watermarks
+CHANGED_CLIP_IDS_SQL = """
+SELECT id FROM web_clip
+WHERE updated_at > %(since)s AND updated_at <= %(until)s
+UNION
+SELECT c.id FROM web_clip c
+JOIN web_feeditem fi ON c.feed_item_id = fi.id
+WHERE fi.updated_at > %(since)s AND fi.updated_at <= %(until)s
+UNION
+SELECT c.id FROM web_clip c
+JOIN web_feeditem fi ON c.feed_item_id = fi.id
+JOIN web_feed f ON fi.feed_id = f.id
+WHERE f.updated_at > %(since)s AND f.updated_at <= %(until)s
+UNION
+SELECT clip_id FROM web_clipcategoryscore
+WHERE updated_at > %(since)s AND updated_at <= %(until)s
+UNION
+SELECT clip_id FROM web_clipdailyactivity
+WHERE updated_at > %(since)s AND updated_at <= %(until)s
+"""
+
+
+def upsert_shaped_items(clip_ids: list) -> int:
+    """
+    Write the item rows of the given clips.
+
+    Returns:
+        int: The number of rows inserted or changed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT_SHAPED_ITEMS_SQL, [list(clip_ids)])
+        return cursor.rowcount
+
+
+def get_changed_clip_ids(since, until) -> list:
+    with connection.cursor() as cursor:
+        cursor.execute(CHANGED_CLIP_IDS_SQL, {"since": since, "until": until})
+        return sorted(clip_id for (clip_id,) in cursor.fetchall())
+
+
+def get_all_clip_ids(batch_size: int):
+    """Every clip id in batches, paged by id so no batch rescans the table."""
+    last_id = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM web_clip WHERE id > %s ORDER BY id LIMIT %s",
+                [last_id, batch_size],
+            )
+            clip_ids = [clip_id for (clip_id,) in cursor.fetchall()]
+        if not clip_ids:
+            return
+        yield clip_ids
+        last_id = clip_ids[-1]
+
+
+def sync_shaped_items(
+    full: bool = False, batch_size: int = SHAPED_ITEMS_BATCH_SIZE
+) -> dict:
+    """
+    Bring web_shapeditem up to date with its source tables.
+
+    Incremental syncs only look at clips whose clip, feed item, feed,
+    category scores or daily activity changed since the last sync. Full
+    syncs compare every clip, which also catches bulk updates that don't
+    touch updated_at (feed popularity) and the 30 day window moving on.
+
+    Args:
+        full (bool): Compare every clip instead of the changed ones.
+        batch_size (int): Clips written per transaction.
+
+    Returns:
+        dict: The number of clips compared and rows written.
+    """
+    until = timezone.now() - SHAPED_ITEMS_LAG
+    watermark = SyncWatermark.objects.filter(name=SHAPED_ITEMS_WATERMARK).first()
+
+    if full or watermark is None:
+        batches = get_all_clip_ids(batch_size)
+    else:
+        changed_clip_ids = get_changed_clip_ids(watermark.synced_until, until)
+        batches = (
+            changed_clip_ids[start : start + batch_size]
+            for start in range(0, len(changed_clip_ids), batch_size)
+        )
+
+    compared = 0
+    written = 0
+    for clip_ids in batches:
+        with transaction.atomic():
+            written += upsert_shaped_items(clip_ids)
+        compared += len(clip_ids)
+
+    SyncWatermark.objects.update_or_create(
+        name=SHAPED_ITEMS_WATERMARK, defaults={"synced_until": until}
+    )
+    return {"compared": compared, "written": written}
@@ -1,31 +1,31 @@
+import uuid
 from django.conf import settings
 import assemblyai as aai
-from web.lib.r2 import get_audio_transcript_key, handle_r2_transcript_upload
+from assemblyai import api as aai_api
 
 aai.settings.api_key = settings.ASSEMBLYAI_API_KEY
 transcriber = aai.Transcriber()
-config = aai.TranscriptionConfig(
+
+# AssemblyAI calls us back when the transcript is done
+submit_config = aai.TranscriptionConfig(
     speech_model=aai.SpeechModel.nano,
     speaker_labels=True,
 )
+if settings.ASSEMBLYAI_WEBHOOK_URL:
+    submit_config.set_webhook(
+        settings.ASSEMBLYAI_WEBHOOK_URL,
+        auth_header_name=settings.ASSEMBLYAI_WEBHOOK_AUTH_HEADER,
+        auth_header_value=settings.ASSEMBLYAI_WEBHOOK_SECRET,
+    )
 
+# These match AssemblyAI's transcript statuses
+TRANSCRIPT_COMPLETED = "completed"
+TRANSCRIPT_ERROR = "error"
 
-def transcribe(audio_bucket_key: str) -> str:
-    """Transcribe the audio file and return the transcript."""
-    # Check if the audio file has been transcribed already
-    transcript_bucket_key = get_audio_transcript_key(audio_bucket_key)
-    if transcript_bucket_key:
-        return transcript_bucket_key
-
-    # Transcribe the audio file using the bucket's public URL and AssemblyAI
-    bucket_audio_url = f"{settings.R2_BUCKET_URL}/{audio_bucket_key}"
-    print(bucket_audio_url)
-    transcript = transcriber.transcribe(bucket_audio_url, config)
-
-    print(transcript)
 
+def format_utterances(transcript_utterances) -> list:
     utterances = []
-    for utterance in transcript.utterances:
+    for utterance in transcript_utterances or []:
         words = []
         for word in utterance.words:
             words.append(
@@ -45,6 +45,64 @@ def transcribe(audio_bucket_key: str) -> str:
                 "words": words,
             }
         )
+    return utterances
+
+
+class AssemblyAITranscriber:
+    def submit(self, audio_url: str) -> str:
+        transcript = transcriber.submit(audio_url, submit_config)
+        return transcript.id
+
+    def fetch(self, transcript_id: str) -> tuple:
+        # Get the current state without waiting for completion
+        client = aai.Client.get_default()
+        response = aai_api.get_transcript(client.http_client, transcript_id)
+        if response.status == aai.TranscriptStatus.completed:
+            return TRANSCRIPT_COMPLETED, format_utterances(response.utterances)
+        if response.status == aai.TranscriptStatus.error:
+            print(f"Transcript {transcript_id} failed: {response.error}")
+            return TRANSCRIPT_ERROR, None
+        return response.status.value, None
+
+
+class LocalTranscriber:
+    """Stand-in for tests and local development, completes instantly."""
+
+    def submit(self, audio_url: str) -> str:
+        return f"local-{uuid.uuid4().hex}"
+
+    def fetch(self, transcript_id: str) -> tuple:
+        words = [
+            {"text": text, "start": i * 500, "end": (i + 1) * 500, "speaker": "A"}
+            for i, text in enumerate(["Local", "stand-in", "transcript."])
+        ]
+        utterance = {
+            "text": " ".join(word["text"] for word in words),
+            "start": words[0]["start"],
+            "end": words[-1]["end"],
+            "speaker": "A",
+            "words": words,
+        }
+        return TRANSCRIPT_COMPLETED, [utterance]
+
+
+TRANSCRIBERS = {
+    "assemblyai": AssemblyAITranscriber,
+    "local": LocalTranscriber,
+}
+
+
+def get_transcriber():
+    return TRANSCRIBERS[settings.TRANSCRIBER_BACKEND]()
+
+
+def submit_transcription(audio_bucket_key: str) -> str:
+    """Submit the audio file for transcription and return the transcript id."""
+    bucket_audio_url = f"{settings.R2_BUCKET_URL}/{audio_bucket_key}"
+    return get_transcriber().submit(bucket_audio_url)
+
+
+def fetch_transcription(transcript_id: str) -> tuple:
+    """Return the transcript status and its utterances once completed."""
+    return get_transcriber().fetch(transcript_id)
 
-    transcript_bucket_key = handle_r2_transcript_upload(utterances, audio_bucket_key)
-    return transcript_bucket_key
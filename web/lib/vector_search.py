@@ -0,0 +1,15 @@
+from pgvector.django import CosineDistance, HalfVector
+from web.models import half_precision
+
+
+def half_cosine_distance(field_name: str, vector):
+    """
+    Cosine distance between a float32 embedding column and the vector, both
+    rounded to half precision.
+
+    Matches the expression of the halfvec HNSW indexes, so ordering by it is
+    an index scan when the query also filters the column on isnull=False like
+    the partial indexes do. Rerank with CosineDistance where exact scores
+    matter.
+    """
+    return CosineDistance(half_precision(field_name), HalfVector(vector))
@@ -0,0 +1,202 @@
+import time
+from datetime import datetime, timezone
+from django.db import DataError, connection, transaction
+from web.lib.redis_client import redis_client
+
+# Latest duration per "{user_id}:{clip_id}" waiting to be written
+BUFFER_KEY = "views:buffer"
+# When each buffered view was first seen, becomes created_at for new views
+BUFFER_FIRST_SEEN_KEY = "views:buffer:first-seen"
+# The buffer being written by the flusher
+FLUSHING_KEY = "views:flushing"
+FLUSHING_FIRST_SEEN_KEY = "views:flushing:first-seen"
+# Events the database rejected, kept for a while to inspect instead of
+# being retried by every flush
+REJECTED_KEY = "views:rejected"
+REJECTED_TTL = 60 * 60 * 24 * 7
+# Most events accepted in one batch request
+MAX_VIEW_BATCH_SIZE = 500
+# Views upserted per statement
+FLUSH_CHUNK_SIZE = 1000
+
+# Only raise a buffered duration, like the upsert does
+BUFFER_SCRIPT = redis_client.register_script(
+    """
+    for i = 2, #ARGV, 2 do
+        local current = tonumber(redis.call("hget", KEYS[1], ARGV[i]))
+        if current == nil or tonumber(ARGV[i + 1]) > current then
+            redis.call("hset", KEYS[1], ARGV[i], ARGV[i + 1])
+        end
+        redis.call("hsetnx", KEYS[2], ARGV[i], ARGV[1])
+    end
+    return 1
+    """
+)
+# Move the buffer aside so new events go to a fresh one while it is written.
+# A buffer left over from a failed flush is written again first.
+SWAP_SCRIPT = redis_client.register_script(
+    """
+    if redis.call("exists", KEYS[3]) == 1 then
+        return 1
+    end
+    if redis.call("exists", KEYS[1]) == 0 then
+        return 0
+    end
+    redis.call("rename", KEYS[1], KEYS[3])
+    if redis.call("exists", KEYS[2]) == 1 then
+        redis.call("rename", KEYS[2], KEYS[4])
+    end
+    return 1
+    """
+)
+
+# Views the buffered events created or extended, with their previous
+# duration (NULL for new views). All CTEs see the table as it was before
+# the insert, so previous holds the old durations.
+UPSERT_VIEWS_SQL = """
+WITH event AS (
+    SELECT event.user_id, event.clip_id, event.duration, event.viewed_at
+    FROM unnest(%s::bigint[], %s::bigint[], %s::integer[], %s::timestamptz[])
+        AS event(user_id, clip_id, duration, viewed_at)
+    -- Drop events for clips or users deleted since they were buffered
+    JOIN web_clip ON web_clip.id = event.clip_id
+    JOIN auth_user ON auth_user.id = event.user_id
+),
+previous AS (
+    SELECT existing.user_id, existing.clip_id, existing.duration
+    FROM web_clipuserview existing
+    JOIN event USING (user_id, clip_id)
+),
+upserted AS (
+    INSERT INTO web_clipuserview (user_id, clip_id, duration, created_at, updated_at)
+    SELECT user_id, clip_id, duration, viewed_at, now()
+    FROM event
+    ON CONFLICT (clip_id, user_id) DO UPDATE
+    SET duration = GREATEST(web_clipuserview.duration, EXCLUDED.duration),
+        updated_at = EXCLUDED.updated_at
+    WHERE EXCLUDED.duration > web_clipuserview.duration
+    RETURNING id, user_id, clip_id, duration, created_at
+)
+SELECT
+    upserted.id,
+    upserted.user_id,
+    upserted.clip_id,
+    previous.duration,
+    upserted.duration,
+    upserted.created_at
+FROM upserted
+LEFT JOIN previous USING (user_id, clip_id)
+"""
+
+
+def buffer_views(user_id: int, views: dict) -> None:
+    """
+    Buffer the user's view progress until the next flush.
+
+    Args:
+        user_id (int): The user that viewed the clips.
+        views (dict): Clip id to the furthest duration viewed.
+    """
+    if not views:
+        return
+    args = [time.time()]
+    for clip_id, duration in views.items():
+        args.extend([f"{user_id}:{clip_id}", duration])
+    BUFFER_SCRIPT(keys=[BUFFER_KEY, BUFFER_FIRST_SEEN_KEY], args=args)
+
+
+def upsert_views(events: list) -> list:
+    """
+    Write view events in one statement, keeping the furthest duration.
+
+    Args:
+        events (list): (user_id, clip_id, duration, viewed_at) tuples, at most
+            one per user and clip.
+
+    Returns:
+        list: (view_id, user_id, clip_id, old_duration, new_duration, created_at)
+            for each view that was created or extended.
+    """
+    user_ids, clip_ids, durations, viewed_ats = zip(*events)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT_VIEWS_SQL,
+            [list(user_ids), list(clip_ids), list(durations), list(viewed_ats)],
+        )
+        return cursor.fetchall()
+
+
+def reject_view_event(event: tuple, error: Exception) -> None:
+    user_id, clip_id, duration, _ = event
+    print(f"Rejected buffered view of clip {clip_id} by user {user_id}: {error}")
+    with redis_client.pipeline() as pipe:
+        pipe.hset(REJECTED_KEY, f"{user_id}:{clip_id}", duration)
+        pipe.expire(REJECTED_KEY, REJECTED_TTL)
+        pipe.execute()
+
+
+def upsert_view_chunk(events: list) -> list:
+    """
+    Upsert a chunk of events in one transaction.
+
+    A single malformed event fails the whole statement, so a chunk the
+    database rejects is written again one event at a time and only the
+    failing events are set aside.
+    """
+    try:
+        with transaction.atomic():
+            return upsert_views(events)
+    except DataError:
+        pass
+
+    changes = []
+    for event in events:
+        try:
+            with transaction.atomic():
+                changes += upsert_views([event])
+        except DataError as e:
+            reject_view_event(event, e)
+    return changes
+
+
+def flush_view_buffer(on_changes=None) -> int:
+    """
+    Write the buffered views to the database.
+
+    Upserts are idempotent, so a flush that fails part way is retried in
+    full by the next one. Events the database rejects as invalid are set
+    aside in REJECTED_KEY instead, so they can't block the buffer. Callers
+    must hold the flush lease.
+
+    Args:
+        on_changes (callable): Called with the rows upsert_views returns after
+            each chunk is committed, for the side effects post_save would run.
+
+    Returns:
+        int: The number of views created or extended.
+    """
+    if not SWAP_SCRIPT(
+        keys=[BUFFER_KEY, BUFFER_FIRST_SEEN_KEY, FLUSHING_KEY, FLUSHING_FIRST_SEEN_KEY]
+    ):
+        return 0
+
+    durations = redis_client.hgetall(FLUSHING_KEY)
+    first_seen = redis_client.hgetall(FLUSHING_FIRST_SEEN_KEY)
+    now = time.time()
+    events = []
+    for field, duration in durations.items():
+        user_id, clip_id = field.decode().split(":")
+        viewed_at = datetime.fromtimestamp(
+            float(first_seen.get(field, now)), tz=timezone.utc
+        )
+        events.append((int(user_id), int(clip_id), int(duration), viewed_at))
+
+    changed = 0
+    for start in range(0, len(events), FLUSH_CHUNK_SIZE):
+        changes = upsert_view_chunk(events[start : start + FLUSH_CHUNK_SIZE])
+        changed += len(changes)
+        if changes and on_changes:
+            on_changes(changes)
+
+    redis_client.delete(FLUSHING_KEY, FLUSHING_FIRST_SEEN_KEY)
+    return changed
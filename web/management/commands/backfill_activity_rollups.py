@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from web.lib.activity_rollups import update_activity_rollups
+
+
+class Command(BaseCommand):
+    help = "Roll up every day of views and start the watermark of the hourly rollups"
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        days = update_activity_rollups(backfill=True)
+        if days is None:
+            self.stdout.write(
+                self.style.WARNING("Another activity rollup run holds the lease")
+            )
+            return
+        elapsed = time.time() - start_time
+        self.stdout.write(
+            self.style.SUCCESS(f"Rolled up {days} days of views in {elapsed:.2f}s")
+        )
@@ -0,0 +1,79 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from rest_framework.renderers import JSONRenderer
+from web import serializers
+from web.models import Category, Clip, Feed
+from web.renderers import ORJSONRenderer
+
+
+class Command(BaseCommand):
+    help = "Compare serialization CPU of the queue, feed and category endpoints before and after the read serializers and orjson"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=20,
+            help="Number of times each payload is serialized",
+        )
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+
+        # Load each endpoint's rows once so only serialization is timed
+        clips = list(
+            serializers.ClipSerializer.setup_eager_loading(
+                Clip.objects.order_by("-created_at")
+            )[:10]
+        )
+        feeds = list(Feed.objects.filter(is_english=True)[:25])
+        categories = list(
+            Category.objects.select_related("parent")
+            .annotate(clip_count=Coalesce(F("clip_count_row__clip_count"), 0))
+            .order_by("-clip_count")[:10000]
+        )
+
+        endpoints = [
+            (
+                "QueueViewSet",
+                clips,
+                serializers.ClipSerializer,
+                serializers.ClipReadSerializer,
+            ),
+            (
+                "FeedViewSet",
+                feeds,
+                serializers.FeedSerializer,
+                serializers.FeedReadSerializer,
+            ),
+            (
+                "CategoryViewSet",
+                categories,
+                serializers.CategorySerializer,
+                serializers.CategoryReadSerializer,
+            ),
+        ]
+
+        for name, rows, before_serializer, after_serializer in endpoints:
+            before = self.time_serialization(
+                rows, before_serializer, JSONRenderer(), iterations
+            )
+            after = self.time_serialization(
+                rows, after_serializer, ORJSONRenderer(), iterations
+            )
+            speedup = before / after if after else 0
+            self.stdout.write(
+                f"{name} ({len(rows)} rows): "
+                f"before {before * 1000:.2f}ms, after {after * 1000:.2f}ms, "
+                f"{speedup:.1f}x faster"
+            )
+
+    def time_serialization(self, rows, serializer_class, renderer, iterations):
+        """Average CPU seconds to serialize and render the rows."""
+        start_time = time.process_time()
+        for _ in range(iterations):
+            data = serializer_class(rows, many=True).data
+            renderer.render(data)
+        return (time.process_time() - start_time) / iterations
@@ -0,0 +1,139 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from pgvector.django import CosineDistance
+from web.lib.ranking import set_hnsw_ef_search
+from web.lib.vector_search import half_cosine_distance
+from web.models import Clip, Feed, Topic
+
+# Model, embedding field, float32 index (dropped by 0061) and halfvec index
+BENCHMARK_TABLES = {
+    "feeds": (
+        Feed,
+        "topic_embedding",
+        "feed_topic_embedding_idx",
+        "feed_topic_partial_idx",
+    ),
+    "clips": (
+        Clip,
+        "transcript_embedding",
+        "clip_transcript_embedding_idx",
+        "clip_transcript_partial_idx",
+    ),
+    "topics": (
+        Topic,
+        "embedding",
+        "topic_embedding_idx",
+        "topic_embedding_partial_idx",
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = "Compare recall@K and latency of float32 and halfvec HNSW searches against exact float32 search"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--table", choices=list(BENCHMARK_TABLES), default="feeds")
+        parser.add_argument(
+            "--queries",
+            type=int,
+            default=50,
+            help="Number of random embeddings from the table used as queries",
+        )
+        parser.add_argument("--k", type=int, default=10, help="Neighbors per query")
+        parser.add_argument("--ef-search", type=int, default=100)
+        parser.add_argument(
+            "--rerank-factor",
+            type=int,
+            default=4,
+            help="halfvec candidates per neighbor reranked on the float32 embeddings",
+        )
+
+    def handle(self, *args, **options):
+        model, field, float_index, half_index = BENCHMARK_TABLES[options["table"]]
+        k = options["k"]
+        # Matches the partial indexes, rows without embeddings are never searched
+        rows = model.objects.filter(**{f"{field}__isnull": False})
+        queries = [
+            np.asarray(embedding, dtype=np.float32)
+            for embedding in rows.order_by("?").values_list(field, flat=True)[
+                : options["queries"]
+            ]
+        ]
+        if not queries:
+            self.stdout.write(self.style.WARNING("No embeddings to query"))
+            return
+
+        searches = {
+            "halfvec HNSW": lambda vector: self.search(
+                rows, half_cosine_distance(field, vector), k
+            ),
+            "halfvec HNSW + rerank": lambda vector: self.search_and_rerank(
+                rows, field, vector, k, k * options["rerank_factor"]
+            ),
+        }
+        # Only there until 0061_halfvec_ranking_features is applied
+        if self.get_index_size(float_index) is not None:
+            searches = {
+                "float32 HNSW": lambda vector: self.search(
+                    rows, CosineDistance(field, vector), k
+                ),
+                **searches,
+            }
+
+        exact_results = []
+        exact_latencies = []
+        for vector in queries:
+            start_time = time.perf_counter()
+            exact_results.append(self.search_exact(rows, field, vector, k))
+            exact_latencies.append(time.perf_counter() - start_time)
+        self.report("exact float32", 1.0, exact_latencies)
+
+        for name, search in searches.items():
+            recalls = []
+            latencies = []
+            for vector, expected_ids in zip(queries, exact_results):
+                with transaction.atomic():
+                    set_hnsw_ef_search(options["ef_search"])
+                    start_time = time.perf_counter()
+                    ids = search(vector)
+                    latencies.append(time.perf_counter() - start_time)
+                recalls.append(len(set(ids) & set(expected_ids)) / len(expected_ids))
+            self.report(name, np.mean(recalls), latencies)
+
+        for index in [float_index, half_index]:
+            size = self.get_index_size(index)
+            if size is not None:
+                self.stdout.write(f"{index}: {size / 1024 / 1024:.1f} MB")
+
+    def search(self, rows, distance, k):
+        return list(rows.order_by(distance).values_list("id", flat=True)[:k])
+
+    def search_exact(self, rows, field, vector, k):
+        """The true nearest neighbors, with index scans off so HNSW isn't used."""
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_indexscan = off")
+            return self.search(rows, CosineDistance(field, vector), k)
+
+    def search_and_rerank(self, rows, field, vector, k, candidates):
+        candidates = (
+            rows.annotate(distance=CosineDistance(field, vector))
+            .order_by(half_cosine_distance(field, vector))
+            .values_list("id", "distance")[:candidates]
+        )
+        return [id for id, _ in sorted(candidates, key=lambda row: row[1])[:k]]
+
+    def get_index_size(self, index):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_relation_size(to_regclass(%s))", [index])
+            return cursor.fetchone()[0]
+
+    def report(self, name, recall, latencies):
+        latencies = np.array(latencies) * 1000
+        self.stdout.write(
+            f"{name}: recall@K {recall:.3f}, "
+            f"p50 {np.percentile(latencies, 50):.1f}ms, "
+            f"p95 {np.percentile(latencies, 95):.1f}ms"
+        )
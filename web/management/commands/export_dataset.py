@@ -0,0 +1,198 @@
+import itertools
+import os
+import time
+from datetime import timedelta
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from web.models import Clip, ClipUserView, Feed, SyncWatermark
+
+# Rows read at once through the server-side cursor, and rows per row group
+DEFAULT_CHUNK_SIZE = 10000
+# Rows are exported up to this long ago, so rows committed a little after
+# their updated_at aren't skipped by the watermark
+EXPORT_LAG = timedelta(minutes=5)
+
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+EMBEDDING = pa.list_(pa.float32())
+
+# Parquet columns of each exported table, in the order they are queried
+EXPORT_TABLES = {
+    "clips": {
+        "model": Clip,
+        "fields": [
+            ("id", pa.int64()),
+            ("feed_item_id", pa.int64()),
+            ("feed_item__feed_id", pa.int64()),
+            ("name", pa.string()),
+            ("summary", pa.string()),
+            ("body", pa.string()),
+            ("start_time", pa.int32()),
+            ("end_time", pa.int32()),
+            ("audio_bucket_key", pa.string()),
+            ("created_at", TIMESTAMP),
+            ("updated_at", TIMESTAMP),
+        ],
+        "embedding": "transcript_embedding",
+    },
+    "views": {
+        "model": ClipUserView,
+        "fields": [
+            ("id", pa.int64()),
+            ("user_id", pa.int64()),
+            ("clip_id", pa.int64()),
+            ("duration", pa.int32()),
+            ("created_at", TIMESTAMP),
+            ("updated_at", TIMESTAMP),
+        ],
+        "embedding": None,
+    },
+    "feeds": {
+        "model": Feed,
+        "fields": [
+            ("id", pa.int64()),
+            ("url", pa.string()),
+            ("name", pa.string()),
+            ("description", pa.string()),
+            ("language", pa.string()),
+            ("is_english", pa.bool_()),
+            ("total_itunes_ratings", pa.int32()),
+            ("popularity_percentile", pa.float64()),
+            ("created_at", TIMESTAMP),
+            ("updated_at", TIMESTAMP),
+        ],
+        "embedding": "topic_embedding",
+    },
+}
+
+
+class Command(BaseCommand):
+    help = "Stream clips, views and feeds to partitioned Parquet files, only rows changed since the last export unless --full"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tables",
+            nargs="+",
+            choices=list(EXPORT_TABLES),
+            default=list(EXPORT_TABLES),
+            help="Tables to export",
+        )
+        parser.add_argument(
+            "--output-dir",
+            type=str,
+            default=os.path.join(settings.BASE_DIR, "exports"),
+            help="Directory the table partitions are written to",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="Rows held in memory and written per row group",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Export every row instead of those changed since the last export",
+        )
+        parser.add_argument(
+            "--no-embeddings",
+            action="store_true",
+            help="Leave out the 768 float embedding columns",
+        )
+
+    def handle(self, *args, **options):
+        until = timezone.now() - EXPORT_LAG
+        # Each run is its own partition, readers keep the latest row per id
+        partition = f"exported_at={until.strftime('%Y-%m-%dT%H-%M-%S')}"
+
+        for table in options["tables"]:
+            start_time = time.time()
+            rows, row_groups = self.export_table(
+                table,
+                os.path.join(options["output_dir"], table, partition),
+                until,
+                options["chunk_size"],
+                options["full"],
+                not options["no_embeddings"],
+            )
+            end_time = time.time()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Exported {rows} {table} in {row_groups} row groups "
+                    f"in {end_time - start_time:.2f} seconds"
+                )
+            )
+
+    def export_table(
+        self, table, directory, until, chunk_size, full, include_embeddings
+    ):
+        """
+        Write the table's rows changed since its watermark to a single Parquet
+        file, one row group per chunk.
+
+        Returns:
+            tuple: The number of rows and row groups written.
+        """
+        spec = EXPORT_TABLES[table]
+        fields = list(spec["fields"])
+        if include_embeddings and spec["embedding"]:
+            fields.append((spec["embedding"], EMBEDDING))
+        names = [name for name, _ in fields]
+        schema = pa.schema(
+            [
+                # feed_item__feed_id is written as feed_id
+                (name.split("__")[-1], column_type)
+                for name, column_type in fields
+            ]
+        )
+
+        watermark_name = f"export:{table}"
+        watermark = SyncWatermark.objects.filter(name=watermark_name).first()
+        queryset = spec["model"].objects.filter(updated_at__lte=until)
+        if watermark and not full:
+            queryset = queryset.filter(updated_at__gt=watermark.synced_until)
+
+        # iterator() reads through a server-side cursor, so memory is bounded
+        # by the chunk size however many rows there are
+        records = (
+            self.to_record(names, row)
+            for row in queryset.values_list(*names).iterator(chunk_size=chunk_size)
+        )
+
+        rows = 0
+        row_groups = 0
+        writer = None
+        try:
+            while chunk := list(itertools.islice(records, chunk_size)):
+                if writer is None:
+                    # Only runs that changed rows leave a file behind
+                    os.makedirs(directory, exist_ok=True)
+                    writer = pq.ParquetWriter(
+                        os.path.join(directory, "part-00000.parquet"),
+                        schema,
+                        compression="zstd",
+                    )
+                writer.write_table(
+                    pa.Table.from_pylist(chunk, schema=schema),
+                    row_group_size=chunk_size,
+                )
+                rows += len(chunk)
+                row_groups += 1
+        finally:
+            if writer is not None:
+                writer.close()
+
+        SyncWatermark.objects.update_or_create(
+            name=watermark_name, defaults={"synced_until": until}
+        )
+        return rows, row_groups
+
+    def to_record(self, names, row):
+        record = {}
+        for name, value in zip(names, row):
+            if name.endswith("_embedding") and value is not None:
+                value = value.tolist()
+            record[name.split("__")[-1]] = value
+        return record
@@ -0,0 +1,63 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from web.lib.shaped_items import SHAPED_ITEMS_BATCH_SIZE, sync_shaped_items
+
+# Database wide counters, read before and after the sync to estimate its load
+DATABASE_STATS_SQL = """
+SELECT
+    blks_hit + blks_read,
+    blks_read,
+    tup_returned + tup_fetched,
+    tup_inserted + tup_updated
+FROM pg_stat_database
+WHERE datname = current_database()
+"""
+
+
+class Command(BaseCommand):
+    help = "Write changed clips to the Shaped item table and report sync time and database load"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Compare every clip instead of those changed since the last sync",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=SHAPED_ITEMS_BATCH_SIZE,
+            help="Number of clips written per transaction",
+        )
+
+    def handle(self, *args, **options):
+        before = self.get_database_stats()
+        start_time = time.time()
+        result = sync_shaped_items(
+            full=options["full"], batch_size=options["batch_size"]
+        )
+        elapsed = time.time() - start_time
+        # pg_stat_database is updated when a backend reports, not per statement
+        time.sleep(1)
+        after = self.get_database_stats()
+        blocks, blocks_read, rows_read, rows_written = [
+            end - start for start, end in zip(before, after)
+        ]
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Compared {result['compared']} clips and wrote {result['written']} "
+                f"items in {elapsed:.2f} seconds"
+            )
+        )
+        # Counters cover the whole database, so other traffic is included
+        self.stdout.write(
+            f"Database load: {blocks} blocks accessed ({blocks_read} from disk), "
+            f"{rows_read} rows read, {rows_written} rows written"
+        )
+
+    def get_database_stats(self):
+        with connection.cursor() as cursor:
+            cursor.execute(DATABASE_STATS_SQL)
+            return cursor.fetchone()
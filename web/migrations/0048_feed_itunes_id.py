@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0047_category_should_display'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='itunes_id',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+    ]
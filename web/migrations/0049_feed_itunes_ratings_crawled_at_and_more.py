@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0048_feed_itunes_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='itunes_ratings_crawled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='itunes_ratings_delta',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0049_feed_itunes_ratings_crawled_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EpisodeIngest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('audio_url', models.URLField(max_length=2000, unique=True)),
+                ('entry_data', models.JSONField()),
+                ('audio_bucket_key', models.CharField(max_length=2000)),
+                ('transcript_id', models.CharField(max_length=255, unique=True)),
+                ('lease_token', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(default='transcribing', max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('feed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingests', to='web.feed')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='web_episode_status_9dfa1d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:10
+
+import django.db.models.deletion
+import django.utils.timezone
+import pgvector.django.vector
+import web.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0050_episodeingest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserProfileVector',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed_embedding_sum', pgvector.django.vector.VectorField(default=web.models.default_vector, dimensions=768)),
+                ('feed_count', models.IntegerField(default=0)),
+                ('positive_clip_embedding_sum', pgvector.django.vector.VectorField(default=web.models.default_vector, dimensions=768)),
+                ('positive_clip_count', models.IntegerField(default=0)),
+                ('negative_clip_embedding_sum', pgvector.django.vector.VectorField(default=web.models.default_vector, dimensions=768)),
+                ('negative_clip_count', models.IntegerField(default=0)),
+                ('interest_count', models.IntegerField(default=0)),
+                ('view_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile_vector', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:15
+
+import django.db.models.deletion
+import pgvector.django.indexes
+import pgvector.django.vector
+import web.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0051_userprofilevector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClipRankingFeatures',
+            fields=[
+                ('clip', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking_features', serialize=False, to='web.clip')),
+                ('is_english', models.BooleanField(default=False)),
+                ('popularity_percentile', models.FloatField(default=0.0)),
+                ('has_embeddings', models.BooleanField(default=False)),
+                ('transcript_embedding', pgvector.django.vector.VectorField(default=web.models.default_vector, dimensions=768)),
+                ('feed_topic_embedding', pgvector.django.vector.VectorField(default=web.models.default_vector, dimensions=768)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('feed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='web.feed')),
+                ('feed_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='web.feeditem')),
+            ],
+            options={
+                'verbose_name_plural': 'Clip ranking features',
+                'indexes': [models.Index(condition=models.Q(('has_embeddings', True), ('is_english', True)), fields=['-created_at'], name='cliprank_created_idx'), models.Index(condition=models.Q(('has_embeddings', True), ('is_english', True)), fields=['feed', '-created_at'], name='cliprank_feed_created_idx'), pgvector.django.indexes.HnswIndex(condition=models.Q(('has_embeddings', True), ('is_english', True)), ef_construction=64, fields=['transcript_embedding'], m=16, name='cliprank_transcript_emb_idx', opclasses=['vector_cosine_ops'])],
+            },
+        ),
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO web_cliprankingfeatures (
+                    clip_id, feed_item_id, feed_id, is_english, popularity_percentile,
+                    has_embeddings, transcript_embedding, feed_topic_embedding,
+                    created_at, updated_at
+                )
+                SELECT
+                    clip.id, clip.feed_item_id, feed.id, feed.is_english,
+                    feed.popularity_percentile,
+                    vector_norm(clip.transcript_embedding) > 0
+                        AND vector_norm(feed.topic_embedding) > 0,
+                    clip.transcript_embedding, feed.topic_embedding,
+                    clip.created_at, NOW()
+                FROM web_clip clip
+                JOIN web_feeditem feed_item ON feed_item.id = clip.feed_item_id
+                JOIN web_feed feed ON feed.id = feed_item.feed_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
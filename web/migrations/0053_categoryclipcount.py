@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0052_cliprankingfeatures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryClipCount',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='clip_count_row', serialize=False, to='web.category')),
+                ('clip_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO web_categoryclipcount (category_id, clip_count, updated_at)
+                SELECT category.id, COUNT(score.id), NOW()
+                FROM web_category category
+                LEFT JOIN web_clipcategoryscore score ON score.category_id = category.id
+                GROUP BY category.id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
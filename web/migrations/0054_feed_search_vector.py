@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:19
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0053_categoryclipcount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE web_feed feed SET search_vector =
+                    setweight(to_tsvector('english', COALESCE(feed.name, '')), 'A')
+                    || setweight(to_tsvector('english', COALESCE((
+                        SELECT string_agg(topic.text, ' ')
+                        FROM web_feedtopic topic
+                        WHERE topic.feed_id = feed.id
+                    ), '')), 'B')
+                    || setweight(to_tsvector('english', COALESCE(feed.description, '')), 'C')
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
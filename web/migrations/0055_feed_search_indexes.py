@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:19
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the search indexes without locking feed writes
+    atomic = False
+
+    dependencies = [
+        ('web', '0054_feed_search_vector'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='feed',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='feed_search_vector_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='feed',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='feed_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='feed',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('name'), name='text_pattern_ops'), name='feed_name_prefix_idx'),
+        ),
+    ]
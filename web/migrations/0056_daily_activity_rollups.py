@@ -0,0 +1,82 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0055_feed_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClipDailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('view_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('total_duration', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Clip daily activity',
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncWatermark',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('synced_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserDailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('view_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('total_duration', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'User daily activity',
+            },
+        ),
+        migrations.AddField(
+            model_name='clipdailyactivity',
+            name='clip',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='web.clip'),
+        ),
+        migrations.AddField(
+            model_name='userdailyactivity',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='clipdailyactivity',
+            index=models.Index(fields=['day'], name='web_clipdai_day_a5ff30_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clipdailyactivity',
+            index=models.Index(fields=['updated_at'], name='web_clipdai_updated_d8a36d_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='clipdailyactivity',
+            unique_together={('clip', 'day')},
+        ),
+        migrations.AddIndex(
+            model_name='userdailyactivity',
+            index=models.Index(fields=['day'], name='web_userdai_day_6b47dc_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userdailyactivity',
+            unique_together={('user', 'day')},
+        ),
+    ]
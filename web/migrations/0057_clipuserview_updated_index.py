@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:26
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Index the views table without locking view writes
+    atomic = False
+
+    dependencies = [
+        ('web', '0056_daily_activity_rollups'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='clipuserview',
+            index=models.Index(fields=['updated_at'], name='clipuserview_updated_idx'),
+        ),
+    ]
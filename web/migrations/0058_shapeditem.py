@@ -0,0 +1,67 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:28
+
+import django.db.models.deletion
+import pgvector.django.vector
+import web.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0057_clipuserview_updated_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShapedItem',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='web.clip')),
+                ('item_name', models.CharField(max_length=2000)),
+                ('item_body', models.TextField()),
+                ('item_summary', models.TextField()),
+                ('item_start_time', models.IntegerField()),
+                ('item_end_time', models.IntegerField()),
+                ('item_audio_bucket_key', models.CharField(max_length=2000)),
+                ('item_transcript_embedding', pgvector.django.vector.VectorField(default=web.models.default_vector, dimensions=768)),
+                ('item_created_at', models.DateTimeField()),
+                ('item_updated_at', models.DateTimeField()),
+                ('item_view_count_30d', models.IntegerField(default=0)),
+                ('item_completed_count_30d', models.IntegerField(default=0)),
+                ('item_categories', models.TextField(blank=True, null=True)),
+                ('item_user_friendly_categories', models.TextField(blank=True, null=True)),
+                ('item_category_scores', models.JSONField(blank=True, null=True)),
+                ('feed_item_name', models.CharField(max_length=255)),
+                ('feed_item_body', models.TextField()),
+                ('feed_item_audio_url', models.URLField(max_length=2000)),
+                ('feed_item_audio_bucket_key', models.CharField(max_length=2000)),
+                ('feed_item_transcript_bucket_key', models.CharField(max_length=2000)),
+                ('feed_item_duration', models.IntegerField()),
+                ('feed_item_posted_at', models.DateTimeField()),
+                ('feed_url', models.URLField()),
+                ('feed_name', models.CharField(max_length=255)),
+                ('feed_description', models.TextField()),
+                ('feed_total_itunes_ratings', models.IntegerField(default=0)),
+                ('feed_popularity_percentile', models.FloatField(default=0.0)),
+                ('feed_topic_embedding', pgvector.django.vector.VectorField(default=web.models.default_vector, dimensions=768)),
+                ('feed_artwork_bucket_key', models.CharField(max_length=2000)),
+                ('feed_language', models.CharField(max_length=100)),
+                ('feed_is_english', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='shapeditem',
+            name='feed',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='web.feed'),
+        ),
+        migrations.AddField(
+            model_name='shapeditem',
+            name='feed_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='web.feeditem'),
+        ),
+        migrations.AddIndex(
+            model_name='shapeditem',
+            index=models.Index(fields=['updated_at'], name='web_shapedi_updated_07a442_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:41
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Index the source tables of the Shaped item sync without locking writes
+    atomic = False
+
+    dependencies = [
+        ('web', '0058_shapeditem'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='clip',
+            index=models.Index(fields=['updated_at'], name='clip_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='clipcategoryscore',
+            index=models.Index(fields=['updated_at'], name='clipcategoryscore_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='feed',
+            index=models.Index(fields=['updated_at'], name='feed_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='feeditem',
+            index=models.Index(fields=['updated_at'], name='feeditem_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:36
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import pgvector.django.halfvec
+import pgvector.django.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Build the half precision indexes next to the float32 ones without
+    # locking writes, 0061 drops the float32 ones. benchmark_vector_search
+    # compares both while they coexist.
+    atomic = False
+
+    dependencies = [
+        ('web', '0059_updated_at_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='clip',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('transcript_embedding', output_field=pgvector.django.halfvec.HalfVectorField(dimensions=768)), name='halfvec_cosine_ops'), ef_construction=64, m=16, name='clip_transcript_half_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='feed',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('topic_embedding', output_field=pgvector.django.halfvec.HalfVectorField(dimensions=768)), name='halfvec_cosine_ops'), ef_construction=64, m=16, name='feed_topic_half_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='topic',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('embedding', output_field=pgvector.django.halfvec.HalfVectorField(dimensions=768)), name='halfvec_cosine_ops'), ef_construction=64, m=16, name='topic_embedding_half_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:36
+
+import pgvector.django.halfvec
+import pgvector.django.indexes
+import web.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Rewrites web_cliprankingfeatures, it's derived from Clip and Feed and
+    # small enough to hold the lock for the conversion
+
+    dependencies = [
+        ('web', '0060_halfvec_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='clip',
+            name='clip_transcript_embedding_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='feed',
+            name='feed_topic_embedding_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='topic',
+            name='topic_embedding_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='cliprankingfeatures',
+            name='cliprank_transcript_emb_idx',
+        ),
+        migrations.AlterField(
+            model_name='cliprankingfeatures',
+            name='feed_topic_embedding',
+            field=pgvector.django.halfvec.HalfVectorField(default=web.models.default_vector, dimensions=768),
+        ),
+        migrations.AlterField(
+            model_name='cliprankingfeatures',
+            name='transcript_embedding',
+            field=pgvector.django.halfvec.HalfVectorField(default=web.models.default_vector, dimensions=768),
+        ),
+        migrations.AddIndex(
+            model_name='cliprankingfeatures',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('has_embeddings', True), ('is_english', True)), ef_construction=64, fields=['transcript_embedding'], m=16, name='cliprank_transcript_half_idx', opclasses=['halfvec_cosine_ops']),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:38
+
+import pgvector.django.halfvec
+import pgvector.django.vector
+from django.db import migrations
+
+# (table, column, type) of every embedding that used zeros for missing
+EMBEDDING_COLUMNS = [
+    ('web_feed', 'topic_embedding', 'vector'),
+    ('web_clip', 'transcript_embedding', 'vector'),
+    ('web_category', 'embedding', 'vector'),
+    ('web_topic', 'embedding', 'vector'),
+    ('web_cliprankingfeatures', 'transcript_embedding', 'halfvec'),
+    ('web_cliprankingfeatures', 'feed_topic_embedding', 'halfvec'),
+    ('web_shapeditem', 'item_transcript_embedding', 'vector'),
+    ('web_shapeditem', 'feed_topic_embedding', 'vector'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0061_halfvec_ranking_features'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='embedding',
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=768, null=True),
+        ),
+        migrations.AlterField(
+            model_name='clip',
+            name='transcript_embedding',
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=768, null=True),
+        ),
+        migrations.AlterField(
+            model_name='cliprankingfeatures',
+            name='feed_topic_embedding',
+            field=pgvector.django.halfvec.HalfVectorField(blank=True, dimensions=768, null=True),
+        ),
+        migrations.AlterField(
+            model_name='cliprankingfeatures',
+            name='transcript_embedding',
+            field=pgvector.django.halfvec.HalfVectorField(blank=True, dimensions=768, null=True),
+        ),
+        migrations.AlterField(
+            model_name='feed',
+            name='topic_embedding',
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=768, null=True),
+        ),
+        migrations.AlterField(
+            model_name='shapeditem',
+            name='feed_topic_embedding',
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=768, null=True),
+        ),
+        migrations.AlterField(
+            model_name='shapeditem',
+            name='item_transcript_embedding',
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=768, null=True),
+        ),
+        migrations.AlterField(
+            model_name='topic',
+            name='embedding',
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=768, null=True),
+        ),
+        migrations.RunSQL(
+            sql=[
+                f"""
+                UPDATE {table} SET {column} = NULL
+                WHERE {column} = array_fill(0::real, ARRAY[768])::{type}
+                """
+                for table, column, type in EMBEDDING_COLUMNS
+            ],
+            reverse_sql=[
+                f"""
+                UPDATE {table} SET {column} = array_fill(0::real, ARRAY[768])::{type}
+                WHERE {column} IS NULL
+                """
+                for table, column, type in EMBEDDING_COLUMNS
+            ],
+        ),
+    ]
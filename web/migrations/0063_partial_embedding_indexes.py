@@ -0,0 +1,48 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:38
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import pgvector.django.halfvec
+import pgvector.django.indexes
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    RemoveIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The partial indexes are built before the full ones are dropped, so ANN
+    # queries always have an index
+    atomic = False
+
+    dependencies = [
+        ('web', '0062_nullable_embeddings'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='clip',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('transcript_embedding', output_field=pgvector.django.halfvec.HalfVectorField(dimensions=768)), name='halfvec_cosine_ops'), condition=models.Q(('transcript_embedding__isnull', False)), ef_construction=64, m=16, name='clip_transcript_partial_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='feed',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('topic_embedding', output_field=pgvector.django.halfvec.HalfVectorField(dimensions=768)), name='halfvec_cosine_ops'), condition=models.Q(('topic_embedding__isnull', False)), ef_construction=64, m=16, name='feed_topic_partial_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='topic',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('embedding', output_field=pgvector.django.halfvec.HalfVectorField(dimensions=768)), name='halfvec_cosine_ops'), condition=models.Q(('embedding__isnull', False)), ef_construction=64, m=16, name='topic_embedding_partial_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='clip',
+            name='clip_transcript_half_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='feed',
+            name='feed_topic_half_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='topic',
+            name='topic_embedding_half_idx',
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:02
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Index the ranking features without locking the sync's writes
+    atomic = False
+
+    dependencies = [
+        ('web', '0063_partial_embedding_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='cliprankingfeatures',
+            index=models.Index(condition=models.Q(('has_embeddings', True), ('is_english', True)), fields=['updated_at'], name='cliprank_updated_idx'),
+        ),
+    ]
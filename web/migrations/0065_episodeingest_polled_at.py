@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0064_cliprank_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episodeingest',
+            name='polled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,38 +1,64 @@
+import numpy as np
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
-from pgvector.django import VectorField, HnswIndex
+from pgvector.django import HalfVectorField, VectorField, HnswIndex
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import Cast, Lower
 
 def default_vector():
-    # 768 is from nomic-embed-text-v1.5-Q in embed.py
+    # 768 is from nomic-embed-text-v1.5-Q in embed.py. Only the profile
+    # running sums start at zero, missing embeddings are NULL
     return [0.0] * 768
 
+def half_precision(field_name):
+    # Embeddings are stored as float32 but indexed as halfvec, which halves
+    # the HNSW index. Queries must order by the same expression and exclude
+    # NULL embeddings to use it, see web/lib/vector_search.py
+    return Cast(field_name, output_field=HalfVectorField(dimensions=768))
+
 class Feed(models.Model):
     url = models.URLField(unique=True)
+    itunes_id = models.BigIntegerField(unique=True, null=True, blank=True)
     name = models.CharField(max_length=255)
     description = models.TextField()
     total_itunes_ratings = models.IntegerField(default=0)
+    itunes_ratings_delta = models.IntegerField(default=0)
+    itunes_ratings_crawled_at = models.DateTimeField(null=True, blank=True)
     popularity_percentile = models.FloatField(default=0.0)
-    topic_embedding = VectorField(dimensions=768, default=default_vector)
+    topic_embedding = VectorField(dimensions=768, null=True, blank=True)
     artwork_bucket_key = models.CharField(max_length=2000)
     language = models.CharField(max_length=100)
     is_english = models.BooleanField(default=False)
+    # Weighted name, topics and description, see web/lib/feed_search.py
+    search_vector = SearchVectorField(null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [
+            GinIndex(fields=['search_vector'], name='feed_search_vector_idx'),
+            GinIndex(
+                fields=['name'], name='feed_name_trgm_idx', opclasses=['gin_trgm_ops']
+            ),
+            models.Index(
+                OpClass(Lower('name'), name='text_pattern_ops'),
+                name='feed_name_prefix_idx',
+            ),
             models.Index(fields=['total_itunes_ratings']),
             models.Index(fields=['is_english']),
             models.Index(fields=['popularity_percentile']),
             models.Index(fields=['is_english', 'popularity_percentile']),
+            # Incremental readers pick up rows changed since their watermark
+            models.Index(fields=['updated_at'], name='feed_updated_idx'),
             HnswIndex(
-                name='feed_topic_embedding_idx',
-                fields=['topic_embedding'],
+                OpClass(half_precision('topic_embedding'), name='halfvec_cosine_ops'),
+                name='feed_topic_partial_idx',
                 m=16,
                 ef_construction=64,
-                opclasses=['vector_cosine_ops']
+                condition=models.Q(topic_embedding__isnull=False),
             ),
         ]
 
@@ -56,11 +82,37 @@ class FeedItem(models.Model):
             models.Index(fields=['posted_at']),
             models.Index(fields=['feed']),
             models.Index(fields=['feed', 'posted_at']),
+            models.Index(fields=['updated_at'], name='feeditem_updated_idx'),
         ]
 
     def __str__(self):
         return self.name
 
+class EpisodeIngest(models.Model):
+    STATUS_TRANSCRIBING = "transcribing"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+
+    audio_url = models.URLField(max_length=2000, unique=True)
+    entry_data = models.JSONField()
+    audio_bucket_key = models.CharField(max_length=2000)
+    transcript_id = models.CharField(max_length=255, unique=True)
+    lease_token = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, default=STATUS_TRANSCRIBING)
+    # Last time the fallback poller found the transcript still processing
+    polled_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    feed = models.ForeignKey(Feed, on_delete=models.CASCADE, related_name="ingests")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.audio_url} ({self.status})"
+
 class FeedTopic(models.Model):
     text = models.CharField(max_length=1000)
     created_at = models.DateTimeField(default=timezone.now)
@@ -83,7 +135,7 @@ class Clip(models.Model):
     start_time = models.IntegerField()
     end_time = models.IntegerField()
     audio_bucket_key = models.CharField(max_length=2000)
-    transcript_embedding = VectorField(dimensions=768, default=default_vector)
+    transcript_embedding = VectorField(dimensions=768, null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     feed_item = models.ForeignKey(
@@ -96,12 +148,15 @@ class Clip(models.Model):
             models.Index(fields=['feed_item']),
             models.Index(fields=['feed_item', 'created_at']),
             models.Index(fields=['feed_item', 'created_at', 'name', 'summary']),
+            models.Index(fields=['updated_at'], name='clip_updated_idx'),
             HnswIndex(
-                name='clip_transcript_embedding_idx',
-                fields=['transcript_embedding'],
+                OpClass(
+                    half_precision('transcript_embedding'), name='halfvec_cosine_ops'
+                ),
+                name='clip_transcript_partial_idx',
                 m=16,
                 ef_construction=64,
-                opclasses=['vector_cosine_ops']
+                condition=models.Q(transcript_embedding__isnull=False),
             ),
         ]
 
@@ -124,12 +179,21 @@ class ClipUserView(models.Model):
             models.Index(fields=['user']),
             models.Index(fields=['created_at']),
             models.Index(fields=['user', 'clip', 'created_at']),
+            # Incremental readers pick up views changed since their watermark
+            models.Index(fields=['updated_at'], name='clipuserview_updated_idx'),
         ]
 
     def __str__(self):
         return (
             f"{self.user.username} viewed {self.clip.name} for {self.duration} seconds"
         )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored duration so signals can tell how it changed
+        instance._loaded_duration = instance.__dict__.get("duration")
+        return instance
     
 
 class FeedUserInterest(models.Model):
@@ -152,12 +216,119 @@ class FeedUserInterest(models.Model):
 
     def __str__(self):
         return f"{self.user.username} {"follows" if self.is_interested else "blocks"} {self.feed.name}"
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored interest so signals can tell how it changed
+        instance._loaded_is_interested = instance.__dict__.get("is_interested")
+        return instance
+
+
+class UserProfileVector(models.Model):
+    # Running sums of the embeddings behind each centroid, kept up to date by
+    # signals so the queue never has to average a user's history per request
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="profile_vector"
+    )
+    feed_embedding_sum = VectorField(dimensions=768, default=default_vector)
+    feed_count = models.IntegerField(default=0)
+    positive_clip_embedding_sum = VectorField(dimensions=768, default=default_vector)
+    positive_clip_count = models.IntegerField(default=0)
+    negative_clip_embedding_sum = VectorField(dimensions=768, default=default_vector)
+    negative_clip_count = models.IntegerField(default=0)
+    interest_count = models.IntegerField(default=0)
+    view_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} profile vector"
+
+    @staticmethod
+    def _centroid(embedding_sum, count):
+        if count <= 0:
+            return None
+        return np.asarray(embedding_sum, dtype=np.float32) / count
+
+    @property
+    def feed_centroid(self):
+        return self._centroid(self.feed_embedding_sum, self.feed_count)
+
+    @property
+    def positive_clip_centroid(self):
+        return self._centroid(
+            self.positive_clip_embedding_sum, self.positive_clip_count
+        )
+
+    @property
+    def negative_clip_centroid(self):
+        return self._centroid(
+            self.negative_clip_embedding_sum, self.negative_clip_count
+        )
+
+
+class ClipRankingFeatures(models.Model):
+    # One row per clip with the clip, feed item and feed columns the queue
+    # ranks on, so ranking never joins Clip -> FeedItem -> Feed. Kept in sync
+    # by web/lib/ranking_features.py
+    clip = models.OneToOneField(
+        Clip,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="ranking_features",
+    )
+    feed_item = models.ForeignKey(FeedItem, on_delete=models.CASCADE, related_name="+")
+    feed = models.ForeignKey(Feed, on_delete=models.CASCADE, related_name="+")
+    is_english = models.BooleanField(default=False)
+    popularity_percentile = models.FloatField(default=0.0)
+    # False while the clip or feed embedding is missing
+    has_embeddings = models.BooleanField(default=False)
+    # Half precision, the ranking only needs about three significant digits
+    # and the sources on Clip and Feed keep float32
+    transcript_embedding = HalfVectorField(dimensions=768, null=True, blank=True)
+    feed_topic_embedding = HalfVectorField(dimensions=768, null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Clip ranking features"
+        # Only rankable clips are indexed, the queue never reads the others
+        indexes = [
+            models.Index(
+                fields=["-created_at"],
+                name="cliprank_created_idx",
+                condition=models.Q(is_english=True, has_embeddings=True),
+            ),
+            models.Index(
+                fields=["feed", "-created_at"],
+                name="cliprank_feed_created_idx",
+                condition=models.Q(is_english=True, has_embeddings=True),
+            ),
+            # Read by the in-memory ranking engine to pick up changed rows
+            models.Index(
+                fields=["updated_at"],
+                name="cliprank_updated_idx",
+                condition=models.Q(is_english=True, has_embeddings=True),
+            ),
+            HnswIndex(
+                name="cliprank_transcript_half_idx",
+                fields=["transcript_embedding"],
+                m=16,
+                ef_construction=64,
+                opclasses=["halfvec_cosine_ops"],
+                condition=models.Q(is_english=True, has_embeddings=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Ranking features for clip {self.clip_id}"
+
 
 class Category(models.Model):
     name = models.CharField(max_length=255, unique=True)
     description = models.TextField(blank=True, null=True)
-    embedding = VectorField(dimensions=768, default=default_vector)
+    embedding = VectorField(dimensions=768, null=True, blank=True)
     parent = models.ForeignKey('self', on_delete=models.SET_NULL, related_name='children', null=True, blank=True)
     should_display = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
@@ -179,10 +350,128 @@ class ClipCategoryScore(models.Model):
 
     class Meta:
         unique_together = ('clip', 'category')
+        indexes = [
+            models.Index(fields=['updated_at'], name='clipcategoryscore_updated_idx'),
+        ]
 
     def __str__(self):
         return f'{self.clip.name} - {self.category.name}: {self.score}'
-    
+
+
+class CategoryClipCount(models.Model):
+    # Clips per category, kept up to date by the clip tagger so the category
+    # catalog doesn't count ClipCategoryScore on every request
+    category = models.OneToOneField(
+        Category,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="clip_count_row",
+    )
+    clip_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.category.name}: {self.clip_count} clips"
+
+
+class UserDailyActivity(models.Model):
+    # Views per user per day, rolled up from ClipUserView by
+    # web/lib/activity_rollups.py so analytics never scan the views table
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    day = models.DateField()
+    view_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    total_duration = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "User daily activity"
+        unique_together = ("user", "day")
+        indexes = [models.Index(fields=["day"])]
+
+    def __str__(self):
+        return f"{self.user.username} on {self.day}: {self.view_count} views"
+
+
+class ClipDailyActivity(models.Model):
+    # Views per clip per day, rolled up alongside UserDailyActivity
+    clip = models.ForeignKey(Clip, on_delete=models.CASCADE, related_name="+")
+    day = models.DateField()
+    view_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    total_duration = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Clip daily activity"
+        unique_together = ("clip", "day")
+        indexes = [
+            models.Index(fields=["day"]),
+            models.Index(fields=["updated_at"]),
+        ]
+
+    def __str__(self):
+        return f"Clip {self.clip_id} on {self.day}: {self.view_count} views"
+
+
+class SyncWatermark(models.Model):
+    # How far an incremental job has processed its source table
+    name = models.CharField(max_length=100, primary_key=True)
+    synced_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} synced until {self.synced_until}"
+
+
+class ShapedItem(models.Model):
+    # The columns of the Shaped item dataset, one row per clip. Written by
+    # web/lib/shaped_items.py so Shaped syncs read changed rows instead of
+    # rerunning the clip, feed and category join
+    item = models.OneToOneField(
+        Clip, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    item_name = models.CharField(max_length=2000)
+    item_body = models.TextField()
+    item_summary = models.TextField()
+    item_start_time = models.IntegerField()
+    item_end_time = models.IntegerField()
+    item_audio_bucket_key = models.CharField(max_length=2000)
+    item_transcript_embedding = VectorField(dimensions=768, null=True, blank=True)
+    item_created_at = models.DateTimeField()
+    item_updated_at = models.DateTimeField()
+    item_view_count_30d = models.IntegerField(default=0)
+    item_completed_count_30d = models.IntegerField(default=0)
+    item_categories = models.TextField(null=True, blank=True)
+    item_user_friendly_categories = models.TextField(null=True, blank=True)
+    item_category_scores = models.JSONField(null=True, blank=True)
+    feed_item = models.ForeignKey(FeedItem, on_delete=models.CASCADE, related_name="+")
+    feed_item_name = models.CharField(max_length=255)
+    feed_item_body = models.TextField()
+    feed_item_audio_url = models.URLField(max_length=2000)
+    feed_item_audio_bucket_key = models.CharField(max_length=2000)
+    feed_item_transcript_bucket_key = models.CharField(max_length=2000)
+    feed_item_duration = models.IntegerField()
+    feed_item_posted_at = models.DateTimeField()
+    feed = models.ForeignKey(Feed, on_delete=models.CASCADE, related_name="+")
+    feed_url = models.URLField()
+    feed_name = models.CharField(max_length=255)
+    feed_description = models.TextField()
+    feed_total_itunes_ratings = models.IntegerField(default=0)
+    feed_popularity_percentile = models.FloatField(default=0.0)
+    feed_topic_embedding = VectorField(dimensions=768, null=True, blank=True)
+    feed_artwork_bucket_key = models.CharField(max_length=2000)
+    feed_language = models.CharField(max_length=100)
+    feed_is_english = models.BooleanField(default=False)
+    # When any column last changed, Shaped's replication key
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["updated_at"])]
+
+    def __str__(self):
+        return f"Shaped item for clip {self.item_id}"
+
 
 class UserCategoryScore(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -201,7 +490,7 @@ class Topic(models.Model):
     name = models.CharField(max_length=255, unique=True)
     keywords = ArrayField(models.CharField(max_length=100), blank=True, null=True)
     description = models.TextField(blank=True, null=True)
-    embedding = VectorField(dimensions=768, default=default_vector)
+    embedding = VectorField(dimensions=768, null=True, blank=True)
     parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='children')
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
@@ -227,11 +516,11 @@ class Topic(models.Model):
             models.Index(fields=['name']),
             models.Index(fields=['parent']),
             HnswIndex(
-                name='topic_embedding_idx',
-                fields=['embedding'],
+                OpClass(half_precision('embedding'), name='halfvec_cosine_ops'),
+                name='topic_embedding_partial_idx',
                 m=16,
                 ef_construction=64,
-                opclasses=['vector_cosine_ops']
+                condition=models.Q(embedding__isnull=False),
             ),
         ]
 
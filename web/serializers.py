@@ -1,3 +1,4 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 from web.models import (
     Category,
@@ -103,11 +104,115 @@ class ClipSerializer(TimestampedSerializer):
             "updated_at",
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset, prefix=""):
+        """
+        Load everything the serializer reads in a fixed number of queries.
+
+        Args:
+            queryset: A queryset of clips, or of a model that points to clips.
+            prefix (str): The lookup path from the queryset's model to the clip,
+                e.g. "clip__" for views.
+        """
+        return queryset.select_related(f"{prefix}feed_item__feed").prefetch_related(
+            Prefetch(
+                f"{prefix}clipcategoryscore_set",
+                queryset=ClipCategoryScore.objects.select_related(
+                    "category__parent"
+                ).order_by("-score"),
+                to_attr="sorted_category_scores",
+            )
+        )
+
     def get_categories(self, obj):
-        categories = obj.clipcategoryscore_set.order_by("-score")
+        categories = getattr(obj, "sorted_category_scores", None)
+        if categories is None:
+            categories = obj.clipcategoryscore_set.select_related(
+                "category__parent"
+            ).order_by("-score")
         return ClipCategoryScoreSerializer(categories, many=True).data
 
 
+# Read-only serializers for the hot list endpoints. They produce the same
+# output as the ModelSerializers above but build plain dicts directly,
+# skipping per-field machinery on every row.
+datetime_field = serializers.DateTimeField()
+
+
+def format_datetime(value):
+    return datetime_field.to_representation(value) if value else None
+
+
+class FeedReadSerializer(serializers.BaseSerializer):
+    def to_representation(self, feed):
+        return {
+            "id": feed.id,
+            "name": feed.name,
+            "description": feed.description,
+            "url": feed.url,
+            "artwork_bucket_key": feed.artwork_bucket_key,
+            "created_at": format_datetime(feed.created_at),
+            "updated_at": format_datetime(feed.updated_at),
+        }
+
+
+class CategoryReadSerializer(serializers.BaseSerializer):
+    def to_representation(self, category):
+        parent = category.parent
+        return {
+            "id": category.id,
+            "name": category.name,
+            "parent": category.parent_id,
+            "user_friendly_name": category.name,
+            "user_friendly_parent_name": parent.name if parent else None,
+            "should_display": category.should_display,
+            "clip_count": getattr(category, "clip_count", None),
+        }
+
+
+class ClipReadSerializer(serializers.BaseSerializer):
+    setup_eager_loading = staticmethod(ClipSerializer.setup_eager_loading)
+
+    def to_representation(self, clip):
+        feed_item = clip.feed_item
+        category_scores = getattr(clip, "sorted_category_scores", None)
+        if category_scores is None:
+            category_scores = clip.clipcategoryscore_set.select_related(
+                "category__parent"
+            ).order_by("-score")
+
+        category_serializer = CategoryReadSerializer()
+        return {
+            "id": clip.id,
+            "name": clip.name,
+            "body": clip.body,
+            "summary": clip.summary,
+            "start_time": clip.start_time,
+            "end_time": clip.end_time,
+            "audio_bucket_key": clip.audio_bucket_key,
+            "feed_item": {
+                "id": feed_item.id,
+                "name": feed_item.name,
+                "feed": FeedReadSerializer().to_representation(feed_item.feed),
+                "posted_at": format_datetime(feed_item.posted_at),
+                "created_at": format_datetime(feed_item.created_at),
+                "updated_at": format_datetime(feed_item.updated_at),
+            },
+            "categories": [
+                {
+                    "id": category_score.id,
+                    "category": category_serializer.to_representation(
+                        category_score.category
+                    ),
+                    "score": category_score.score,
+                }
+                for category_score in category_scores
+            ],
+            "created_at": format_datetime(clip.created_at),
+            "updated_at": format_datetime(clip.updated_at),
+        }
+
+
 class ClipUserViewSerializer(TimestampedSerializer):
     class Meta:
         model = ClipUserView
@@ -116,7 +221,11 @@ class ClipUserViewSerializer(TimestampedSerializer):
 
 
 class HistorySerializer(TimestampedSerializer):
-    clip = ClipSerializer()
+    clip = ClipReadSerializer(read_only=True)
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return ClipSerializer.setup_eager_loading(queryset, prefix="clip__")
 
     class Meta:
         model = ClipUserView
@@ -2,9 +2,22 @@ from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 
-from .models import FeedItem, ClipUserView, Feed, Clip
-from .tasks import generate_clips_from_feed_item
-from .lib.logsnag import logsnag_log, logsnag_insight
+from .models import FeedItem, ClipUserView, Feed, FeedUserInterest, Clip
+from .tasks import generate_clips_from_feed_item, schedule_queue_refresh
+from .lib.activity_rollups import record_deleted_view
+from .lib.feed_recommendations import invalidate_recommended_feeds
+from .lib.logsnag_outbox import mark_insight_stale, queue_logsnag_log
+from .lib.profile_vectors import (
+    apply_interest_change,
+    apply_view_change,
+    rebuild_profile_vector,
+)
+from .lib.sessions import record_activity
+from .lib.seen_set import (
+    apply_interest_to_seen_set,
+    apply_view_to_seen_set,
+    invalidate_seen_set,
+)
 
 # ===================================
 # Kick off celery jobs
@@ -17,6 +30,58 @@ def trigger_clip_generation(sender, instance, created, **kwargs):
         generate_clips_from_feed_item.delay(instance.id)
 
 
+# ===================================
+# Keep user profile vectors and seen sets up to date
+# ===================================
+
+
+@receiver(post_save, sender=ClipUserView)
+def update_profile_for_view(sender, instance, created, **kwargs):
+    if not created and not hasattr(instance, "_loaded_duration"):
+        # We don't know what changed, so rebuild from the history
+        rebuild_profile_vector(instance.user_id)
+        invalidate_seen_set(instance.user_id)
+    else:
+        old_duration = None if created else instance._loaded_duration
+        apply_view_change(instance, old_duration, instance.duration)
+        apply_view_to_seen_set(instance, old_duration, instance.duration)
+    instance._loaded_duration = instance.duration
+    schedule_queue_refresh(instance.user_id)
+
+
+@receiver(post_delete, sender=ClipUserView)
+def remove_view_from_profile(sender, instance, **kwargs):
+    old_duration = getattr(instance, "_loaded_duration", instance.duration)
+    apply_view_change(instance, old_duration, None)
+    apply_view_to_seen_set(instance, old_duration, None)
+    record_deleted_view(instance)
+
+
+@receiver(post_save, sender=FeedUserInterest)
+def update_profile_for_interest(sender, instance, created, **kwargs):
+    if not created and not hasattr(instance, "_loaded_is_interested"):
+        # We don't know what changed, so rebuild from the history
+        rebuild_profile_vector(instance.user_id)
+    else:
+        old_is_interested = None if created else instance._loaded_is_interested
+        apply_interest_change(instance, old_is_interested, instance.is_interested)
+    apply_interest_to_seen_set(instance, instance.is_interested)
+    instance._loaded_is_interested = instance.is_interested
+    invalidate_recommended_feeds(instance.user_id)
+    schedule_queue_refresh(instance.user_id)
+
+
+@receiver(post_delete, sender=FeedUserInterest)
+def remove_interest_from_profile(sender, instance, **kwargs):
+    old_is_interested = getattr(
+        instance, "_loaded_is_interested", instance.is_interested
+    )
+    apply_interest_change(instance, old_is_interested, None)
+    apply_interest_to_seen_set(instance, None)
+    invalidate_recommended_feeds(instance.user_id)
+    schedule_queue_refresh(instance.user_id)
+
+
 # ===================================
 # LogSnag event signals
 # ===================================
@@ -27,91 +92,53 @@ def log_new_user(sender, instance, created, **kwargs):
     if created:
         print(f"New user registered: {instance.username}")
 
-        try:
-            logsnag_log(
-                event="New User Registered",
-                description=f"{instance.username} ({instance.email}) registered",
-                icon="👤",
-                channel="users",
-                notify=True,
-                user_id=instance.username,
-            )
-        except Exception as e:
-            print(f"Error sending event to LogSnag: {e}")
+        queue_logsnag_log(
+            event="New User Registered",
+            description=f"{instance.username} ({instance.email}) registered",
+            icon="👤",
+            channel="users",
+            notify=True,
+            user_id=instance.username,
+        )
 
 
 @receiver(post_save, sender=ClipUserView)
 def log_new_session(sender, instance, created, **kwargs):
     if created:
-        last_view = (
-            ClipUserView.objects.filter(user=instance.user)
-            .exclude(id=instance.id)
-            .order_by("-created_at")
-            .first()
-        )
-
-        if (
-            not last_view
-            or (instance.created_at - last_view.created_at).total_seconds() > 1800
-        ):  # 1800 seconds = 30 minutes
-            print(f"New session started for user: {instance.user.username}")
-
-            if "test" in instance.user.username or instance.user.is_superuser:
-                return
-
-            try:
-                logsnag_log(
-                    event="New Session Started",
-                    description=f"{instance.user.username} started a new session",
-                    icon="🎧",
-                    channel="users",
-                    notify=True,
-                    user_id=instance.user.username,
-                )
-            except Exception as e:
-                print(f"Error sending event to LogSnag: {e}")
+        record_activity(instance.user, instance.created_at)
 
 
 @receiver(post_save, sender=Feed)
 def log_new_feed(sender, instance, created, **kwargs):
     if created:
-        try:
-            logsnag_log(
-                event="New Podcast Feed Added",
-                description=f"New podcast feed added: {instance.name}",
-                icon="🎙️",
-                channel="content",
-            )
-        except Exception as e:
-            print(f"Error sending event to LogSnag: {e}")
+        queue_logsnag_log(
+            event="New Podcast Feed Added",
+            description=f"New podcast feed added: {instance.name}",
+            icon="🎙️",
+            channel="content",
+        )
 
 
 @receiver(post_save, sender=FeedItem)
 def log_new_feed_item(sender, instance, created, **kwargs):
     if created:
-        try:
-            logsnag_log(
-                event="New Podcast Episode Added",
-                description=f"New podcast episode added: {instance.name}",
-                icon="🎧",
-                channel="content",
-            )
-        except Exception as e:
-            print(f"Error sending event to LogSnag: {e}")
+        queue_logsnag_log(
+            event="New Podcast Episode Added",
+            description=f"New podcast episode added: {instance.name}",
+            icon="🎧",
+            channel="content",
+        )
 
 
 @receiver(post_save, sender=Clip)
 def log_new_clip(sender, instance, created, **kwargs):
     if created:
-        try:
-            logsnag_log(
-                event="New Podcast Clip Created",
-                description=f"New podcast clip created: {instance.name}",
-                icon="✂️",
-                channel="content",
-            )
-        except Exception as e:
-            print(f"Error sending event to LogSnag: {e}")
+        queue_logsnag_log(
+            event="New Podcast Clip Created",
+            description=f"New podcast clip created: {instance.name}",
+            icon="✂️",
+            channel="content",
+        )
 
 
 # ===================================
@@ -122,39 +149,22 @@ def log_new_clip(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 @receiver(post_delete, sender=User)
 def update_user_insights(sender, instance, **kwargs):
-    try:
-        total_users = User.objects.count()
-        logsnag_insight("Total Users", total_users, "👥")
-    except Exception as e:
-        print(f"Error sending insight to LogSnag: {e}")
+    mark_insight_stale("Total Users")
 
 
 @receiver(post_save, sender=Feed)
 @receiver(post_delete, sender=Feed)
 def update_feed_insights(sender, instance, **kwargs):
-    try:
-        total_feeds = Feed.objects.count()
-        logsnag_insight("Total Podcasts", total_feeds, "🎙️")
-    except Exception as e:
-        print(f"Error sending insight to LogSnag: {e}")
+    mark_insight_stale("Total Podcasts")
 
 
 @receiver(post_save, sender=FeedItem)
 @receiver(post_delete, sender=FeedItem)
 def update_feed_item_insights(sender, instance, **kwargs):
-    try:
-        total_feed_items = FeedItem.objects.count()
-        logsnag_insight("Total Episodes", total_feed_items, "🎧")
-    except Exception as e:
-        print(f"Error sending insight to LogSnag: {e}")
+    mark_insight_stale("Total Episodes")
 
 
 @receiver(post_save, sender=Clip)
 @receiver(post_delete, sender=Clip)
 def update_clip_insights(sender, instance, **kwargs):
-    try:
-        total_clips = Clip.objects.count()
-        logsnag_insight("Total Clips", total_clips, "✂️")
-    except Exception as e:
-        print(f"Error sending insight to LogSnag: {e}")
-    logsnag_insight("Total Clips", total_clips, "✂️")
+    mark_insight_stale("Total Clips")
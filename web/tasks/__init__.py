@@ -7,6 +7,8 @@ from web.tasks.crawler_tasks import *
 from web.tasks.clipper_tasks import *
 from web.tasks.ranker_tasks import *
 from web.tasks.logsnag_tasks import *
+from web.tasks.view_tasks import *
+from web.tasks.export_tasks import *
 
 
 @signals.beat_init.connect
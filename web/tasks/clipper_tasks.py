@@ -10,9 +10,19 @@ from web.lib.clipper import clipper, generate_clips_audio
 from web.lib.clipper.transcript_utils import (
     format_transcript_by_time,
 )
+from web.lib.category_catalog import (
+    CATALOG_INVALIDATION_DEBOUNCE,
+    CATALOG_INVALIDATION_SCHEDULED_KEY,
+    apply_clip_category_change,
+    invalidate_category_catalog,
+    refresh_category_clip_counts,
+)
 from web.lib.embed import get_embedding
+from web.lib.ranking_features import sync_clip_ranking_features
 from web.lib.r2 import get_audio_transcript, download_audio_file, upload_file_to_r2
+from web.lib.redis_client import redis_client
 from web.models import ClipCategoryScore, ClipTopicScore, FeedItem, Clip
+from web.tasks.ranker_tasks import refresh_active_queues
 
 logging = get_task_logger(__name__)
 
@@ -32,6 +42,7 @@ def generate_clips_from_feed_item(feed_item_id: int) -> None:
     clip_audio_bucket_keys = generate_clips_audio(feed_item.audio_bucket_key, clips)
 
     # Save clips to models and normalize audio
+    new_clip_ids = []
     for clip, clip_audio_bucket_key in zip(clips, clip_audio_bucket_keys):
         # Generate clip embeddings
         clip_transcript = format_transcript_by_time(
@@ -50,6 +61,7 @@ def generate_clips_from_feed_item(feed_item_id: int) -> None:
             transcript_embedding=clip_embedding,
             feed_item=feed_item,
         )
+        new_clip_ids.append(new_clip.id)
 
         # Run tagging for the new clip
         run_clip_tagger.delay(new_clip.id)
@@ -57,6 +69,11 @@ def generate_clips_from_feed_item(feed_item_id: int) -> None:
         # Queue normalization task for the new clip
         normalize_clip_audio.delay(new_clip.id)
 
+    # Make the new clips rankable and rerank the queues of active users
+    if new_clip_ids:
+        sync_clip_ranking_features(clip_ids=new_clip_ids)
+        refresh_active_queues.delay()
+
     logging.info("[Finished] Generating clips for feed item: %s", feed_item.name)
 
 
@@ -117,6 +134,7 @@ def update_clip_embedding(clip_id):
     # Update the clip with the new embedding
     clip.transcript_embedding = clip_embedding
     clip.save()
+    sync_clip_ranking_features(clip_ids=[clip.id])
 
     return f"Successfully updated embedding for clip {clip_id}"
 
@@ -140,6 +158,12 @@ def run_clip_tagger(clip_id: int, nearest_neighbors: int = 40) -> None:
         logging.info(f"Mentioned topics: {mentioned_topics}")
 
         with transaction.atomic():
+            old_category_ids = set(
+                ClipCategoryScore.objects.filter(clip=clip).values_list(
+                    "category_id", flat=True
+                )
+            )
+
             # Delete existing ClipTopicScores and ClipCategoriesScores for this clip
             ClipTopicScore.objects.filter(clip=clip).delete()
             ClipCategoryScore.objects.filter(clip=clip).delete()
@@ -164,6 +188,12 @@ def run_clip_tagger(clip_id: int, nearest_neighbors: int = 40) -> None:
                     clip=clip, topic=topic, score=score, is_primary=False
                 )
 
+            # Keep the category catalog's clip counts in step
+            apply_clip_category_change(
+                old_category_ids, {category.id for category in categories}
+            )
+            transaction.on_commit(schedule_category_catalog_invalidation)
+
         logging.info(f"Successfully updated topics for clip {clip_id}")
         return f"Successfully updated topics for clip {clip_id}"
 
@@ -171,3 +201,31 @@ def run_clip_tagger(clip_id: int, nearest_neighbors: int = 40) -> None:
         logging.error(f"Error updating topics for clip {clip_id}: {str(e)}")
         logging.exception("Full traceback:")
         return f"Error updating topics for clip {clip_id}: {str(e)}"
+
+
+def schedule_category_catalog_invalidation() -> None:
+    # Tagging a batch of clips invalidates the catalog once, not per clip
+    if redis_client.set(
+        CATALOG_INVALIDATION_SCHEDULED_KEY,
+        1,
+        nx=True,
+        ex=CATALOG_INVALIDATION_DEBOUNCE,
+    ):
+        invalidate_scheduled_category_catalog.apply_async(
+            countdown=CATALOG_INVALIDATION_DEBOUNCE
+        )
+
+
+@shared_task
+def invalidate_scheduled_category_catalog() -> None:
+    # Cleared first, so clips tagged from here on schedule another invalidation
+    redis_client.delete(CATALOG_INVALIDATION_SCHEDULED_KEY)
+    invalidate_category_catalog()
+
+
+@shared_task
+def refresh_category_catalog() -> None:
+    # Counts are maintained by the clip tagger, this catches any other writers
+    count = refresh_category_clip_counts()
+    invalidate_category_catalog()
+    logging.info(f"Refreshed clip counts for {count} categories")
@@ -1,35 +1,55 @@
-import re
 from assemblyai import TranscriptError
 import requests
 import datetime
+import hashlib
 from celery import shared_task, group
 from django.db import IntegrityError, transaction
 from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.utils import timezone
 from web.lib.crawler import (
-    crawl_itunes_podcast_links,
+    ITUNES_LOOKUP_BATCH_SIZE,
+    crawl_itunes_genres,
     crawl_itunes_ratings,
     crawl_rss_feed,
-    itunes_podcast_lookup,
+    get_itunes_podcast_id,
+    get_recently_rejected_itunes_ids,
+    itunes_podcast_lookup_batch,
+    mark_itunes_podcasts_rejected,
 )
 from web.lib.embed import get_embedding
-from django.contrib.auth.models import User
-from web.models import Feed, FeedItem, FeedTopic, FeedUserInterest
+from web.lib.feed_search import update_feed_search_vectors
+from web.lib.lease import claim_lease, release_lease, renew_lease
+from web.lib.metrics import increment_metric
+from web.models import EpisodeIngest, Feed, FeedItem, FeedTopic, UserProfileVector
 from django.db.models import (
     F,
+    Q,
     Case,
     When,
     FloatField,
-    Avg,
 )
-from pgvector.django import CosineDistance, L2Distance
-from web.lib.r2 import handle_r2_audio_upload, has_artwork, save_artwork
-from web.lib.transcribe import transcribe
+from pgvector.django import CosineDistance
+from web.lib.r2 import (
+    AudioTooLargeError,
+    get_audio_transcript_key,
+    handle_r2_audio_upload,
+    handle_r2_transcript_upload,
+    has_artwork,
+    save_artwork,
+)
+from web.lib.transcribe import (
+    TRANSCRIPT_COMPLETED,
+    TRANSCRIPT_ERROR,
+    fetch_transcription,
+    submit_transcription,
+)
 from web.lib.parsing import get_duration
 
 logging = get_task_logger(__name__)
 
 
-# NOTE: Eventually, to scrape all podcasts, start at the categories page and crawl all links
+# NOTE: Each genre page links out to its letter and pagination sub-pages, which are crawled too
 ITUNES_URLS = [
     "https://podcasts.apple.com/us/genre/podcasts-business/id1321",
     "https://podcasts.apple.com/us/genre/podcasts-comedy/id1303",
@@ -46,76 +66,236 @@ ITUNES_URLS = [
     "https://podcasts.apple.com/us/genre/podcasts-health-fitness/id1512",
 ]
 
+# Long enough to cover the queue wait plus download and transcription, short
+# enough that an episode held by a crashed worker is picked up by a later crawl
+INGEST_LEASE_TTL = 60 * 60 * 3
+
+
+def get_ingest_lease_key(audio_url: str) -> str:
+    url_hash = hashlib.md5(audio_url.encode()).hexdigest()
+    return f"ingest-lease:{url_hash}"
+
+
+# Transcripts that haven't been completed by a webhook after this long are polled
+TRANSCRIPTION_POLL_AFTER = datetime.timedelta(minutes=2)
+# Transcripts the poller found still processing are checked again this often
+TRANSCRIPTION_POLL_INTERVAL = datetime.timedelta(minutes=15)
+# Transcripts still not done after this long are given up on, so the episode
+# can be ingested again by a later crawl
+TRANSCRIPTION_MAX_AGE = datetime.timedelta(hours=6)
+
+# Ratings refresh tiers, a feed is refreshed at the shortest interval it qualifies for
+RATINGS_REFRESH_HIGH_RANK_PERCENTILE = 0.9
+RATINGS_REFRESH_HIGH_CHURN_RATIO = 0.01  # Ratings grew by 1% since the last scrape
+RATINGS_REFRESH_MID_RANK_PERCENTILE = 0.5
+RATINGS_REFRESH_FAST = datetime.timedelta(days=7)
+RATINGS_REFRESH_MEDIUM = datetime.timedelta(days=14)
+RATINGS_REFRESH_SLOW = datetime.timedelta(days=28)
+# The crawl runs weekly, so allow some slack for feeds that are almost due
+RATINGS_REFRESH_SLACK = datetime.timedelta(hours=12)
+# Share of the weekly budget new podcasts can always claim, the rest is kept
+# for refreshing known feeds when there are enough of them due
+NEW_PODCAST_BUDGET_SHARE = 0.5
+
+
+def get_ratings_refresh_interval(
+    popularity_percentile: float, total_ratings: int, ratings_delta: int
+) -> datetime.timedelta:
+    churn = ratings_delta / max(total_ratings - ratings_delta, 1)
+    if (
+        popularity_percentile >= RATINGS_REFRESH_HIGH_RANK_PERCENTILE
+        or churn >= RATINGS_REFRESH_HIGH_CHURN_RATIO
+    ):
+        return RATINGS_REFRESH_FAST
+    if popularity_percentile >= RATINGS_REFRESH_MID_RANK_PERCENTILE:
+        return RATINGS_REFRESH_MEDIUM
+    return RATINGS_REFRESH_SLOW
+
 
 @shared_task
 def crawl_itunes() -> str:
-    itunes_podcast_links = []
-    for url in ITUNES_URLS:
-        logging.info(f"Crawling {url}")
-        podcast_links = crawl_itunes_podcast_links(url)
-        if podcast_links:
-            itunes_podcast_links.extend(podcast_links)
-        else:
-            logging.warning(f"No podcast links found in {url}")
+    # Crawl every genre page along with its letter and pagination sub-pages
+    itunes_podcast_links = crawl_itunes_genres(ITUNES_URLS)
+    if not itunes_podcast_links:
+        logging.warning("No podcast links found in any genre")
+
+    # Remove duplicate podcasts, the same podcast can be listed under many links
+    podcast_links = {}
+    for podcast_url in itunes_podcast_links:
+        podcast_id = get_itunes_podcast_id(podcast_url)
+        if podcast_id is None:
+            logging.error(f"Could not extract podcast ID from URL: {podcast_url}")
+            continue
+        podcast_links.setdefault(podcast_id, podcast_url)
+
+    budget = settings.ITUNES_RATINGS_WEEKLY_BUDGET
+
+    # Podcasts we already have a feed for don't need to be looked up again
+    known_feeds = Feed.objects.filter(itunes_id__in=podcast_links.keys()).values_list(
+        "itunes_id",
+        "url",
+        "name",
+        "popularity_percentile",
+        "total_itunes_ratings",
+        "itunes_ratings_delta",
+        "itunes_ratings_crawled_at",
+    )
 
-    # Remove duplicate URLs
-    itunes_podcast_links = list(set(itunes_podcast_links))
+    # Only refresh the ratings of known feeds that are due for their tier
+    now = timezone.now()
+    due_feeds = []
+    for (
+        itunes_id,
+        feed_url,
+        feed_name,
+        popularity_percentile,
+        total_ratings,
+        ratings_delta,
+        crawled_at,
+    ) in known_feeds:
+        podcast_url = podcast_links.pop(itunes_id)
+        interval = get_ratings_refresh_interval(
+            popularity_percentile, total_ratings, ratings_delta
+        )
+        if crawled_at is None:
+            overdue = float("inf")
+        else:
+            overdue = (now - crawled_at + RATINGS_REFRESH_SLACK) / interval
+        if overdue >= 1:
+            due_feeds.append(
+                (overdue, popularity_percentile, podcast_url, feed_url, feed_name)
+            )
 
-    # Create a group of tasks for processing each podcast
-    tasks = group(
-        crawl_itunes_podcast.s(podcast_url) for podcast_url in itunes_podcast_links
+    # Skip podcasts that were recently looked up and had no feed or ratings
+    rejected_ids = get_recently_rejected_itunes_ids(list(podcast_links.keys()))
+    candidates = [
+        (podcast_id, podcast_url)
+        for podcast_id, podcast_url in podcast_links.items()
+        if podcast_id not in rejected_ids
+    ]
+
+    # New podcasts get their share of the budget, plus whatever the due feeds
+    # don't need. Each one costs a ratings scrape
+    new_budget = max(
+        budget - len(due_feeds), int(budget * NEW_PODCAST_BUDGET_SHARE)
     )
+    new_podcasts = candidates[:new_budget]
+    deferred_count = len(candidates) - len(new_podcasts)
+
+    # Spend the rest of the budget on the most overdue, most popular feeds
+    due_feeds.sort(key=lambda feed: (feed[0], feed[1]), reverse=True)
+    refresh_feeds = due_feeds[: budget - len(new_podcasts)]
+    deferred_count += len(due_feeds) - len(refresh_feeds)
+
+    tasks = [
+        crawl_itunes_podcast.s(podcast_url, feed_url, feed_name)
+        for _, _, podcast_url, feed_url, feed_name in refresh_feeds
+    ]
+
+    # Look up the new podcasts in batches
+    for i in range(0, len(new_podcasts), ITUNES_LOOKUP_BATCH_SIZE):
+        tasks.append(
+            crawl_itunes_lookup.s(new_podcasts[i : i + ITUNES_LOOKUP_BATCH_SIZE])
+        )
 
     # Execute the group of tasks without waiting
-    result = tasks.apply_async()
+    result = group(tasks).apply_async()
 
     # Store the group result ID for potential later use
     group_result_id = result.id
 
     logging.info(
-        f"Started processing {len(itunes_podcast_links)} podcasts. Group result ID: {group_result_id}"
+        f"Started refreshing {len(refresh_feeds)} known and {len(new_podcasts)} new podcasts, skipped {len(rejected_ids)} rejected, deferred {deferred_count} to next week. Group result ID: {group_result_id}"
     )
     return group_result_id
 
 
+@shared_task(
+    autoretry_for=(requests.RequestException, KeyError),
+    max_retries=3,
+    retry_backoff=30,
+)
+def crawl_itunes_lookup(podcasts: list) -> None:
+    """Look up the feed URLs for a batch of (podcast_id, podcast_url) pairs."""
+    podcast_links = dict(podcasts)
+    lookup_results = itunes_podcast_lookup_batch(list(podcast_links.keys()))
+
+    missing = [
+        podcast_id for podcast_id in podcast_links if podcast_id not in lookup_results
+    ]
+    if missing:
+        logging.warning(f"No feed URL found for {len(missing)} podcasts")
+        mark_itunes_podcasts_rejected(missing)
+
+    # Feeds added before we stored iTunes ids only need their id backfilled,
+    # their ratings are refreshed by the tiered refresh on the next crawl
+    existing_feeds = Feed.objects.filter(
+        url__in=[feed_url for feed_url, _ in lookup_results.values()],
+        itunes_id__isnull=True,
+    )
+    existing_feed_ids = {feed.url: feed.id for feed in existing_feeds}
+    tasks = []
+    for podcast_id, (feed_url, feed_name) in lookup_results.items():
+        if podcast_id not in podcast_links:
+            continue
+        if feed_url in existing_feed_ids:
+            try:
+                Feed.objects.filter(id=existing_feed_ids[feed_url]).update(
+                    itunes_id=podcast_id
+                )
+            except IntegrityError:
+                logging.info(f"iTunes id {podcast_id} already belongs to a feed")
+            continue
+        tasks.append(
+            crawl_itunes_podcast.s(podcast_links[podcast_id], feed_url, feed_name)
+        )
+
+    group(tasks).apply_async()
+
+
 @shared_task(
     autoretry_for=(requests.RequestException, KeyError),
     max_retries=3,
     retry_backoff=30,
     rate_limit="20/m",
 )
-def crawl_itunes_podcast(podcast_url):
-    match = re.search(r"/id(\d+)", podcast_url)
-    if not match:
+def crawl_itunes_podcast(podcast_url: str, feed_url: str, feed_name: str) -> None:
+    podcast_id = get_itunes_podcast_id(podcast_url)
+    if podcast_id is None:
         logging.error(f"Could not extract podcast ID from URL: {podcast_url}")
         return
 
-    podcast_id = match.group(1)
-
     try:
         total_ratings = crawl_itunes_ratings(podcast_url)
+        crawled_at = timezone.now()
         if total_ratings == 0:
             logging.warning(f"No ratings found for podcast: {podcast_url}")
-            return
-
-        feed_url, feed_name = itunes_podcast_lookup(podcast_id)
-        if not feed_url:
-            logging.warning(f"No feed URL found for podcast ID {podcast_id}")
+            updated = Feed.objects.filter(url=feed_url).update(
+                itunes_ratings_crawled_at=crawled_at
+            )
+            if not updated:
+                mark_itunes_podcasts_rejected([podcast_id])
             return
 
         try:
             feed, created = Feed.objects.get_or_create(
                 url=feed_url,
                 defaults={
+                    "itunes_id": podcast_id,
                     "name": feed_name,
                     "description": "",
                     "total_itunes_ratings": total_ratings,
+                    "itunes_ratings_crawled_at": crawled_at,
                 },
             )
             if created:
                 logging.info(f"Added new feed: {feed.name}")
             else:
+                feed.itunes_ratings_delta = total_ratings - feed.total_itunes_ratings
+                feed.itunes_ratings_crawled_at = crawled_at
                 feed.total_itunes_ratings = total_ratings
+                if feed.itunes_id is None:
+                    feed.itunes_id = podcast_id
                 feed.save()
                 logging.info(f"Updated existing feed: {feed.name}")
         except IntegrityError:
@@ -146,22 +326,15 @@ def crawl_top_feeds() -> None:
     count_scores = {}
 
     # Use iterator() for memory efficiency
-    for user in User.objects.iterator():
+    for profile in UserProfileVector.objects.filter(feed_count__gt=0).iterator():
         # Get average embedding of feeds the user is interested in
-        avg_embedding = FeedUserInterest.objects.filter(
-            user=user, is_interested=True
-        ).aggregate(Avg("feed__topic_embedding"))["feed__topic_embedding__avg"]
-
-        if avg_embedding is None:
-            continue
+        avg_embedding = profile.feed_centroid
 
         # Get recommended feeds
-        zero_vector = [0.0] * len(avg_embedding)
         user_feed_scores = (
-            Feed.objects.filter(is_english=True)
+            Feed.objects.filter(is_english=True, topic_embedding__isnull=False)
             .exclude(id__in=top_feeds)  # Exclude feeds already in top feeds
             .annotate(
-                feed_zero_distance=L2Distance("topic_embedding", zero_vector),
                 similarity=CosineDistance("topic_embedding", avg_embedding),
                 score=Case(
                     When(
@@ -172,7 +345,6 @@ def crawl_top_feeds() -> None:
                     output_field=FloatField(),
                 ),
             )
-            .filter(feed_zero_distance__gt=0)
             .order_by("-score")[:500]
             .values("id", "score")
         )
@@ -229,11 +401,14 @@ def crawl_feed(feed_id: int, crawl_episodes: bool = True) -> None:
     # Crawl the RSS feed
     feed_data, entry_data = crawl_rss_feed(feed.url)
 
+    search_fields_changed = False
+
     # Check if feed name or description changed
     if feed_data["title"] != feed.name or feed_data["description"] != feed.description:
         feed.name = feed_data["title"]
         feed.description = feed_data["description"]
         feed.save()
+        search_fields_changed = True
         logging.info(
             "Feed name or description changed, updated feed name and description."
         )
@@ -268,6 +443,7 @@ def crawl_feed(feed_id: int, crawl_episodes: bool = True) -> None:
                     feed.topic_embedding = topic_embedding
                     feed.save()
 
+            search_fields_changed = True
             logging.info(f"Added {len(new_topics)} new topics to feed: {feed.name}")
 
     # Check if artwork changed
@@ -280,6 +456,10 @@ def crawl_feed(feed_id: int, crawl_episodes: bool = True) -> None:
         feed.save()
         print("Saved artwork to database")
 
+    # After the last save, which would otherwise write the old vector back
+    if search_fields_changed or feed.search_vector is None:
+        update_feed_search_vectors([feed.id])
+
     if not crawl_episodes:
         logging.info("[Finished] Crawling feed episodes disabled.")
         return
@@ -299,9 +479,20 @@ def crawl_feed(feed_id: int, crawl_episodes: bool = True) -> None:
         logging.info(f"Entry is older than 1 week: {entry_data['published_parsed']}")
         return
 
+    # Claim the episode so overlapping crawls don't download and transcribe it twice
+    lease_token = claim_lease(
+        get_ingest_lease_key(entry_data["audio_url"]), INGEST_LEASE_TTL
+    )
+    if lease_token is None:
+        increment_metric("ingest_duplicates_avoided")
+        logging.info(f"Episode is already being ingested: {entry_data['audio_url']}")
+        return
+
     # Trigger the crawl_feed_item task for the new feed item
     task_id = f"crawl_feed_item-{entry_data['audio_url']}"
-    crawl_feed_item.apply_async(args=[feed.id, entry_data], task_id=task_id)
+    crawl_feed_item.apply_async(
+        args=[feed.id, entry_data, lease_token], task_id=task_id
+    )
 
 
 @shared_task
@@ -331,6 +522,7 @@ def recalculate_feed_embedding_and_topics(feed_id: int) -> None:
                 # Update feed with new embedding
                 feed.topic_embedding = new_embedding
                 feed.save()
+                update_feed_search_vectors([feed.id])
 
             logging.info(
                 f"Recrawled topics and recalculated embedding for feed: {feed.name}"
@@ -352,34 +544,197 @@ def recalculate_feed_embedding_and_topics(feed_id: int) -> None:
     retry_backoff=30,
     rate_limit="100/m",
 )
-def crawl_feed_item(feed_id: int, entry_data: dict) -> FeedItem:
-    # Parse the entry's audio url and published date
+def crawl_feed_item(
+    feed_id: int, entry_data: dict, lease_token: str | None = None
+) -> FeedItem:
     audio_url = entry_data["audio_url"]
-    published_datetime = datetime.datetime(*entry_data["published_parsed"][:6])
+
+    # Hold the episode's lease for the whole ingest. If it expired while this
+    # task was queued, or no lease was passed in, try to claim it again.
+    lease_key = get_ingest_lease_key(audio_url)
+    if lease_token is None or not renew_lease(
+        lease_key, lease_token, INGEST_LEASE_TTL
+    ):
+        lease_token = claim_lease(lease_key, INGEST_LEASE_TTL)
+        if lease_token is None:
+            increment_metric("ingest_duplicates_avoided")
+            logging.info(f"Episode is already being ingested: {audio_url}")
+            return None
 
     # Check if the audio file already exists in the database
     feed_item = FeedItem.objects.filter(audio_url=audio_url).first()
     if feed_item:
+        increment_metric("ingest_duplicates_avoided")
         logging.info(f"Feed item already exists: {feed_item.name}")
+        release_lease(lease_key, lease_token)
         return feed_item.id
 
+    # Check if the episode is already waiting on its transcript
+    if EpisodeIngest.objects.filter(
+        audio_url=audio_url, status=EpisodeIngest.STATUS_TRANSCRIBING
+    ).exists():
+        increment_metric("ingest_duplicates_avoided")
+        logging.info(f"Episode is already being transcribed: {audio_url}")
+        release_lease(lease_key, lease_token)
+        return None
+
     # Save audio file to R2
     logging.info(f"Saving audio file to R2: {audio_url}")
-    audio_bucket_key = handle_r2_audio_upload(audio_url)
+    try:
+        audio_bucket_key = handle_r2_audio_upload(audio_url)
+    except AudioTooLargeError as e:
+        logging.warning(str(e))
+        release_lease(lease_key, lease_token)
+        return None
+
+    # The same episode can show up under a new URL, e.g. a changed tracking
+    # redirect. Point the existing feed item at the new URL instead of
+    # creating a duplicate so later crawls match it.
+    feed_item = FeedItem.objects.filter(
+        feed_id=feed_id, audio_bucket_key=audio_bucket_key
+    ).first()
+    if feed_item:
+        increment_metric("ingest_duplicate_audio")
+        logging.info(f"Feed item already exists with the same audio: {feed_item.name}")
+        feed_item.audio_url = audio_url
+        feed_item.save()
+        release_lease(lease_key, lease_token)
+        return feed_item.id
+
+    # Skip transcription if the same audio was transcribed before
+    transcript_bucket_key = get_audio_transcript_key(audio_bucket_key)
+    if transcript_bucket_key:
+        feed_item = create_feed_item(
+            feed_id, entry_data, audio_bucket_key, transcript_bucket_key
+        )
+        release_lease(lease_key, lease_token)
+        return feed_item.id
+
+    # Submit the transcription without waiting on it, the feed item is created
+    # by complete_transcription once AssemblyAI calls our webhook or the poller
+    # sees the transcript is done
+    logging.info(f"Submitting transcription: {audio_url}")
+    transcript_id = submit_transcription(audio_bucket_key)
+    EpisodeIngest.objects.update_or_create(
+        audio_url=audio_url,
+        defaults={
+            "feed_id": feed_id,
+            "entry_data": entry_data,
+            "audio_bucket_key": audio_bucket_key,
+            "transcript_id": transcript_id,
+            "lease_token": lease_token,
+            "status": EpisodeIngest.STATUS_TRANSCRIBING,
+            "polled_at": None,
+        },
+    )
+    return None
 
-    # Transcribe the audio file
-    logging.info(f"Transcribing: {audio_url}")
-    transcript_bucket_key = transcribe(audio_bucket_key)
 
-    # Create a new FeedItem
-    feed_item = FeedItem.objects.create(
+def create_feed_item(
+    feed_id: int, entry_data: dict, audio_bucket_key: str, transcript_bucket_key: str
+) -> FeedItem:
+    published_datetime = datetime.datetime(*entry_data["published_parsed"][:6])
+    return FeedItem.objects.create(
         name=entry_data.get("title", "Untitled"),
         body=entry_data.get("summary", ""),
-        audio_url=audio_url,
+        audio_url=entry_data["audio_url"],
         audio_bucket_key=audio_bucket_key,
         transcript_bucket_key=transcript_bucket_key,
         duration=get_duration(entry_data.get("itunes_duration", "0:00")),
         posted_at=published_datetime,
         feed_id=feed_id,
     )
+
+
+@shared_task(
+    autoretry_for=(TranscriptError,),
+    max_retries=3,
+    retry_backoff=30,
+)
+def complete_transcription(transcript_id: str) -> int | None:
+    ingest = EpisodeIngest.objects.filter(
+        transcript_id=transcript_id, status=EpisodeIngest.STATUS_TRANSCRIBING
+    ).first()
+    if not ingest:
+        logging.info(f"No pending episode for transcript: {transcript_id}")
+        return None
+
+    status, utterances = fetch_transcription(transcript_id)
+    lease_key = get_ingest_lease_key(ingest.audio_url)
+
+    if status == TRANSCRIPT_ERROR:
+        logging.error(f"Transcription failed for: {ingest.audio_url}")
+        ingest.status = EpisodeIngest.STATUS_FAILED
+        ingest.save()
+        release_lease(lease_key, ingest.lease_token)
+        return None
+
+    if status != TRANSCRIPT_COMPLETED:
+        logging.info(f"Transcript {transcript_id} is still {status}")
+        # Back the poller off, updated_at is left alone for the max age
+        EpisodeIngest.objects.filter(
+            id=ingest.id, status=EpisodeIngest.STATUS_TRANSCRIBING
+        ).update(polled_at=timezone.now())
+        return None
+
+    transcript_bucket_key = handle_r2_transcript_upload(
+        utterances, ingest.audio_bucket_key
+    )
+
+    # The webhook and the poller can both get here, only one creates the item
+    with transaction.atomic():
+        claimed = EpisodeIngest.objects.filter(
+            id=ingest.id, status=EpisodeIngest.STATUS_TRANSCRIBING
+        ).update(status=EpisodeIngest.STATUS_COMPLETED, updated_at=timezone.now())
+        if not claimed:
+            return None
+
+        feed_item = create_feed_item(
+            ingest.feed_id,
+            ingest.entry_data,
+            ingest.audio_bucket_key,
+            transcript_bucket_key,
+        )
+
+    release_lease(lease_key, ingest.lease_token)
     return feed_item.id
+
+
+@shared_task
+def poll_pending_transcriptions() -> None:
+    now = timezone.now()
+    expired_ingests = EpisodeIngest.objects.filter(
+        status=EpisodeIngest.STATUS_TRANSCRIBING,
+        updated_at__lte=now - TRANSCRIPTION_MAX_AGE,
+    ).values_list("id", "audio_url", "lease_token")
+    for ingest_id, audio_url, lease_token in expired_ingests:
+        # Skip it if the webhook completed it in the meantime
+        failed = EpisodeIngest.objects.filter(
+            id=ingest_id, status=EpisodeIngest.STATUS_TRANSCRIBING
+        ).update(status=EpisodeIngest.STATUS_FAILED, updated_at=now)
+        if failed:
+            logging.error(f"Transcription timed out for: {audio_url}")
+            release_lease(get_ingest_lease_key(audio_url), lease_token)
+
+    # Fallback for missed webhooks, each check is one cheap status request
+    transcript_ids = (
+        EpisodeIngest.objects.filter(
+            status=EpisodeIngest.STATUS_TRANSCRIBING,
+            updated_at__lte=now - TRANSCRIPTION_POLL_AFTER,
+        )
+        .filter(
+            Q(polled_at__isnull=True)
+            | Q(polled_at__lte=now - TRANSCRIPTION_POLL_INTERVAL)
+        )
+        .values_list("transcript_id", flat=True)
+    )
+
+    for transcript_id in transcript_ids:
+        complete_transcription.delay(transcript_id)
+
+
+@shared_task
+def update_all_feed_search_vectors() -> None:
+    # Catches feeds changed outside the crawler, e.g. in the admin
+    updated = update_feed_search_vectors()
+    logging.info(f"Updated search vectors for {updated} feeds")
@@ -0,0 +1,14 @@
+from celery import shared_task
+from web.lib.shaped_items import sync_shaped_items
+import time
+
+
+@shared_task
+def sync_all_shaped_items(full: bool = False) -> None:
+    start_time = time.time()
+    result = sync_shaped_items(full=full)
+    end_time = time.time()
+    print(
+        f"Compared {result['compared']} clips and wrote {result['written']} "
+        f"Shaped items in {end_time - start_time:.2f} seconds"
+    )
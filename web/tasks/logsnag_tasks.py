@@ -1,41 +1,34 @@
 from celery import shared_task
 from django.utils import timezone
-from datetime import timedelta
 
-from web.models import ClipUserView
+from web.lib.activity_rollups import (
+    RollupsNotBackfilledError,
+    count_active_users,
+    update_activity_rollups,
+)
 from web.lib.logsnag import logsnag_insight
+from web.lib.logsnag_outbox import flush_logsnag_outbox
+from web.lib.metrics import get_metrics
 
 
 @shared_task
 def update_active_users():
-    now = timezone.now()
-    yesterday = now - timedelta(days=1)
-    week_ago = now - timedelta(days=7)
-    month_ago = now - timedelta(days=30)
-
-    # Calculate daily active users
-    daily_active_users = (
-        ClipUserView.objects.filter(created_at__gte=yesterday)
-        .values("user")
-        .distinct()
-        .count()
-    )
-
-    # Calculate weekly active users
-    weekly_active_users = (
-        ClipUserView.objects.filter(created_at__gte=week_ago)
-        .values("user")
-        .distinct()
-        .count()
-    )
-
-    # Calculate monthly active users
-    monthly_active_users = (
-        ClipUserView.objects.filter(created_at__gte=month_ago)
-        .values("user")
-        .distinct()
-        .count()
-    )
+    # Counted from the daily rollups for the full days before today, which
+    # are brought up to date first. Counts from missing or partial rollups
+    # would be sent as real drops in activity, so nothing is sent then.
+    try:
+        rolled_up_days = update_activity_rollups()
+    except RollupsNotBackfilledError as e:
+        print(f"Skipping active users insights: {e}")
+        return None
+    if rolled_up_days is None:
+        print("Skipping active users insights: the activity rollups are running")
+        return None
+
+    today = timezone.now().date()
+    daily_active_users = count_active_users(today, 1)
+    weekly_active_users = count_active_users(today, 7)
+    monthly_active_users = count_active_users(today, 30)
 
     # Send insights to LogSnag
     try:
@@ -50,3 +43,24 @@ def update_active_users():
         "weekly_active_users": weekly_active_users,
         "monthly_active_users": monthly_active_users,
     }
+
+
+@shared_task
+def update_metric_insights():
+    metrics = get_metrics()
+
+    # Send every counter to LogSnag, e.g. ingest_duplicates_avoided
+    for name, value in metrics.items():
+        try:
+            logsnag_insight(name.replace("_", " ").title(), value, "📈")
+        except Exception as e:
+            print(f"Error sending {name} insight to LogSnag: {e}")
+
+    return metrics
+
+
+@shared_task
+def flush_logsnag_events():
+    # Signals only queue events and mark insights stale, so each insight is
+    # sent at most once per run however many rows changed
+    return flush_logsnag_outbox()
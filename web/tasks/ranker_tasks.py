@@ -4,8 +4,18 @@ from django.db.models.functions import PercentRank
 from django.core.paginator import Paginator
 from celery import shared_task
 from web.models import Feed
+from web.lib.exploration import build_exploration_pool, store_exploration_pool
+from web.lib.profile_vectors import get_profile_vector, rebuild_profile_vector
+from web.lib.queue_cache import QUEUE_SIZE, get_active_user_ids, store_queue
+from web.lib.ranking import rank_queue_clips
+from web.lib.ranking_features import sync_clip_ranking_features
+from web.lib.redis_client import redis_client
+from django.contrib.auth.models import User
 import time
 
+# Bursts of profile changes (e.g. a listening session) are coalesced into one refresh
+QUEUE_REFRESH_DEBOUNCE = 30
+
 
 @shared_task
 def rank_all_feeds_popularity() -> None:
@@ -48,3 +58,79 @@ def rank_all_feeds_popularity() -> None:
     end_time = time.time()
     print(f"Total execution time: {end_time - start_time:.2f} seconds")
     print("Successfully updated percentile ranks for all Feed instances")
+
+    # Copy the new percentiles into the clip ranking features
+    sync_all_clip_ranking_features.delay()
+
+
+@shared_task
+def sync_all_clip_ranking_features() -> None:
+    # Also picks up feed language and topic embedding changes made since the
+    # last sync, only rows that changed are written
+    start_time = time.time()
+    changed = sync_clip_ranking_features()
+    end_time = time.time()
+    print(
+        f"Synced {changed} clip ranking features in {end_time - start_time:.2f} seconds"
+    )
+
+
+@shared_task
+def rebuild_all_profile_vectors() -> None:
+    # Profiles are updated incrementally, this resyncs them with any feed or
+    # clip embeddings that were recalculated since
+    start_time = time.time()
+    user_ids = User.objects.values_list("id", flat=True)
+    for user_id in user_ids.iterator():
+        rebuild_profile_vector(user_id)
+
+    end_time = time.time()
+    print(f"Rebuilt profile vectors in {end_time - start_time:.2f} seconds")
+
+
+def schedule_queue_refresh(user_id: int) -> None:
+    scheduled_key = f"queue:{user_id}:refresh-scheduled"
+    if redis_client.set(scheduled_key, 1, nx=True, ex=QUEUE_REFRESH_DEBOUNCE):
+        refresh_user_queue.apply_async(
+            args=[user_id], countdown=QUEUE_REFRESH_DEBOUNCE
+        )
+
+
+@shared_task
+def refresh_user_queue(user_id: int) -> None:
+    start_time = time.time()
+    user = User.objects.filter(id=user_id).first()
+    if user is None:
+        return
+
+    profile = get_profile_vector(user_id)
+
+    if profile.interest_count < 3 or profile.feed_centroid is None:
+        store_queue(user_id, [])
+        return
+
+    ranked_clips = rank_queue_clips(user, profile, [], [], limit=QUEUE_SIZE)
+    store_queue(user_id, ranked_clips)
+
+    end_time = time.time()
+    print(
+        f"Refreshed queue for user {user_id} with {len(ranked_clips)} clips in {end_time - start_time:.2f} seconds"
+    )
+
+
+@shared_task
+def refresh_active_queues() -> None:
+    # New clips landed, rerank the queues of users who are likely to open the app
+    for user_id in get_active_user_ids():
+        schedule_queue_refresh(user_id)
+
+
+@shared_task
+def refresh_exploration_pool() -> None:
+    start_time = time.time()
+    pool = build_exploration_pool()
+    store_exploration_pool(pool)
+    end_time = time.time()
+    print(
+        f"Refreshed exploration pool with {len(pool)} clips in {end_time - start_time:.2f} seconds"
+    )
@@ -0,0 +1,72 @@
+from celery import shared_task
+from django.contrib.auth.models import User
+from web.models import ClipUserView
+from web.lib.activity_rollups import (
+    RollupsNotBackfilledError,
+    update_activity_rollups,
+)
+from web.lib.lease import claim_lease, release_lease
+from web.lib.profile_vectors import apply_view_change
+from web.lib.seen_set import apply_view_to_seen_set
+from web.lib.sessions import record_activity
+from web.lib.view_buffer import flush_view_buffer
+from web.tasks.ranker_tasks import schedule_queue_refresh
+import time
+
+FLUSH_LEASE_KEY = "views:flush-lease"
+FLUSH_LEASE_TTL = 60 * 5
+
+
+def apply_flushed_view_changes(changes: list) -> None:
+    """Run what the ClipUserView post_save signals do for bulk upserted views."""
+    user_ids = set()
+    new_view_times = {}
+    for view_id, user_id, clip_id, old_duration, new_duration, created_at in changes:
+        view = ClipUserView(id=view_id, user_id=user_id, clip_id=clip_id)
+        apply_view_change(view, old_duration, new_duration)
+        apply_view_to_seen_set(view, old_duration, new_duration)
+        user_ids.add(user_id)
+        if old_duration is None:
+            new_view_times.setdefault(user_id, []).append(created_at)
+
+    for user_id in user_ids:
+        schedule_queue_refresh(user_id)
+
+    users = User.objects.in_bulk(list(new_view_times))
+    for user_id, created_ats in new_view_times.items():
+        if user_id in users:
+            record_activity(users[user_id], min(created_ats), max(created_ats))
+
+
+@shared_task
+def flush_buffered_views() -> None:
+    token = claim_lease(FLUSH_LEASE_KEY, FLUSH_LEASE_TTL)
+    if token is None:
+        # The previous flush is still running
+        return
+
+    try:
+        start_time = time.time()
+        changed = flush_view_buffer(on_changes=apply_flushed_view_changes)
+        if changed:
+            end_time = time.time()
+            print(
+                f"Flushed {changed} buffered views in {end_time - start_time:.2f} seconds"
+            )
+    finally:
+        release_lease(FLUSH_LEASE_KEY, token)
+
+
+@shared_task
+def update_all_activity_rollups() -> None:
+    start_time = time.time()
+    try:
+        days = update_activity_rollups()
+    except RollupsNotBackfilledError as e:
+        print(str(e))
+        return
+    if days is None:
+        # The previous run is still going
+        return
+    end_time = time.time()
+    print(f"Rolled up {days} days of views in {end_time - start_time:.2f} seconds")
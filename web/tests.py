@@ -0,0 +1,202 @@
+from types import SimpleNamespace
+from unittest import mock
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from web import serializers
+from web.models import (
+    Category,
+    Clip,
+    ClipCategoryScore,
+    ClipUserView,
+    Feed,
+    FeedItem,
+    UserCategoryScore,
+)
+
+
+class QueryCountTests(APITestCase):
+    """
+    Every list endpoint runs the same number of queries however many rows
+    it returns. Fixtures are bulk created so the post_save signals, which
+    need Redis and Celery, don't run.
+    """
+
+    def setUp(self):
+        (self.user,) = User.objects.bulk_create([User(username="listener")])
+        self.client.force_authenticate(self.user)
+        (parent,) = Category.objects.bulk_create([Category(name="Science")])
+        self.categories = Category.objects.bulk_create(
+            [
+                Category(name=f"Topic {index}", parent=parent, should_display=True)
+                for index in range(3)
+            ]
+        )
+        (self.feed,) = Feed.objects.bulk_create(
+            [
+                Feed(
+                    url="https://example.com/feed.xml",
+                    name="Feed",
+                    description="",
+                    artwork_bucket_key="artwork",
+                    language="en",
+                    is_english=True,
+                )
+            ]
+        )
+        self.clip_count = 0
+
+    def create_clips(self, count: int) -> list:
+        """Clips in their own feed items, each with a score in every category."""
+        feed_items = FeedItem.objects.bulk_create(
+            [
+                FeedItem(
+                    name=f"Episode {self.clip_count + index}",
+                    body="",
+                    audio_url=f"https://example.com/{self.clip_count + index}.mp3",
+                    audio_bucket_key="audio",
+                    transcript_bucket_key="transcript",
+                    duration=600,
+                    posted_at=timezone.now(),
+                    feed=self.feed,
+                )
+                for index in range(count)
+            ]
+        )
+        self.clip_count += count
+        clips = Clip.objects.bulk_create(
+            [
+                Clip(
+                    name=feed_item.name,
+                    body="",
+                    summary="",
+                    start_time=0,
+                    end_time=60,
+                    audio_bucket_key="clip",
+                    feed_item=feed_item,
+                )
+                for feed_item in feed_items
+            ]
+        )
+        ClipCategoryScore.objects.bulk_create(
+            [
+                ClipCategoryScore(clip=clip, category=category, score=0.5)
+                for clip in clips
+                for category in self.categories
+            ]
+        )
+        return clips
+
+    def assert_fixed_queries(self, num: int, request, grow) -> None:
+        """The request runs num queries, before and after more rows exist."""
+        with self.assertNumQueries(num):
+            response = request()
+        self.assertEqual(response.status_code, 200)
+        grow()
+        with self.assertNumQueries(num):
+            response = request()
+        self.assertEqual(response.status_code, 200)
+
+    def test_queue(self):
+        clip_ids = [clip.id for clip in self.create_clips(2)]
+        profile = SimpleNamespace(interest_count=3, feed_centroid=[1.0], view_count=0)
+
+        def grow():
+            clip_ids.extend(clip.id for clip in self.create_clips(7))
+
+        # Ranking and the exploration pool live in Redis, only the clip
+        # loading is under test
+        with (
+            mock.patch("web.views.get_profile_vector", return_value=profile),
+            mock.patch("web.views.pop_queue_clip_ids", return_value=clip_ids),
+            mock.patch("web.views.sample_exploration_clip_id", return_value=None),
+        ):
+            # Clips, then their category scores with categories and parents
+            self.assert_fixed_queries(2, lambda: self.client.get("/queue/"), grow)
+
+    def test_history(self):
+        def view_clips(count):
+            ClipUserView.objects.bulk_create(
+                [
+                    ClipUserView(user=self.user, clip=clip, duration=50)
+                    for clip in self.create_clips(count)
+                ]
+            )
+
+        view_clips(1)
+        # Count, views with their clips, then category scores
+        self.assert_fixed_queries(
+            3, lambda: self.client.get("/history/"), lambda: view_clips(8)
+        )
+
+    def test_clip_serializer(self):
+        clip_ids = [clip.id for clip in self.create_clips(1)]
+
+        def serialize():
+            clips = serializers.ClipSerializer.setup_eager_loading(
+                Clip.objects.filter(id__in=clip_ids)
+            )
+            data = serializers.ClipSerializer(clips, many=True).data
+            self.assertEqual(len(data), len(clip_ids))
+            return SimpleNamespace(status_code=200)
+
+        def grow():
+            clip_ids.extend(clip.id for clip in self.create_clips(8))
+
+        self.assert_fixed_queries(2, serialize, grow)
+
+    def test_categories(self):
+        def grow():
+            (parent,) = Category.objects.bulk_create([Category(name="History")])
+            Category.objects.bulk_create(
+                [Category(name=f"Era {index}", parent=parent) for index in range(5)]
+            )
+
+        # The catalog cache is in Redis, every request misses it here
+        with (
+            mock.patch("web.views.get_catalog_etag", return_value='"catalog"'),
+            mock.patch("web.views.get_cached_catalog", return_value=None),
+            mock.patch("web.views.store_cached_catalog"),
+        ):
+            # Count, then categories with their parents and clip counts
+            self.assert_fixed_queries(2, lambda: self.client.get("/categories/"), grow)
+
+    def test_user_category_scores(self):
+        def score_categories(categories):
+            UserCategoryScore.objects.bulk_create(
+                [
+                    UserCategoryScore(user=self.user, category=category, score=1.0)
+                    for category in categories
+                ]
+            )
+
+        score_categories(self.categories[:1])
+        self.assert_fixed_queries(
+            2,
+            lambda: self.client.get("/user_category_scores/"),
+            lambda: score_categories(self.categories[1:]),
+        )
+
+
+class FeedViewSetTests(APITestCase):
+    def setUp(self):
+        (user,) = User.objects.bulk_create([User(username="listener")])
+        self.client.force_authenticate(user)
+        (self.feed,) = Feed.objects.bulk_create(
+            [
+                Feed(
+                    url="https://example.com/feed.xml",
+                    name="Feed",
+                    description="",
+                    artwork_bucket_key="artwork",
+                    language="en",
+                    is_english=True,
+                )
+            ]
+        )
+
+    def test_retrieve_ignores_search_parameters(self):
+        # Autocomplete slices the queryset, which get_object can't filter
+        response = self.client.get(f"/feed/{self.feed.id}/?autocomplete=Fe")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["id"], self.feed.id)
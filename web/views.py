@@ -1,39 +1,24 @@
+import hmac
 import random
 import re
-from django.utils import timezone
-from datetime import timedelta
+import time
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.throttling import AnonRateThrottle
-from django.contrib.postgres.search import TrigramSimilarity
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.contrib.auth.tokens import default_token_generator
 from django.db import IntegrityError, connection
-from django.db.models import (
-    Q,
-    F,
-    Case,
-    When,
-    Value,
-    FloatField,
-    Subquery,
-    OuterRef,
-    Avg,
-    ExpressionWrapper,
-    Window,
-    F,
-    Exists,
-    Count,
-)
-from django.db.models.functions import Extract, RowNumber
+from django.db.models import F
+from django.db.models.functions import Coalesce
 from django.shortcuts import render
 from django.views import View
 from django.http import JsonResponse
@@ -43,14 +28,28 @@ from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils.decorators import method_decorator
 from django.conf import settings
 from django.urls import reverse
-from pgvector.django import CosineDistance
-from django.contrib.postgres.aggregates import ArrayAgg
 from web import serializers
+from web.lib.category_catalog import (
+    etag_matches,
+    get_cached_catalog,
+    get_catalog_etag,
+    get_catalog_page,
+    get_catalog_response_data,
+    store_cached_catalog,
+)
+from web.lib.exploration import sample_exploration_clip_id
+from web.lib.feed_recommendations import get_recommended_feed_ids
+from web.lib.feed_search import autocomplete_feeds, search_feeds
+from web.lib.profile_vectors import get_profile_vector
+from web.lib.queue_cache import pop_queue_clip_ids
+from web.lib.ranking import rank_queue_clip_ids
+from web.lib.view_buffer import MAX_VIEW_BATCH_SIZE, buffer_views
+from web.tasks import complete_transcription, schedule_queue_refresh
 from web.models import (
     Category,
     Clip,
+    ClipRankingFeatures,
     ClipUserView,
-    FeedTopic,
     FeedUserInterest,
     Feed,
     UserCategoryScore,
@@ -60,46 +59,27 @@ import resend
 
 class RecommendedFeedsViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
-    serializer_class = serializers.FeedSerializer
+    serializer_class = serializers.FeedReadSerializer
 
     def get_queryset(self):
-        user = self.request.user
-
-        # Get average embedding of feeds the user is interested in
-        avg_feed_embedding = FeedUserInterest.objects.filter(
-            user=user, is_interested=True
-        ).aggregate(Avg("feed__topic_embedding"))["feed__topic_embedding__avg"]
-
-        # Get recommended feeds
-        recommended_feeds = (
-            Feed.objects.filter(is_english=True)
-            .exclude(user_follows__user=user)  # Exclude feeds the user already follows
-            .exclude(topic_embedding=[0] * 768)
-            .annotate(
-                similarity=CosineDistance("topic_embedding", avg_feed_embedding),
-                score=Case(
-                    When(
-                        similarity__isnull=False,
-                        then=(1 - F("similarity")) + F("popularity_percentile") * 0.2,
-                    ),
-                    default=F("popularity_percentile"),
-                    output_field=FloatField(),
-                ),
-                topic_texts=Subquery(
-                    FeedTopic.objects.filter(feed=OuterRef("pk"))
-                    .values("feed")
-                    .annotate(topics=ArrayAgg("text"))
-                    .values("topics")
-                ),
-            )
-            .order_by("-score")
+        return Feed.objects.filter(is_english=True).defer(
+            "topic_embedding", "search_vector"
         )
 
-        return recommended_feeds
+    def list(self, request, *args, **kwargs):
+        # Ranked ids are cached per user until their follows change, only the
+        # requested page of feeds is loaded
+        feed_ids = get_recommended_feed_ids(request.user.id)
+        page_ids = self.paginate_queryset(feed_ids)
+        feeds_by_id = self.get_queryset().in_bulk(page_ids)
+        feeds = [feeds_by_id[feed_id] for feed_id in page_ids if feed_id in feeds_by_id]
+
+        serializer = self.get_serializer(feeds, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 class QueueViewSet(viewsets.ReadOnlyModelViewSet):
-    serializer_class = serializers.ClipSerializer
+    serializer_class = serializers.ClipReadSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -109,6 +89,7 @@ class QueueViewSet(viewsets.ReadOnlyModelViewSet):
         exclude_clip_ids = self.request.query_params.getlist("exclude_clip_ids", [])
         if len(exclude_clip_ids) == 1 and "," in exclude_clip_ids[0]:
             exclude_clip_ids = exclude_clip_ids[0].split(",")
+        exclude_clip_ids = [int(id) for id in exclude_clip_ids if id.isdigit()]
 
         # Get topic_ids from query parameters
         topic_ids = self.request.query_params.getlist("topic_ids", [])
@@ -116,199 +97,111 @@ class QueueViewSet(viewsets.ReadOnlyModelViewSet):
             topic_ids = topic_ids[0].split(",")
         topic_ids = [int(id) for id in topic_ids if id.isdigit()]
 
-        # Exclude clips from feeds the user has already viewed
-        recent_feeds = (
-            ClipUserView.objects.filter(user=user)
-            .order_by("-created_at")[:10]
-            .values_list("clip__feed_item__feed", flat=True)
-        )
+        # Centroids and counts are maintained as the user's history changes
+        profile = get_profile_vector(user.id)
 
-        if FeedUserInterest.objects.filter(user=user).count() < 3:
+        if profile.interest_count < 3:
             print("Not enough followed feeds for user")
             return []
 
-        # Get average embedding of feeds the user is interested in
-        avg_feed_embedding = FeedUserInterest.objects.filter(
-            user=user, is_interested=True
-        ).aggregate(Avg("feed__topic_embedding"))["feed__topic_embedding__avg"]
-
-        # Get blocked feeds
-        blocked_feeds = FeedUserInterest.objects.filter(
-            user=user, is_interested=False
-        ).values_list("feed_id", flat=True)
-
-        # Get feed items with incomplete clips
-        incomplete_feed_items = (
-            ClipUserView.objects.filter(user=user, duration__lt=90)
-            .values_list("clip__feed_item", flat=True)
-            .distinct()
-        )
-
-        # Find clips that are in exclude_clip_ids but not viewed
-        unviewed_excluded_clips = Clip.objects.filter(id__in=exclude_clip_ids).exclude(
-            Exists(ClipUserView.objects.filter(user=user, clip=OuterRef("pk")))
-        )
-
-        # Exclude feeds that are have clips in exclude_clip_ids but not viewed because they were likely viewed and not completed
-        excluded_clip_feeds = unviewed_excluded_clips.values_list(
-            "feed_item__feed", flat=True
-        ).distinct()
-
-        if avg_feed_embedding is None:
+        if profile.feed_centroid is None:
             return Response(
                 {"detail": "Not enough data to make recommendations."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Calculate the time decay factor
-        current_time = timezone.now()
-
-        base_query = (
-            Clip.objects.filter(feed_item__feed__is_english=True)
-            .select_related("feed_item__feed")
-            .prefetch_related("user_views")
-            .annotate(
-                feed_score=CosineDistance(
-                    "feed_item__feed__topic_embedding", avg_feed_embedding
-                ),
-                feed_popularity=F("feed_item__feed__popularity_percentile"),
-                days_old=Extract(current_time - F("created_at"), "day"),
-                recency_score=ExpressionWrapper(
-                    1 / (1 + F("days_old") / 7), output_field=FloatField()
-                ),
-            )
-            .exclude(transcript_embedding=[0] * 768)
-            .exclude(feed_item__feed__topic_embedding=[0] * 768)
-            .exclude(id__in=exclude_clip_ids)
-            .exclude(user_views__user=user)
-            .exclude(feed_item__feed__in=recent_feeds)
-            .exclude(feed_item__feed__id__in=blocked_feeds)
-            .exclude(feed_item__id__in=incomplete_feed_items)
-            .exclude(feed_item__id__in=excluded_clip_feeds)
-        )
+        print("Using warm start" if profile.view_count >= 10 else "Using cold start")
 
-        # Filter by topic_ids if provided
-        if topic_ids:
-            # TODO: Possibly integrate the score so more relevant clips are ranked higher
-            base_query = base_query.filter(
-                clipcategoryscore__category__id__in=topic_ids,
-                clipcategoryscore__score__gt=0,
-            )
+        # Serve from the precomputed queue, topic queues are always ranked live
+        final_clip_ids = None
+        if not topic_ids:
+            final_clip_ids = pop_queue_clip_ids(user, exclude_clip_ids, limit=9)
 
-        if ClipUserView.objects.filter(user=user).count() < 10:
-            print("Using cold start")
-            # Cold start: use only feed embeddings if no clip data is available
-            ranked_clips = base_query.annotate(
-                combined_score=Case(
-                    When(
-                        feed_score__isnull=False,
-                        then=(1 - F("feed_score"))
-                        + F("feed_popularity") * 0.25
-                        + F("recency_score") * 0.5,
-                    ),
-                    default=Value(0),
-                    output_field=FloatField(),
-                ),
+        if final_clip_ids is None:
+            # Pull candidates from the ANN indexes and rerank them, top clip per feed
+            start_time = time.time()
+            final_clip_ids = rank_queue_clip_ids(
+                user, profile, exclude_clip_ids, topic_ids, limit=9
             )
-        else:
-            print("Using warm start")
-            # Get average embedding of clips the user has viewed or scored highly
-            avg_positive_clip_embedding = Clip.objects.filter(
-                user_views__user=user, user_views__duration__gt=90
-            ).aggregate(Avg("transcript_embedding"))["transcript_embedding__avg"]
-
-            # Get negative average clip embedding (views < 30)
-            avg_negative_clip_embedding = Clip.objects.filter(
-                user_views__user=user, user_views__duration__lt=30
-            ).aggregate(Avg("transcript_embedding"))["transcript_embedding__avg"]
-
-            # Use both feed and clip embeddings for ranking
-            ranked_clips = base_query.annotate(
-                positive_clip_score=CosineDistance(
-                    "transcript_embedding", avg_positive_clip_embedding
-                ),
-                negative_clip_score=CosineDistance(
-                    "transcript_embedding", avg_negative_clip_embedding
-                ),
-                combined_score=Case(
-                    When(
-                        feed_score__isnull=False,
-                        positive_clip_score__isnull=False,
-                        negative_clip_score__isnull=False,
-                        then=(1 - F("feed_score"))
-                        + (1 - F("positive_clip_score"))
-                        + F("negative_clip_score")
-                        + F("feed_popularity") * 0.25
-                        + F("recency_score") * 0.5,
-                    ),
-                    default=Value(0),
-                    output_field=FloatField(),
-                ),
+            self.ranking_time = time.time() - start_time
+            print(
+                f"Ranked the queue with {settings.RANKING_BACKEND} "
+                f"in {self.ranking_time * 1000:.1f}ms"
             )
-
-        # Use window function to get the top clip per feed
-        final_clips = (
-            ranked_clips.annotate(
-                row_number=Window(
-                    expression=RowNumber(),
-                    partition_by=F("feed_item__feed"),
-                    order_by=F("combined_score").desc(),
-                )
-            )
-            .filter(row_number=1)
-            .order_by("-combined_score")[:9]
-        )
-
-        # Get a random clip
-        # TODO: Exclude clips from any viewed feedItem? Or viewed feeds?
+            if not topic_ids:
+                schedule_queue_refresh(user.id)
+        # Mix in an exploration clip sampled from the recent clip pool
+        random_clip_id = None
         if not topic_ids:
-            one_week_ago = timezone.now() - timedelta(days=7)
-            random_clip = (
-                Clip.objects.filter(
-                    created_at__gte=one_week_ago,
-                    feed_item__feed__is_english=True,
-                )
-                .exclude(user_views__user=user)
-                .exclude(id__in=exclude_clip_ids)
-                .exclude(
-                    feed_item__feed__in=Subquery(final_clips.values("feed_item__feed"))
-                )
-                .order_by("?")
-                .first()
+            random_clip_id = sample_exploration_clip_id(
+                user,
+                exclude_clip_ids,
+                ClipRankingFeatures.objects.filter(
+                    clip_id__in=final_clip_ids
+                ).values_list("feed_id", flat=True),
             )
-        else:
-            random_clip = None
 
-        final_clips = list(final_clips)
-        if random_clip:
+        # Load the clips with everything the serializer reads in one go
+        clip_ids = final_clip_ids + (
+            [random_clip_id] if random_clip_id is not None else []
+        )
+        clips_by_id = serializers.ClipReadSerializer.setup_eager_loading(
+            Clip.objects.all()
+        ).in_bulk(clip_ids)
+        final_clips = [
+            clips_by_id[clip_id] for clip_id in final_clip_ids if clip_id in clips_by_id
+        ]
+
+        if random_clip_id in clips_by_id:
             random_index = random.randint(0, len(final_clips))
-            final_clips.insert(random_index, random_clip)
+            final_clips.insert(random_index, clips_by_id[random_clip_id])
 
         return final_clips
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Lets clients and the APM compare ranking backends per request
+        ranking_time = getattr(self, "ranking_time", None)
+        if ranking_time is not None:
+            response["Server-Timing"] = (
+                f'rank;desc="{settings.RANKING_BACKEND}";dur={ranking_time * 1000:.1f}'
+            )
+        return response
+
 
 class FeedViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Feed.objects.all().filter(is_english=True)
-    serializer_class = serializers.FeedSerializer
+    serializer_class = serializers.FeedReadSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = Feed.objects.all().filter(is_english=True)
+        # The serializer never reads the vectors, don't ship them from the DB
+        queryset = (
+            Feed.objects.all()
+            .filter(is_english=True)
+            .defer("topic_embedding", "search_vector")
+        )
+        if self.action != "list":
+            # Search only narrows the list, autocomplete's sliced queryset
+            # can't be filtered by get_object
+            return queryset
+
         search_query = self.request.query_params.get("search", None)
+        autocomplete = self.request.query_params.get("autocomplete", None)
 
-        if search_query:
-            if connection.vendor == "postgresql":
-                # Use fuzzy search for PostgreSQL (production mode)
-                queryset = queryset.annotate(
-                    similarity=TrigramSimilarity("name", search_query),
-                )
-                queryset = queryset.filter(
-                    Q(similarity__gt=0.1)  # Similarity threshold or
-                    | Q(name__icontains=search_query)  # Basic search
-                ).order_by("-similarity")
-            else:
-                # Use basic search for SQLite (debug mode)
+        if connection.vendor != "postgresql":
+            # Use basic search for SQLite (debug mode)
+            search_query = search_query or autocomplete
+            if search_query:
                 queryset = queryset.filter(name__icontains=search_query)
+            return queryset
+
+        if autocomplete:
+            # Prefix matches for search-as-you-type, a single short page
+            return autocomplete_feeds(queryset, autocomplete)
+
+        if search_query:
+            queryset = search_feeds(queryset, search_query)
 
         return queryset
 
@@ -318,11 +211,9 @@ class HistoryViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return (
+        return serializers.HistorySerializer.setup_eager_loading(
             ClipUserView.objects.filter(user=self.request.user)
-            .select_related("clip__feed_item__feed")
-            .order_by("-created_at")[:10]
-        )
+        ).order_by("-created_at")[:10]
 
 
 class ViewViewSet(viewsets.ModelViewSet):
@@ -351,6 +242,49 @@ class ViewViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK if not created else status.HTTP_201_CREATED,
         )
 
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """
+        Buffer many view progress events, they are written by the
+        flush_buffered_views task within seconds.
+
+        Accepts {"views": [{"clip": 1, "duration": 50}, ...]} or a bare list.
+        """
+        events = request.data
+        if isinstance(events, dict):
+            events = events.get("views")
+        if not isinstance(events, list):
+            return Response(
+                {"error": "Expected a list of views"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(events) > MAX_VIEW_BATCH_SIZE:
+            return Response(
+                {"error": f"At most {MAX_VIEW_BATCH_SIZE} views per batch"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Only the furthest progress per clip matters
+        views = {}
+        for event in events:
+            clip_id = event.get("clip") if isinstance(event, dict) else None
+            duration = event.get("duration", 0) if isinstance(event, dict) else None
+            if (
+                type(clip_id) is not int
+                or type(duration) is not int
+                # Ids are bigints, anything larger fails the flush's upsert
+                or not 0 < clip_id < 2**63
+                or not 0 <= duration < 2**31
+            ):
+                return Response(
+                    {"error": "Each view needs an integer clip and duration"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            views[clip_id] = max(duration, views.get(clip_id, 0))
+
+        buffer_views(request.user.id, views)
+        return Response({"buffered": len(views)}, status=status.HTTP_202_ACCEPTED)
+
 
 class FeedUserInterestViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.FeedUserInterestSerializer
@@ -396,7 +330,7 @@ class FeedUserInterestViewSet(viewsets.ModelViewSet):
 
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
-    serializer_class = serializers.CategorySerializer
+    serializer_class = serializers.CategoryReadSerializer
     permission_classes = [IsAuthenticated]
 
     class Pagination(PageNumberPagination):
@@ -407,8 +341,9 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = Pagination
 
     def get_queryset(self):
-        queryset = Category.objects.annotate(
-            clip_count=Count("clipcategoryscore__clip", distinct=True)
+        # Counts come from the counts table instead of aggregating every score
+        queryset = Category.objects.select_related("parent").annotate(
+            clip_count=Coalesce(F("clip_count_row__clip_count"), 0)
         )
 
         should_display = self.request.query_params.get("should_display", None)
@@ -417,13 +352,37 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
 
         return queryset.order_by("-clip_count")
 
+    def list(self, request, *args, **kwargs):
+        # The catalog only changes when clips are tagged, so serve it from cache
+        # and let clients revalidate with If-None-Match
+        etag = get_catalog_etag(request.get_full_path())
+        if etag_matches(etag, request.headers.get("If-None-Match")):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+
+        catalog_page = get_cached_catalog(etag)
+        if catalog_page is None:
+            response = super().list(request, *args, **kwargs)
+            catalog_page = get_catalog_page(response.data, self.paginator.page)
+            store_cached_catalog(etag, catalog_page)
+
+        data = get_catalog_response_data(
+            catalog_page,
+            request.build_absolute_uri(),
+            self.paginator.page_query_param,
+        )
+        return Response(data, headers={"ETag": etag})
+
 
 class UserCategoryScoreViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.UserCategoryScoreSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return UserCategoryScore.objects.filter(user=self.request.user)
+        return UserCategoryScore.objects.filter(
+            user=self.request.user
+        ).select_related("category__parent")
 
     def create(self, request, *args, **kwargs):
         category_id = request.data.get("category")
@@ -523,6 +482,32 @@ class RegisterView(APIView):
                 )
 
 
+class TranscriptWebhookView(APIView):
+    # Called by AssemblyAI when a submitted transcript is done
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = []
+
+    def post(self, request):
+        secret = request.headers.get(settings.ASSEMBLYAI_WEBHOOK_AUTH_HEADER, "")
+        if not settings.ASSEMBLYAI_WEBHOOK_SECRET or not hmac.compare_digest(
+            secret, settings.ASSEMBLYAI_WEBHOOK_SECRET
+        ):
+            return Response(
+                {"error": "Invalid webhook secret"}, status=status.HTTP_403_FORBIDDEN
+            )
+
+        transcript_id = request.data.get("transcript_id")
+        if not transcript_id:
+            return Response(
+                {"error": "transcript_id is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        complete_transcription.delay(transcript_id)
+        return Response(status=status.HTTP_200_OK)
+
+
 class CustomAuthToken(ObtainAuthToken):
     throttle_classes = [AnonRateThrottle]
 